@@ -0,0 +1,268 @@
+import cbn_utils
+import google_sheets
+import leaderboard
+import rosters
+from model import RosterPage, SchedulePage, BoxScore
+import numpy as np
+import pandas as pd
+import contextlib
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+import sys
+from datetime import datetime
+
+# Offline benchmarks on synthetic data, e.g. python benchmarks.py 50000 (players; cells are 10x that)
+
+def synthetic_players(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    league_divisions = [(league['league'], league['division'] if league['league'] != 'NAIA' else '') for league in cbn_utils.leagues] + [('', '')]
+    picks = rng.integers(0, len(league_divisions), n)
+    return pd.DataFrame({
+        'first_name': rng.choice(['Liam', 'Noah', 'Owen', 'Ethan', 'Jacob', 'Lucas', 'Logan', 'Mason'], n),
+        'last_name': rng.choice(['Smith', 'Brown', 'Tremblay', 'Martin', 'Roy', 'Gagnon', 'Lee', 'Wilson', 'Johnson'], n),
+        'positions': rng.choice(['P', 'C', 'INF', 'OF', 'P/INF', 'C/OF', ''], n),
+        'throws': rng.choice(['L', 'R', ''], n),
+        'year': rng.choice(['Freshman', 'Sophomore', 'Junior', 'Senior', '', 'Graduate'], n),
+        'city': rng.choice(['Toronto', 'Calgary', 'Surrey', ''], n),
+        'province': rng.choice(['ON', 'AB', 'BC', ''], n),
+        'name': rng.choice([f'School {i}' for i in range(500)], n),
+        'state': rng.choice(['TX', 'FL', 'WA', 'CA'], n),
+        'league': [league_divisions[i][0] for i in picks],
+        'division': [league_divisions[i][1] for i in picks]
+    }).rename({'positions': 'Position', 'name': 'School', 'state': 'State'}, axis = 1)
+
+def canadians_rows_apply(players_df: pd.DataFrame, columns: list[str]) -> tuple[list[list], list[list]]:
+    # update_canadians_sheet before rosters.py: row-wise apply and a filtered copy per league, division and class year
+    blank_row = ['' for _ in columns]
+    players_df = players_df.sort_values(by = ['last_name', 'first_name'], ignore_index = True)
+    players_df['Name'] = players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
+    players_df['Hometown'] = players_df.apply(lambda row: f'{row["city"]}, {row["province"]}' if (row['city'] != '') & (row['province'] != '') else row['city'] if row['city'] != '' else row['province'], axis = 1)
+    players_df['Position'] = players_df.apply(lambda row: row['Position'].replace('P', f'{row["throws"]}HP'), axis = 1)
+    summary_data, player_data = list(), list()
+    for league in cbn_utils.leagues:
+        league, division, label = league['league'], league['division'], league['label']
+        df_split_div = players_df[players_df['league'] == league].copy()
+        if league != 'NAIA':
+            df_split_div = df_split_div[df_split_div['division'] == division].copy()
+        df_split_div.drop(['league', 'division'], axis = 1, inplace = True)
+        if len(df_split_div.index) > 0:
+            player_data.append([label, '', '', '', ''])
+        for class_year in ['Freshman', 'Sophomore', 'Junior', 'Senior']:
+            if class_year == 'Freshman':
+                df_split_class = df_split_div[df_split_div['year'].isin([class_year, ''])].drop(['year'], axis=1)
+                class_year = 'Freshmen'
+            else:
+                df_split_class = df_split_div[df_split_div['year'] == class_year].drop(['year'], axis=1)
+                if len(df_split_class.index) > 0:
+                    player_data.append(blank_row)
+                class_year += 's'
+            if len(df_split_class.index) > 0:
+                player_data += [[class_year, '', '', '', ''], list(columns)] + df_split_class[list(columns)].values.tolist()
+        if len(df_split_div.index) > 0:
+            player_data.append(blank_row)
+            summary_data.append([label + ' ', f'{len(df_split_div.index)} players', '', '', ''])
+    return summary_data, player_data
+
+def canadians_rows(players_df: pd.DataFrame, columns: list[str]) -> tuple[list[list], list[list]]:
+    # update_canadians_sheet now
+    players_df = players_df.sort_values(by = ['last_name', 'first_name'], ignore_index = True)
+    players_df['Name'] = rosters.names(players_df)
+    players_df['Hometown'] = rosters.hometowns(players_df)
+    players_df['Position'] = rosters.positions(players_df, column = 'Position')
+    league_labels = [league['label'] for league in cbn_utils.leagues]
+    player_data, player_counts = rosters.blocks(players_df, leaderboard.league_groups(players_df, cbn_utils.leagues), league_labels, columns, classes = rosters.class_years(players_df))
+    return [[league_labels[group] + ' ', f'{count} players', '', '', ''] for group, count in player_counts.items()], player_data
+
+def timed(function, *args) -> tuple[float, object]:
+    start_time = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start_time, result
+
+def canadians_sheet(n: int):
+    players_df = synthetic_players(n)
+    columns = ['Name', 'Position', 'School', 'State', 'Hometown']
+    old_seconds, old_rows = timed(canadians_rows_apply, players_df, columns)
+    new_seconds, new_rows = timed(canadians_rows, players_df, columns)
+    cbn_utils.log(f'Canadians sheet, {n} players: apply {round(old_seconds, 3)}s, vectorized {round(new_seconds, 3)}s ({round(old_seconds / new_seconds, 1)}x), same rows: {old_rows == new_rows}')
+
+# Hometown cells as they appear on roster pages: Canadian ones in the formats schools use, US and international
+# hometowns, the near misses in cbn_utils.ignore_strings, and the other things that sit in roster cells
+HOMETOWNS = [
+    'Toronto, Ont.', 'Toronto, Ontario', 'Mississauga, ON', 'Ottawa, Ontario, Canada', 'London, Ont. / Western Mustangs',
+    'Montreal, Quebec', 'Saint-Hilaire, QC', 'Sherbrooke, Que.', 'Vancouver, B.C.', 'Surrey, BC / Vauxhall Academy',
+    'Langley, British Columbia', 'Calgary, Alta.', 'Edmonton, AB', 'Okotoks, Alberta', 'Winnipeg, Man.', 'Regina, Sask.',
+    'Saskatoon, SK', 'Halifax, N.S.', 'Moncton, New Brunswick', "St. John's, Newfoundland", 'Charlottetown, PEI', 'Canada',
+    'Dallas, Texas', 'Tampa, Fla.', 'Phoenix, AZ', 'Ontario, California', 'Ontario, Calif. / Chaffey HS', 'La Canada, Calif.',
+    'Canada, Minn.', 'Newfoundland, Pa.', 'New Brunswick, N.J.', 'Las Vegas, NB', 'Queens, N.Y.', 'Flushing, N.Y., Queens',
+    'Boston, Mass. / BC High', 'Sydney, NSW, Australia', 'Seoul, South Korea', 'Seoul, SK', 'Alkmaar, NL', 'Monterrey, Mexico',
+    'Tifton, Ga. / ABAC', 'West Canada Valley HS', 'Canada College', 'BC Post Grad', 'A.B. Miller HS', 'BCA',
+    'RHP', 'R/R', 'Jr.', '6-2', '205', 'So.', 'Ryan Smith', 'nan', ''
+]
+
+def is_canadian_previous(string: str) -> bool:
+    # cbn_utils.is_canadian before the strings were compiled into one pattern per list
+    return bool(any(canada_string.lower() in string.lower() for canada_string in cbn_utils.canada_strings)) & (not any(ignore_string in string.lower() for ignore_string in cbn_utils.ignore_strings))
+
+def is_canadian(n: int):
+    rng = np.random.default_rng(0)
+    hometowns = [hometown.upper() if i % 7 == 0 else hometown for i, hometown in enumerate(rng.choice(HOMETOWNS, n))]
+    old_seconds, old_results = timed(lambda: [is_canadian_previous(hometown) for hometown in hometowns])
+    new_seconds, new_results = timed(lambda: [cbn_utils.is_canadian(hometown) for hometown in hometowns])
+    series_seconds, series_results = timed(cbn_utils.is_canadian_series, pd.Series(hometowns))
+    same = (old_results == new_results) & (old_results == series_results.tolist())
+    cbn_utils.log(f'is_canadian, {n} cells: substring scans {round(old_seconds, 3)}s, compiled {round(new_seconds, 3)}s ({round(old_seconds / new_seconds, 1)}x), series {round(series_seconds, 3)}s ({round(old_seconds / series_seconds, 1)}x), same results: {same}')
+
+# Roster and box score pages laid out the way the parsers expect, for when no pages have been saved yet
+NAVIGATION = ''.join([f'<li class="nav-item"><a href="/sports/sport-{i}">Sport {i}</a></li>' for i in range(300)]) # real pages carry a lot of this
+
+def synthetic_pages(players: int = 40) -> dict[str, str]:
+    rng = np.random.default_rng(0)
+    hometowns = rng.choice(HOMETOWNS[:30], players)
+    positions = rng.choice(['RHP', 'LHP', 'C', 'INF', 'OF', 'RHP/1B', 'SS'], players)
+    years = rng.choice(['Fr.', 'So.', 'Jr.', 'Sr.', 'R-Jr.', 'Gr.'], players)
+    names = [f'{first} {last}' for first, last in zip(rng.choice(['Liam', 'Noah', 'Owen', 'Ethan'], players), rng.choice(['Smith', 'Roy', 'Gagnon', 'Lee'], players))]
+    s_person_cards = ''.join([
+        f'<div class="s-person-card"><div class="s-person-details__personal"><a href="/roster/{i}">{names[i]}</a></div>'
+        f'<div class="s-person-details__bio-stats"><span class="s-person-details__bio-stats-item"><span class="sr-only">Position</span>{positions[i]}</span>'
+        f'<span class="s-person-details__bio-stats-item">{years[i]}</span></div>'
+        f'<div class="s-person-card__content__location"><span class="s-person-card__content__person__location-item"><svg class="s-icon-location"></svg>{hometowns[i]}</span></div></div>'
+        for i in range(players)
+    ])
+    sidearm_cards = ''.join([
+        f'<li class="sidearm-roster-player"><div class="sidearm-roster-player-container"><div class="sidearm-roster-player-name"><h3><a href="/roster/{i}">{names[i]}</a></h3></div>'
+        f'<div class="sidearm-roster-player-position"><span>{positions[i]}</span></div><span class="sidearm-roster-player-academic-year">{years[i]}</span>'
+        f'<span class="sidearm-roster-player-hometown">{hometowns[i]}</span></div></li>'
+        for i in range(players)
+    ])
+    box_score_rows = ''.join([f'<tr><td>{i}</td><td><a href="/players/{i}">{names[i]}</a></td><td>{positions[i].lower()}</td><td>4</td><td>1</td></tr>' for i in range(players // 2)])
+    page = lambda body: f'<!DOCTYPE html><html><head><title>Baseball</title><script>var config = {{"a": 1}};</script></head><body><nav><ul>{NAVIGATION}</ul></nav><main>{body}</main></body></html>'
+    return {
+        'https://example.edu/sports/baseball/roster/s-person-card': page(s_person_cards),
+        'https://example.edu/sports/baseball/roster/sidearm': page(f'<ul>{sidearm_cards}</ul>'),
+        'https://stats.example.org/contests/1/individual_stats': page(f'<table><tr><th>#</th><th>Player</th><th>Pos</th><th>AB</th><th>H</th></tr>{box_score_rows}</table>' * 2)
+    }
+
+def saved_pages() -> dict[str, str]:
+    # Roster and box score pages in the page cache, by the URL they were read from
+    pages = dict()
+    directory = os.path.join(cbn_utils.CACHE_DIR, 'pages')
+    for file_name in sorted(os.listdir(directory)) if os.path.isdir(directory) else list():
+        if file_name.split('-')[0] in [cbn_utils.ROSTER, cbn_utils.BOX_SCORE]:
+            with gzip.open(os.path.join(directory, file_name), 'rt') as f:
+                entry = json.load(f)
+            if (cbn_utils.page_type(entry['current_url']) == file_name.split('-')[0]) & (len(entry.get('xhr_payloads', list())) == 0):
+                pages[entry['current_url']] = entry['html']
+    return pages
+
+def season(year: int = datetime.now().year) -> dict[str, str]:
+    # The Hub's configuration keys that roster parsing reads, for running without the Hub
+    return {'YEAR': str(year), 'YEAR_SHORT': str(year)[2:]}
+
+def served(pages: dict[str, str], config: dict[str, str] | None = None) -> list[RosterPage | SchedulePage | BoxScore]:
+    # Pages built, and parsed, from a temporary page cache so nothing is fetched. Without config, class years come from the Hub
+    page_cache = cbn_utils.page_cache
+    page_classes = {cbn_utils.ROSTER: RosterPage, cbn_utils.SCHEDULE: SchedulePage, cbn_utils.BOX_SCORE: BoxScore}
+    hub_config = mock.patch.object(google_sheets, 'config', return_value = config) if config != None else contextlib.nullcontext()
+    with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(io.StringIO()), hub_config: # RosterPage logs every hometown it parses
+        cbn_utils.page_cache = cbn_utils.PageCache(directory, cbn_utils.page_ttls)
+        try:
+            for url, html in pages.items():
+                cbn_utils.page_cache.put(url, {'current_url': url, 'html': html, 'status_code': 200, 'etag': '', 'last_modified': ''})
+            return [page_classes[cbn_utils.page_type(url)](url) for url in pages.keys()]
+        finally:
+            cbn_utils.page_cache = page_cache
+
+def results(web_pages: list[RosterPage | SchedulePage | BoxScore]) -> list:
+    # What the scraper takes from each page
+    return [web_page.to_df().astype(str) if isinstance(web_page, RosterPage) else web_page.positions_df if isinstance(web_page, BoxScore) else web_page.box_score_links for web_page in web_pages] # positions are sets
+
+def same_results(results_: list, expected: list) -> bool:
+    return all(result.equals(expected_) if isinstance(result, pd.DataFrame) else result == expected_ for result, expected_ in zip(results_, expected))
+
+def parsed_with(parser: str, pages: dict[str, str], config: dict[str, str] | None = None) -> list:
+    parser_, cbn_utils.HTML_PARSER = cbn_utils.HTML_PARSER, parser
+    try:
+        return results(served(pages, config))
+    finally:
+        cbn_utils.HTML_PARSER = parser_
+
+def html_parsers(repeat: int = 5, config: dict[str, str] | None = None):
+    # Per-page time to read and parse the same pages with each HTML parser, and whether each finds the same players and positions as html.parser
+    pages = saved_pages()
+    if len(pages) == 0:
+        pages = synthetic_pages()
+    expected, seconds = parsed_with('html.parser', pages, config), dict()
+    for parser in cbn_utils.HTML_PARSERS:
+        seconds[parser], _ = timed(lambda: [parsed_with(parser, pages, config) for _ in range(repeat)])
+    page_seconds = lambda parser: seconds[parser] / (len(pages) * repeat)
+    for parser in cbn_utils.HTML_PARSERS:
+        same = same_results(parsed_with(parser, pages, config), expected)
+        cbn_utils.log(f'{parser}, {len(pages)} pages: {round(page_seconds(parser) * 1000, 1)} ms per page ({round(page_seconds("html.parser") / page_seconds(parser), 1)}x), same players and positions: {same}')
+
+def initial_state_page(players: int = 40) -> str:
+    # Roster JSON in window.__INITIAL_STATE__, as some sidearm sites render it
+    rng = np.random.default_rng(0)
+    roster = [{'firstName': first, 'lastName': last, 'positionShort': position, 'academicYearShort': year, 'hometown': hometown} for first, last, position, year, hometown in zip(
+        rng.choice(['Liam', 'Noah', 'Owen', 'Ethan'], players), rng.choice(['Smith', 'Roy', 'Gagnon', 'Lee'], players), rng.choice(['RHP', 'LHP', 'C', 'INF', 'OF'], players),
+        rng.choice(['Fr.', 'So.', 'Jr.', 'Sr.'], players), rng.choice([hometown for hometown in HOMETOWNS[:30] if "'" not in hometown], players)
+    )]
+    state = json.dumps({'sport': 'baseball', 'players': roster, 'coaches': []}, separators = (',', ':'))
+    return f'<html><head><script>var config = {{"a": 1}};</script></head><body><nav><ul>{NAVIGATION}</ul></nav><script>window.__INITIAL_STATE__=\'{state}\';</script></body></html>'
+
+def schedule_page(games: int = 60) -> str:
+    rows = ''.join([f'<tr><td>Game {i}</td><td><a href="/teams/{i}">Opponent {i}</a></td><td><a href="/contests/{i}/box_score">Box Score</a></td></tr>' for i in range(games)])
+    return f'<html><body><nav><ul>{NAVIGATION}</ul></nav><table>{rows}</table></body></html>'
+
+def extracted_whole_page(html: str, page_type: str) -> list[str]:
+    # What the roster and schedule parsers look for, from a DOM of the whole page (before partial parsing)
+    soup = cbn_utils.soup(html)
+    if page_type == cbn_utils.SCHEDULE:
+        return [a['href'] for a in soup.find_all('a') if ('/boxscore' in a['href'].replace('_', '') if a.has_attr('href') else False)]
+    scripts = [script.text for script in soup.find_all('script') if 'window.__INITIAL_STATE__' in script.text]
+    if len(scripts) > 0:
+        return scripts[:1]
+    return [str(tag) for tag in soup.find_all('div', {'class': list(cbn_utils.roster_card_classes)}) + soup.find_all('table')[:1]]
+
+def extracted(html: str, page_type: str) -> list[str]:
+    # The same, scanning for the script and building only the cards and tables, or the box score links
+    if page_type == cbn_utils.SCHEDULE:
+        return [a['href'] for a in cbn_utils.soup(html, parse_only = cbn_utils.box_score_links).find_all(cbn_utils.box_score_links)]
+    script = cbn_utils.script_text(html, 'window.__INITIAL_STATE__')
+    if script != None:
+        return [script]
+    soup = cbn_utils.soup(html, parse_only = cbn_utils.roster_content)
+    return [str(tag) for tag in soup.find_all('div', {'class': list(cbn_utils.roster_card_classes)}) + soup.find_all('table')[:1]]
+
+def peak_memory(function, *args) -> int:
+    # Most bytes allocated at once while function runs
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+def partial_parsing(repeat: int = 20):
+    # Whole-page DOMs against building only the roster cards and tables, scanning for roster JSON and straining box score links
+    pages = {url: html for url, html in synthetic_pages().items() if cbn_utils.page_type(url) == cbn_utils.ROSTER}
+    pages['https://example.edu/sports/baseball/roster/initial-state'] = initial_state_page()
+    pages['https://example.edu/sports/baseball/schedule'] = schedule_page()
+    for url, html in pages.items():
+        page_type = cbn_utils.page_type(url)
+        same = extracted_whole_page(html, page_type) == extracted(html, page_type)
+        old_seconds, _ = timed(lambda: [extracted_whole_page(html, page_type) for _ in range(repeat)])
+        new_seconds, _ = timed(lambda: [extracted(html, page_type) for _ in range(repeat)])
+        old_peak, new_peak = peak_memory(extracted_whole_page, html, page_type), peak_memory(extracted, html, page_type)
+        cbn_utils.log(f'{url.split("/")[-1]}, {round(len(html) / 1024)} KB: whole page {round(old_seconds / repeat * 1000, 1)} ms {round(old_peak / 1024)} KB peak, partial {round(new_seconds / repeat * 1000, 1)} ms {round(new_peak / 1024)} KB peak ({round(old_seconds / new_seconds, 1)}x), same results: {same}')
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    canadians_sheet(n)
+    is_canadian(n * 10)
+    html_parsers(config = season())
+    partial_parsing()
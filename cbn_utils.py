@@ -1,11 +1,21 @@
 import re
+import json
+import functools
+import gzip
+import hashlib
 import requests
+from curl_cffi import requests as curl_requests
 import undetected_chromedriver as uc
 import os
 import platform
 import pandas as pd
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer
 from datetime import datetime
 import time
+import threading
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import smtplib
 from email.mime.text import MIMEText
 from urllib.parse import urlparse
@@ -21,6 +31,13 @@ def env(key: str):
                 if key_value_tuple[0] == key:
                     return key_value_tuple[1]
 
+def setting(key: str, default = None):
+    # Environment variable, then .env file, then default
+    value = os.environ.get(key)
+    if value == None:
+        value = env(key)
+    return default if value == None else value
+
 RUNNING_LOCALLY = False if platform.system() == 'Linux' else True
 
 NCAA_DOMAIN = 'stats.ncaa.org'
@@ -29,6 +46,9 @@ JUCO_DOMAIN = 'njcaastats.prestosports.com'
 CCCAA_DOMAIN = 'www.cccaasports.org'
 NWAC_DOMAIN = 'nwacsports.com'
 USCAA_DOMAIN = 'uscaa.prestosports.com'
+BBREF_DOMAIN = 'www.baseball-reference.com'
+MLB_STATS_API_DOMAIN = 'statsapi.mlb.com'
+SHEETS_DOMAIN = 'sheets.googleapis.com'
 
 leagues = [
     {'league': 'NCAA', 'division': str(division), 'label': f'NCAA: Division {division}'} for division in range(1, 4)
@@ -74,9 +94,6 @@ stats_labels = {
 }
 
 # Functions
-def pause(_):
-    time.sleep(1)
-
 def log(message: str):
     print(log_prefix(), message, sep = '')
 
@@ -111,10 +128,35 @@ def check_list_arg(name='', values=[], allowed_values=[], disallowed_values=[])
                 message += f'"{name}" argument must NOT be from the following list: {disallowed_values}. "{value}" was provided. '
     assert passes, message
 
-def replace(string: str, dictionary: dict[str, str]) -> str:
-    for old, new in dictionary.items():
-        string = string.replace(old, new)
-    return string
+class Corrections:
+    # The Corrections tab's From -> To pairs compiled into one alternation (longest From first), so each string is
+    # corrected in a single left-to-right pass no matter how many corrections there are
+    def __init__(self, pairs: dict[str, str]):
+        self.__pairs__ = {old: new for old, new in pairs.items() if old != ''}
+        self.__pattern__ = re.compile('|'.join([re.escape(old) for old in sorted(self.__pairs__.keys(), key = len, reverse = True)])) if len(self.__pairs__) > 0 else None
+
+    def __len__(self) -> int:
+        return len(self.__pairs__)
+
+    def items(self):
+        return self.__pairs__.items()
+
+    def __correct__(self, match: re.Match) -> str:
+        return self.__pairs__[match.group(0)]
+
+    def replace(self, string: str) -> str:
+        return string if self.__pattern__ == None else self.__pattern__.sub(self.__correct__, string)
+
+    def replace_series(self, strings: pd.Series) -> pd.Series:
+        # replace for a whole column at once
+        return strings if self.__pattern__ == None else strings.str.replace(self.__pattern__, self.__correct__, regex = True)
+
+def corrections(pairs: dict[str, str] | Corrections) -> Corrections:
+    # Compile once; pages pass along what they were given
+    return pairs if isinstance(pairs, Corrections) else Corrections(pairs)
+
+def replace(string: str, dictionary: dict[str, str] | Corrections) -> str:
+    return corrections(dictionary).replace(string)
 
 def strikethrough(x) -> str:
     return ''.join([character + '\u0336' for character in str(x)])
@@ -218,11 +260,24 @@ ignore_strings = [
     'bc post grad'
 ]
 
+# Each list compiled once into a single alternation (longest first), so a hometown is scanned once per list instead of once per string
+canada_pattern = re.compile('|'.join([re.escape(string) for string in sorted(set([string.lower() for string in canada_strings]), key = len, reverse = True)]))
+ignore_pattern = re.compile('|'.join([re.escape(string) for string in sorted(set(ignore_strings), key = len, reverse = True)]))
+
 def is_canadian(string: str) -> bool:
-    return bool(any(canada_string.lower() in string.lower() for canada_string in canada_strings)) & (not any(ignore_string in string.lower() for ignore_string in ignore_strings))
+    string = string.lower()
+    return (canada_pattern.search(string) != None) & (ignore_pattern.search(string) == None)
+
+def is_canadian_series(strings: pd.Series) -> pd.Series:
+    # is_canadian for a whole column at once
+    strings = strings.astype(str).str.lower()
+    return strings.str.contains(canada_pattern) & ~strings.str.contains(ignore_pattern)
 
 # Requests
-log(f'Local IP Address: {requests.get("https://api.ipify.org").text}')
+@functools.cache
+def log_ip_address():
+    # Looked up once, on the first request of the run
+    log(f'Local IP Address: {requests.get("https://api.ipify.org").text}')
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36',
@@ -232,10 +287,414 @@ headers = {
     'Referer': ''
 }
 
-def new_driver():
+def domain(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+# Rate limits
+class RateLimiter:
+    # Token bucket per host, tracked as the time each bucket will be full again (GCRA), so callers for different hosts never wait on each other
+    def __init__(self, limits: dict[str, tuple[float, int]]):
+        self.__limits__ = limits
+        self.__full_at__: dict[str, float] = dict()
+        self.__held_until__: dict[str, float] = dict()
+        self.__lock__ = threading.Lock()
+
+    def acquire(self, host: str):
+        # Block until `host` allows another request
+        with self.__lock__:
+            now = time.monotonic()
+            wait = self.__held_until__.get(host, now) - now
+            if host in self.__limits__:
+                rate, burst = self.__limits__[host]
+                full_at = max(self.__full_at__.get(host, now), now) + 1 / rate # take a token
+                self.__full_at__[host] = full_at
+                wait = max(wait, full_at - burst / rate - now)
+        if wait > 0:
+            time.sleep(wait)
+
+    def hold(self, host: str, seconds: float):
+        # Host asked us to back off, e.g. with a 429
+        with self.__lock__:
+            self.__held_until__[host] = max(self.__held_until__.get(host, 0), time.monotonic() + seconds)
+
+rate_limits = { # requests per second, burst
+    NCAA_DOMAIN: (20 / 200, 20), # blocks us after a quick run of requests
+    BBREF_DOMAIN: (1 / 4, 1),
+    MLB_STATS_API_DOMAIN: (1, 1)
+} # Google Sheets calls are budgeted by google_sheets.QuotaClient
+rate_limits.update({host: tuple(limit) for host, limit in json.loads(setting('RATE_LIMITS', '{}')).items()}) # e.g. RATE_LIMITS={"stats.ncaa.org": [0.2, 10]}
+
+rate_limiter = RateLimiter(rate_limits)
+
+# Fetch strategies
+HTTP = 'http' # lightweight client impersonating Chrome's TLS fingerprint
+BROWSER = 'browser' # full Chrome, for pages that need JavaScript or a WAF challenge solved
+CACHE = 'cache' # saved copy of the page from an earlier fetch
+
+domain_strategies: dict[str, str] = dict() # winning strategy for each domain during this run
+
+challenge_strings = [
+    'awswaf',
+    'challenge.js',
+    'cf-chl',
+    'Just a moment...'
+]
+
+def fetch_strategy(url: str) -> str:
+    return domain_strategies.get(domain(url), HTTP)
+
+def remember_strategy(url: str, strategy: str):
+    if domain_strategies.get(domain(url)) != strategy:
+        log(f'Using {strategy} strategy for {domain(url)}')
+    domain_strategies[domain(url)] = strategy
+
+def is_challenge(status_code: int, html: str) -> bool:
+    if status_code in [202, 403, 405]:
+        return True
+    return (len(html) < 50000) & any(challenge_string in html for challenge_string in challenge_strings) # challenge pages are small
+
+http_sessions = threading.local()
+
+def http_session() -> curl_requests.Session:
+    if not hasattr(http_sessions, 'session'):
+        log_ip_address()
+        http_sessions.session = curl_requests.Session(impersonate = 'chrome', timeout = 30)
+    return http_sessions.session
+
+def http_get(url: str, headers: dict[str, str] = dict(), attempt = 1):
+    session = http_session()
+    load_http_session(session, url)
+    rate_limiter.acquire(domain(url))
+    try:
+        response = session.get(url, headers = headers)
+        if (response.status_code < 300) & (not is_challenge(response.status_code, response.text)):
+            save_http_session(session, url)
+        if ((response.status_code == 429) | (response.status_code >= 500)) & (attempt == 1):
+            retry_after = response.headers.get('Retry-After', '')
+            time.sleep(min(int(retry_after), 60) if retry_after.isdigit() else 5) # rate limited or server error, worth one more try
+            return http_get(url, headers = headers, attempt = 2)
+        return response
+    except Exception as e:
+        if attempt == 1:
+            time.sleep(1)
+            return http_get(url, headers = headers, attempt = 2)
+        log(f'{url} - {str(e)}')
+
+# Page types
+ROSTER = 'roster'
+PLAYER = 'player'
+STATS = 'stats'
+BOX_SCORE = 'box_score'
+SCHEDULE = 'schedule'
+
+def page_type(url: str) -> str:
+    parts = urlparse(url.lower())
+    url = f'{parts.path}?{parts.query}' # ignore the host, e.g. stats.ncaa.org
+    if ('box_score' in url) | ('boxscore' in url) | ('individual_stats' in url):
+        return BOX_SCORE
+    if ('game_by_game' in url) | ('/schedule' in url):
+        return SCHEDULE
+    if '/roster' in url:
+        return ROSTER
+    if '/players/' in url:
+        return PLAYER
+    if ('/stats' in url) | ('view=lineup' in url):
+        return STATS
+    return ''
+
+CAPTURE_XHR = setting('CAPTURE_XHR', 'on') == 'on'
+xhr_patterns = [ # API responses that roster pages request for themselves (regular expressions)
+    r'/api/v2/rosters',
+    r'/services/roster',
+    r'/api/.*roster'
+]
+
+def is_xhr_payload(url: str, mime_type: str) -> bool:
+    return ('json' in mime_type) & any(re.search(pattern, url, flags = re.IGNORECASE) != None for pattern in xhr_patterns)
+
+def is_roster_payload(payload: str) -> bool:
+    # Does an API response hold the players RosterPage parses (not e.g. the coaches or the schedule)?
+    try:
+        roster_json = json.loads(payload)
+    except ValueError:
+        return False
+    players = roster_json.get('players') if isinstance(roster_json, dict) else roster_json
+    if (not isinstance(players, list)) or (len(players) == 0):
+        return False
+    return all([isinstance(player, dict) and all([key in player for key in ['firstName', 'lastName', 'positionShort', 'academicYearShort', 'hometown']]) for player in players])
+
+ready_timeouts = { # most seconds to wait in the browser for JavaScript to render the content we parse
+    PLAYER: float(setting('PLAYER_READY_TIMEOUT', 10)),
+    ROSTER: float(setting('ROSTER_READY_TIMEOUT', 3))
+}
+
+# HTML parsing
+HTML_PARSERS = ['lxml', 'html.parser', 'html5lib'] # bs4 tree builders, fastest first; html5lib parses like a browser
+HTML_PARSER = setting('HTML_PARSER', 'lxml')
+
+@functools.lru_cache
+def html_parser(parser: str) -> str:
+    # Requested tree builder, or the standard library's if it is not installed
+    try:
+        BeautifulSoup('', parser)
+        return parser
+    except FeatureNotFound:
+        log(f'HTML parser {parser} not installed, using html.parser')
+        return 'html.parser'
+
+def soup(markup: str, parser: str = '', parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    # parse_only builds just the matching tags and their contents (html5lib does not support it and builds the whole page)
+    parser = html_parser(parser if parser != '' else HTML_PARSER)
+    return BeautifulSoup(markup, parser, parse_only = parse_only if parser != 'html5lib' else None)
+
+# Strainers that build only the parts of a page we read
+roster_card_classes = {'s-person-card', 'sidearm-roster-player-container'}
+roster_content = SoupStrainer(lambda name, attrs: (name == 'table') | ((name == 'div') & (len(roster_card_classes & set(attrs.get('class', '').split())) > 0))) # roster cards and tables
+box_score_links = SoupStrainer('a', href = lambda href: (href != None) and ('/boxscore' in href.replace('_', '')))
+
+def script_text(html: str, marker: str) -> str | None:
+    # Contents of the first <script> containing marker, found by scanning the markup instead of parsing it
+    lower = html.lower()
+    start = html.find(marker)
+    while start != -1:
+        open_tag = lower.rfind('<script', 0, start)
+        if (open_tag != -1) and (lower.rfind('</script', open_tag, start) == -1):
+            content_start = html.find('>', open_tag) + 1
+            if content_start <= start: # marker is in the script, not in its attributes
+                content_end = lower.find('</script', start)
+                return html[content_start:content_end if content_end != -1 else len(html)]
+        start = html.find(marker, start + len(marker))
+    return None
+
+# Page cache
+page_ttls = { # hours a cached page is used without asking the server again
+    ROSTER: 20,
+    PLAYER: 12,
+    STATS: 12,
+    BOX_SCORE: 24 * 30, # final box scores do not change
+    SCHEDULE: 12
+}
+
+def normalize_url(url: str) -> str:
+    parts = urlparse(url.split('#')[0])
+    query = '&'.join(sorted(parts.query.split('&'))) if parts.query != '' else ''
+    return f'{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip("/")}{"?" + query if query != "" else ""}'
+
+class PageCache:
+    # Pages saved to disk as gzipped JSON, named by page type and normalized URL
+    __REVALIDATE_DAYS__ = 7 # keep stale pages with an ETag or Last-Modified this long for conditional requests
+
+    def __init__(self, directory: str, ttls: dict[str, float], enabled: bool = True):
+        self.__directory__ = directory
+        self.__ttls__ = ttls
+        self.__enabled__ = enabled
+        self.__pruned__ = False
+
+    def enabled(self, url: str) -> bool:
+        return self.__enabled__ & (page_type(url) in self.__ttls__)
+
+    def __path__(self, url: str) -> str:
+        return os.path.join(self.__directory__, f'{page_type(url)}-{hashlib.sha1(normalize_url(url).encode()).hexdigest()}.json.gz')
+
+    def get(self, url: str) -> dict | None:
+        if not self.enabled(url):
+            return None
+        if not self.__pruned__:
+            self.prune()
+        try:
+            with gzip.open(self.__path__(url), 'rt') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry['age'] = time.time() - os.path.getmtime(self.__path__(url))
+        return entry
+
+    def fresh(self, url: str, entry: dict) -> bool:
+        return entry['age'] < self.__ttls__[page_type(url)] * 3600
+
+    def put(self, url: str, entry: dict):
+        if not self.enabled(url):
+            return
+        os.makedirs(self.__directory__, exist_ok = True)
+        path = self.__path__(url)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with gzip.open(temp_path, 'wt') as f:
+            json.dump({key: value for key, value in entry.items() if key != 'age'}, f)
+        os.replace(temp_path, path) # never leave a half-written page behind
+
+    def touch(self, url: str):
+        # Server confirmed the cached page is still current
+        os.utime(self.__path__(url))
+
+    def prune(self):
+        self.__pruned__ = True
+        if not os.path.isdir(self.__directory__):
+            return
+        for file_name in os.listdir(self.__directory__):
+            path = os.path.join(self.__directory__, file_name)
+            max_age = (self.__ttls__.get(file_name.split('-')[0], 0) / 24 + self.__REVALIDATE_DAYS__) * 86400
+            if time.time() - os.path.getmtime(path) > max_age:
+                os.remove(path)
+
+CACHE_DIR = setting('CACHE_DIR', '.cache')
+
+page_cache = PageCache(os.path.join(CACHE_DIR, 'pages'), page_ttls, enabled = setting('PAGE_CACHE', 'on') == 'on')
+
+# Sessions
+class SessionStore:
+    # Cookies, including WAF challenge tokens, saved per domain so later browsers and the HTTP client skip the challenge
+    __SESSION_COOKIE_HOURS__ = 12 # cookies without an expiry are reused this long after they were saved
+
+    def __init__(self, directory: str, enabled: bool = True):
+        self.__directory__ = directory
+        self.__enabled__ = enabled
+        self.__sessions__: dict[str, dict] = dict() # domain: {'saved': timestamp, 'cookies': list of CDP style cookies}
+        self.__versions__: dict[str, int] = dict() # bumped on every change so each HTTP session knows to reload
+        self.__lock__ = threading.Lock()
+
+    def __path__(self, domain: str) -> str:
+        return os.path.join(self.__directory__, f'{domain}.json')
+
+    def __session__(self, domain: str) -> dict:
+        if domain not in self.__sessions__:
+            try:
+                with open(self.__path__(domain)) as f:
+                    self.__sessions__[domain] = json.load(f)
+            except (OSError, ValueError):
+                self.__sessions__[domain] = {'saved': 0, 'cookies': list()}
+        return self.__sessions__[domain]
+
+    def version(self, domain: str) -> int:
+        return self.__versions__.get(domain, 0)
+
+    def cookies(self, domain: str) -> list[dict]:
+        if not self.__enabled__:
+            return list()
+        with self.__lock__:
+            session = self.__session__(domain)
+        now = time.time()
+        session_cookies_expire = session['saved'] + self.__SESSION_COOKIE_HOURS__ * 3600
+        return [cookie for cookie in session['cookies'] if (cookie.get('expires', -1) if cookie.get('expires', -1) > 0 else session_cookies_expire) > now]
+
+    def cookie_dict(self, domain: str) -> dict[str, str]:
+        return {cookie['name']: cookie['value'] for cookie in self.cookies(domain)}
+
+    def save(self, domain: str, cookies: list[dict]):
+        if (not self.__enabled__) | (len(cookies) == 0):
+            return
+        cookies = [{key: cookie[key] for key in ['name', 'value', 'domain', 'path', 'expires', 'secure', 'httpOnly'] if key in cookie} for cookie in cookies]
+        with self.__lock__:
+            session = self.__session__(domain)
+            if sorted(session['cookies'], key = lambda x: x['name']) == sorted(cookies, key = lambda x: x['name']):
+                return
+            session.update({'saved': time.time(), 'cookies': cookies})
+            self.__versions__[domain] = self.version(domain) + 1
+            os.makedirs(self.__directory__, exist_ok = True)
+            temp_path = f'{self.__path__(domain)}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(session, f)
+            os.replace(temp_path, self.__path__(domain))
+
+session_store = SessionStore(os.path.join(CACHE_DIR, 'sessions'), enabled = setting('SESSION_STORE', 'on') == 'on')
+
+def load_http_session(session: curl_requests.Session, url: str):
+    # Copy stored cookies into this thread's HTTP session whenever the store has newer ones
+    host = domain(url)
+    if not hasattr(http_sessions, 'versions'):
+        http_sessions.versions = dict()
+    if http_sessions.versions.get(host, -1) == session_store.version(host):
+        return
+    http_sessions.versions[host] = session_store.version(host)
+    for cookie in session_store.cookies(host):
+        session.cookies.jar.set_cookie(requests.cookies.create_cookie(
+            cookie['name'], cookie['value'], domain = cookie.get('domain', host), path = cookie.get('path', '/'),
+            secure = cookie.get('secure', False), expires = int(cookie['expires']) if cookie.get('expires', -1) > 0 else None
+        ))
+
+def save_http_session(session: curl_requests.Session, url: str):
+    host = domain(url)
+    cookies = [
+        {'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path, 'expires': cookie.expires if cookie.expires != None else -1, 'secure': cookie.secure}
+        for cookie in session.cookies.jar if host.endswith(cookie.domain.lstrip('.'))
+    ]
+    session_store.save(host, cookies)
+    http_sessions.versions[host] = session_store.version(host)
+
+def load_browser_session(driver, url: str):
+    cookies = [{key: value for key, value in cookie.items() if (key != 'expires') | (value > 0)} for cookie in session_store.cookies(domain(url))]
+    if len(cookies) > 0:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+
+def save_browser_session(driver, url: str):
+    session_store.save(domain(url), driver.execute_cdp_cmd('Network.getCookies', {'urls': [url]})['cookies'])
+
+# Run journal
+class RunJournal:
+    # Units of work (schools, players, pages) finished by a run, appended as JSON lines so a crashed or timed out job resumes where it stopped
+    __KEEP_DAYS__ = 7
+
+    def __init__(self, directory: str, name: str, run_id: str, enabled: bool = True):
+        self.__path__ = os.path.join(directory, f'{name}-{re.sub(r"[^A-Za-z0-9_.-]", "_", run_id)}.jsonl')
+        self.__enabled__ = enabled
+        self.__units__: dict[str, object] = dict() # unit: result saved with it
+        self.__lock__ = threading.Lock()
+        if not enabled:
+            return
+        os.makedirs(directory, exist_ok = True)
+        for file_name in os.listdir(directory):
+            if time.time() - os.path.getmtime(os.path.join(directory, file_name)) > self.__KEEP_DAYS__ * 86400:
+                os.remove(os.path.join(directory, file_name))
+        if os.path.exists(self.__path__):
+            with open(self.__path__) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue # line cut off by the crash
+                    self.__units__[entry['unit']] = entry['result']
+            log(f'Resuming run: {len(self.__units__)} units already done ({self.__path__})')
+
+    def done(self, unit: str) -> bool:
+        return unit in self.__units__
+
+    def result(self, unit: str):
+        return self.__units__.get(unit)
+
+    def complete(self, unit: str, result = None):
+        with self.__lock__:
+            self.__units__[unit] = result
+            if self.__enabled__:
+                with open(self.__path__, 'a') as f:
+                    f.write(f'{json.dumps({"unit": unit, "result": result})}\n')
+
+def run_journal(name: str, run_id: str) -> RunJournal:
+    return RunJournal(os.path.join(CACHE_DIR, 'journal'), name, run_id, enabled = setting('RUN_JOURNAL', 'on') == 'on')
+
+HEADLESS = setting('HEADLESS', 'on') == 'on'
+BLOCK_RESOURCES = setting('BLOCK_RESOURCES', 'on') == 'on'
+
+blocked_url_patterns = [ # never downloaded by the scraping browser
+    # Media
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.mp4', '*.webm', '*.m3u8',
+    # Fonts and stylesheets
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*.css',
+    # Ads, analytics and social widgets
+    '*google-analytics.com*', '*googletagmanager.com*', '*googlesyndication.com*', '*doubleclick.net*', '*adservice.google.com*',
+    '*amazon-adsystem.com*', '*adsrvr.org*', '*taboola.com*', '*outbrain.com*', '*scorecardresearch.com*', '*quantserve.com*',
+    '*facebook.net*', '*connect.facebook.com*', '*platform.twitter.com*', '*hotjar.com*', '*chartbeat.com*', '*nr-data.net*', '*krxd.net*'
+]
+allowed_url_patterns: dict[str, list[str]] = json.loads(setting('ALLOWED_URL_PATTERNS', '{}')) # domain: blocked patterns to load anyway, e.g. {"stats.ncaa.org": ["*.css"]}
+
+def block_resources(driver, url: str):
+    allowed = allowed_url_patterns.get(domain(url), list())
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': [pattern for pattern in blocked_url_patterns if pattern not in allowed]})
+
+def new_driver(profile: str | None = None):
+    log_ip_address()
     log('Setting up new driver')
     chrome_options = uc.ChromeOptions()
-    # chrome_options.add_argument('--headless=new')
+    if profile != None:
+        chrome_options.add_argument(f'--user-data-dir={os.path.abspath(profile)}') # keeps cookies and local storage between runs
     # chrome_options.add_argument(f'user-agent={headers}')
     # chrome_options.add_argument('--disable-dev-shm-usage')
     # chrome_options.add_argument('--disable-blink-features=AutomationControlled')
@@ -244,15 +703,118 @@ def new_driver():
     chrome_options.add_argument("--proxy-server=http://127.0.0.1:8080")
     chrome_options.set_capability('unhandledPromptBehavior', 'accept')
     chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-    return uc.Chrome(options = chrome_options, version_main = 146)
+    driver = uc.Chrome(options = chrome_options, version_main = 146, headless = HEADLESS)
+    if BLOCK_RESOURCES:
+        driver.execute_cdp_cmd('Network.enable', dict())
+    return driver
+
+class DriverPool:
+    def __init__(self, size: int = 1, profile_directory: str | None = None):
+        self.__size__ = size
+        self.__drivers__ = list()
+        self.__profile_directory__ = profile_directory # each pool slot reuses its own Chrome profile across runs
+        self.__profiles__ = dict() # id(driver): profile path
+        self.__idle__ = queue.LifoQueue() # most recently used driver first
+        self.__lock__ = threading.Lock()
+        self.__create_lock__ = threading.Lock() # undetected_chromedriver patches its binary, so launch one at a time
+
+    def size(self) -> int:
+        return self.__size__
+
+    def lease(self):
+        # Reuse an idle driver, launch a new one while under the pool size, otherwise wait for one to be released
+        while True:
+            try:
+                driver = self.__idle__.get_nowait()
+            except queue.Empty:
+                with self.__lock__:
+                    launch = len(self.__drivers__) < self.__size__
+                    if launch:
+                        self.__drivers__.append(None) # reserve a slot
+                if launch:
+                    return self.__launch__()
+                driver = self.__idle__.get()
+            if self.healthy(driver):
+                return driver
+            self.__discard__(driver)
+
+    def release(self, driver):
+        if driver != None:
+            self.__idle__.put(driver)
+
+    def __launch__(self):
+        profile = None
+        with self.__lock__: # reserve a profile before launching, so no two browsers share one
+            if self.__profile_directory__ != None:
+                profile = next(path for path in [os.path.join(self.__profile_directory__, str(i)) for i in range(self.__size__)] if path not in self.__profiles__.values())
+                self.__profiles__[profile] = profile # keyed by id(driver) once it has launched
+        try:
+            with self.__create_lock__:
+                driver = new_driver(profile = profile)
+        except:
+            with self.__lock__:
+                self.__drivers__.remove(None)
+                self.__profiles__.pop(profile, None)
+            raise
+        with self.__lock__:
+            self.__drivers__[self.__drivers__.index(None)] = driver
+            self.__profiles__[id(driver)] = self.__profiles__.pop(profile, profile)
+        return driver
 
-driver = new_driver()
+    def __discard__(self, driver):
+        log('Replacing unresponsive driver')
+        try:
+            driver.quit()
+        except:
+            pass
+        with self.__lock__:
+            self.__drivers__.remove(driver)
+            self.__profiles__.pop(id(driver), None)
 
-def get(url: str, attempt = 1):
+    @staticmethod
+    def healthy(driver) -> bool:
+        try:
+            return len(driver.window_handles) > 0 # raises if the browser has crashed or the session is gone
+        except:
+            return False
+
+    def quit(self):
+        with self.__lock__:
+            drivers, self.__drivers__ = [driver for driver in self.__drivers__ if driver != None], list()
+            self.__profiles__ = dict()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
+
+DRIVER_POOL_SIZE = int(setting('DRIVER_POOL_SIZE', 2))
+WORKERS = int(setting('WORKERS', DRIVER_POOL_SIZE)) # schools or players processed at once
+
+driver_pool = DriverPool(size = DRIVER_POOL_SIZE, profile_directory = os.path.join(CACHE_DIR, 'profiles') if setting('BROWSER_PROFILES', 'on') == 'on' else None)
+
+def get(url: str, driver, attempt = 1):
+    if attempt == 1:
+        driver.get_log('performance') # clear entries left over from the previous page
+        if BLOCK_RESOURCES:
+            block_resources(driver, url)
+        load_browser_session(driver, url)
+    rate_limiter.acquire(domain(url))
     try:
         driver.get(url)
     except:
-        pause(None)
+        time.sleep(1)
         if attempt == 1:
-            return get(url, attempt = 2)
+            return get(url, driver, attempt = 2)
     return driver
+
+def concurrent_map(function, items: list, workers: int = WORKERS):
+    # Yield function(item) for each item, in order, while only working a few items ahead of the consumer
+    with ThreadPoolExecutor(max_workers = workers) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(function, item))
+            if len(futures) >= 2 * workers:
+                yield futures.popleft().result()
+        while len(futures) > 0:
+            yield futures.popleft().result()
@@ -1,27 +1,115 @@
 import cbn_utils
+import local_store
+import leaderboard
+import rosters
+import schema
 import os
 import json
+import hashlib
+import functools
+import threading
+import time
+import random
+from collections import deque
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 import re
 import pandas as pd
 
+class QuotaClient(gspread.Client):
+    # gspread client that sends Sheets requests as fast as the per-minute read and write quotas allow (no fixed pause per call),
+    # lets threads making the same read at the same time share one response, and backs off exponentially only on 429s and 5xxs
+    def __init__(self, auth, session = None, quota: dict[str, int] = json.loads(cbn_utils.setting('SHEETS_QUOTA', '{"read": 60, "write": 60}')),
+                 retries: int = int(cbn_utils.setting('SHEETS_RETRIES', 6))):
+        super().__init__(auth, session = session)
+        self.__quota__ = quota # requests per minute for each kind
+        self.__sent__: dict[str, deque] = {kind: deque() for kind in quota.keys()} # send times in the last minute
+        self.__in_flight__: dict[tuple, dict] = dict() # reads being sent, for coalescing
+        self.__retries__ = retries
+        self.__quota_lock__ = threading.Lock()
+
+    def __budget__(self, kind: str):
+        # Block until a request of this kind fits in the last minute's budget
+        while True:
+            with self.__quota_lock__:
+                now = time.monotonic()
+                sent = self.__sent__[kind]
+                while (len(sent) > 0) and (sent[0] <= now - 60):
+                    sent.popleft()
+                if len(sent) < self.__quota__[kind]:
+                    sent.append(now)
+                    return
+                wait = sent[0] + 60 - now
+            time.sleep(wait)
+
+    def __send__(self, kind: str | None, *args, **kwargs):
+        for attempt in range(self.__retries__ + 1):
+            if kind != None:
+                self.__budget__(kind)
+            try:
+                return super().request(*args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status_code = e.response.status_code
+                if ((status_code != 429) & (status_code < 500)) | (attempt == self.__retries__):
+                    raise
+                delay = min(2 ** attempt, 64) + random.random()
+                cbn_utils.log(f'Google Sheets returned {status_code}... retrying in {round(delay, 1)}s')
+                time.sleep(delay)
+
+    def request(self, method, endpoint, params = None, data = None, json = None, files = None, headers = None):
+        # Only Sheets API calls count against the quota (opening a spreadsheet by name goes through Drive)
+        kind = None if cbn_utils.SHEETS_DOMAIN not in endpoint else 'read' if method.lower() == 'get' else 'write'
+        kwargs = {'params': params, 'data': data, 'json': json, 'files': files, 'headers': headers}
+        if kind != 'read':
+            return self.__send__(kind, method, endpoint, **kwargs)
+
+        key = (endpoint, repr(sorted(params.items()) if isinstance(params, dict) else params))
+        with self.__quota_lock__:
+            flight = self.__in_flight__.get(key)
+            leader = flight == None
+            if leader:
+                flight = {'done': threading.Event()}
+                self.__in_flight__[key] = flight
+        if not leader:
+            flight['done'].wait() # same read already on its way
+            if 'error' in flight:
+                raise flight['error']
+            return flight['response']
+        try:
+            flight['response'] = self.__send__(kind, method, endpoint, **kwargs)
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self.__quota_lock__:
+                del self.__in_flight__[key]
+            flight['done'].set()
+        return flight['response']
+
 class GoogleSpreadsheet:
     def __init__(self):
-        # get API key
-        self.__set_api_key__('other/canadians-in-college-baseball/canadians-in-college-baseball-c74c89028d45.json')
-
-        # authorize the clientsheet
-        self.__client__: gspread.Client = gspread.authorize(
-            ServiceAccountCredentials.from_json_keyfile_dict(
-                json.loads(os.environ.get('GOOGLE_CLOUD_API_KEY')),
-                [
-                    'https://spreadsheets.google.com/feeds',
-                    'https://www.googleapis.com/auth/drive'
-                ]
-            )
-        )
+        self.__client__: gspread.Client | None = None
+        self.__lock__ = threading.Lock()
+
+    def client(self) -> gspread.Client:
+        with self.__lock__:
+            if self.__client__ == None:
+                # get API key
+                self.__set_api_key__('other/canadians-in-college-baseball/canadians-in-college-baseball-c74c89028d45.json')
+
+                # authorize the clientsheet
+                self.__client__ = gspread.authorize(
+                    ServiceAccountCredentials.from_json_keyfile_dict(
+                        json.loads(os.environ.get('GOOGLE_CLOUD_API_KEY')),
+                        [
+                            'https://spreadsheets.google.com/feeds',
+                            'https://www.googleapis.com/auth/drive'
+                        ]
+                    ),
+                    client_factory = QuotaClient
+                )
+        return self.__client__
 
     def __set_api_key__(self, file_name: str):
         if os.path.isfile(file_name):
@@ -35,7 +123,7 @@ class GoogleSpreadsheet:
         # Check values
         cbn_utils.check_string_arg(name = 'name', value = name, disallowed_values = [''])
 
-        spreadsheet = self.__client__.open(name)
+        spreadsheet = self.client().open(name)
         cbn_utils.log(f'Connected to {name} spreadsheet...')
         return spreadsheet
 
@@ -45,9 +133,120 @@ def df(worksheet: gspread.Worksheet) -> pd.DataFrame:
         return pd.DataFrame(all_values[1:], columns = all_values[0])
     return pd.DataFrame()
 
-google_spreadsheet = GoogleSpreadsheet()
-hub_spreadsheet = google_spreadsheet.spreadsheet(name = 'Canadians in College Baseball Hub')
-config = {row['key']: row['value'] for _, row in df(hub_spreadsheet.worksheet('Configuration')).iterrows()}
+class WorksheetCopy:
+    # Worksheet read once into memory and indexed by a column; appends and cell updates are kept locally and written back in bulk
+    def __init__(self, worksheet: gspread.Worksheet, index_col: str):
+        self.__worksheet__ = worksheet
+        self.__index_col__ = index_col
+        self.__df__ = hub_store.df(worksheet.title) if hub_store.tracks(worksheet.title) else df(worksheet)
+        self.__columns__: list[str] = list(self.__df__.columns)
+        self.__rows__: list[list] = self.__df__.values.tolist() # sheet row n is self.__rows__[n - 2]
+        self.__saved_row_count__ = len(self.__rows__)
+        self.__index__: dict[str, list[int]] = dict() # index_col value: sheet row numbers
+        for position, key in enumerate(self.__df__[index_col] if index_col in self.__columns__ else list()):
+            self.__index__.setdefault(key, list()).append(position + 2)
+        self.__updates__: dict[tuple[int, int], object] = dict() # (sheet row, column number): value to write
+
+    def columns(self) -> list[str]:
+        return self.__columns__
+
+    def rows(self, key: str) -> pd.DataFrame:
+        # Current rows for a key, with their sheet row number in the "row" column
+        row_numbers = self.__index__.get(key, list())
+        rows_df = pd.DataFrame([self.__rows__[row - 2] for row in row_numbers], columns = self.__columns__)
+        rows_df['row'] = row_numbers
+        return rows_df
+
+    def df(self) -> pd.DataFrame:
+        return pd.DataFrame(self.__rows__, columns = self.__columns__)
+
+    def append(self, rows: list[list]):
+        for row in rows:
+            row = list(row) + [''] * (len(self.__columns__) - len(row))
+            self.__rows__.append(row)
+            self.__index__.setdefault(row[self.__columns__.index(self.__index_col__)], list()).append(len(self.__rows__) + 1)
+
+    def update(self, row: int, col: str, values: list):
+        # Set consecutive cells in a row, starting at column col
+        first_col = self.__columns__.index(col)
+        for offset, value in enumerate(values):
+            self.__rows__[row - 2][first_col + offset] = value
+            if row - 2 < self.__saved_row_count__:
+                self.__updates__[(row, first_col + offset + 1)] = value # appended rows are written with their latest values
+
+    def pending(self) -> int:
+        return len(self.__updates__) + len(self.__rows__) - self.__saved_row_count__
+
+    def flush(self):
+        writer = BatchWriter(self.__worksheet__, max_updates = len(self.__updates__) + 1)
+        for (row, col), value in self.__updates__.items():
+            writer.update(gspread.utils.rowcol_to_a1(row, col), value)
+        writer.flush()
+        self.__updates__ = dict()
+        if len(self.__rows__) > self.__saved_row_count__:
+            new_rows = [row[:max([i + 1 for i, value in enumerate(row) if value != ''] + [1])] for row in self.__rows__[self.__saved_row_count__:]] # leave trailing cells untouched
+            self.__worksheet__.append_rows(new_rows)
+            hub_store.append(self.__worksheet__.title, new_rows)
+            self.__saved_row_count__ = len(self.__rows__)
+
+class BatchWriter:
+    # Write-behind buffer of range updates for a worksheet, sent as one values.batchUpdate when it gets big or old enough
+    def __init__(self, worksheet: gspread.Worksheet, journal: cbn_utils.RunJournal | None = None,
+                 max_updates: int = int(cbn_utils.setting('BATCH_MAX_UPDATES', 500)), max_seconds: float = float(cbn_utils.setting('BATCH_MAX_SECONDS', 60))):
+        self.__worksheet__ = worksheet
+        self.__journal__ = journal
+        self.__max_updates__ = max_updates
+        self.__max_seconds__ = max_seconds
+        self.__updates__: dict[str, list[list]] = dict() # range: values, the last write to a range wins
+        self.__units__: list[str] = list() # journal units to complete once their updates are saved
+        self.__oldest__ = None
+
+    def update(self, range_name: str, values):
+        self.__updates__[range_name] = values if isinstance(values, list) else [[values]]
+        if self.__oldest__ == None:
+            self.__oldest__ = time.time()
+        if (len(self.__updates__) >= self.__max_updates__) | (time.time() - self.__oldest__ >= self.__max_seconds__):
+            self.flush()
+
+    def complete(self, unit: str):
+        # Record a journal unit after everything buffered so far has been written
+        if self.__journal__ == None:
+            return
+        if len(self.__updates__) == 0:
+            self.__journal__.complete(unit)
+        else:
+            self.__units__.append(unit)
+
+    def pending(self) -> int:
+        return len(self.__updates__)
+
+    def flush(self):
+        if len(self.__updates__) > 0:
+            self.__worksheet__.batch_update([{'range': range_name, 'values': values} for range_name, values in self.__updates__.items()])
+            cbn_utils.log(f'Wrote {len(self.__updates__)} ranges to {self.__worksheet__.title}')
+            for range_name, values in self.__updates__.items():
+                hub_store.apply(self.__worksheet__.title, range_name, values)
+        self.__updates__, self.__oldest__ = dict(), None
+        for unit in self.__units__:
+            self.__journal__.complete(unit)
+        self.__units__ = list()
+
+google_spreadsheet = GoogleSpreadsheet() # authorizes on first use
+
+@functools.cache
+def hub_spreadsheet() -> gspread.Spreadsheet:
+    return google_spreadsheet.spreadsheet(name = 'Canadians in College Baseball Hub')
+
+hub_store = local_store.LocalStore( # system of record for the Hub's data tabs while a task runs
+    os.path.join(cbn_utils.CACHE_DIR, 'hub.sqlite'),
+    ['Schools', 'Players', 'Players (Manual)', 'Players (Minors)', 'Corrections', 'Coaches'],
+    spreadsheet = hub_spreadsheet,
+    parse = schema.typed
+)
+
+@functools.cache
+def config() -> dict[str, str]:
+    return {row['key']: row['value'] for _, row in df(hub_spreadsheet().worksheet('Configuration')).iterrows()}
 
 def set_sheet_header(worksheet: gspread.Worksheet, sort_by: list = [], with_filter: bool = True, freeze_cols: int = 0):
     worksheet.clear_basic_filter() # Remove previous data filter
@@ -63,142 +262,73 @@ def set_sheet_header(worksheet: gspread.Worksheet, sort_by: list = [], with_filt
     if (row_count > 0) & (len(sort_by) > 0):
         worksheet.sort(*tuple((columns.index(col) + 1, 'asc') for col in sort_by if col in columns), range = f'A2:{gspread.utils.rowcol_to_a1(row_count, len(columns))}')
     worksheet.columns_auto_resize(start_column_index = 0, end_column_index = len(columns) - 1) # Resize column
+    hub_store.invalidate(worksheet.title) # rows were re-ordered
 
 def update_canadians_sheet():
     col_widths = {'Name': 160, 'Position': 83, 'School': 295, 'State': 40, 'Hometown': 340}
     blank_row = ['' for _ in col_widths.keys()]
 
-    players_worksheet = hub_spreadsheet.worksheet('Players')
-    players_manual_spreadsheet = hub_spreadsheet.worksheet('Players (Manual)')
-    schools_worksheet = hub_spreadsheet.worksheet('Schools')
-    players_df = pd.merge(
-        pd.concat(
-            [
-                df(players_worksheet),
-                df(players_manual_spreadsheet)
-            ],
-            ignore_index = True
-        ),
-        df(schools_worksheet),
-        how = 'inner',
-        left_on = 'school_roster_url',
-        right_on = 'roster_url'
-    )
+    players_df = hub_store.join(['Players', 'Players (Manual)'], 'Schools', left_on = 'school_roster_url', right_on = 'roster_url', typed = True)
 
     players_df.drop_duplicates(subset = ['roster_url', 'last_name', 'first_name'], inplace = True) # keep first (highest league for a school)
     players_df.rename({'positions': 'Position', 'name': 'School', 'state': 'State'}, axis = 1, inplace = True)
     players_df.sort_values(by = ['last_name', 'first_name'], ignore_index = True, inplace = True)
-    players_df['Name'] = players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
-    players_df['Hometown'] = players_df.apply(lambda row: f'{row["city"]}, {row["province"]}' if (row['city'] != '') & (row['province'] != '') else row['city'] if row['city'] != '' else row['province'], axis = 1)
-    players_df['Position'] = players_df.apply(lambda row: row['Position'].replace('P', f'{row["throws"]}HP'), axis = 1)
+    players_df['Name'] = rosters.names(players_df)
+    players_df['Hometown'] = rosters.hometowns(players_df)
+    players_df['Position'] = rosters.positions(players_df, column = 'Position')
 
     # initialize summary data
     now = datetime.now()
     summary_data = [
         ['Canadian Baseball Network', '', '', '', f'Last updated: {now.strftime("%B %d, %Y")}'],
-        ['Pete Berryman', '', '', '', '' if str(now.year) == config['YEAR'] else (u'\u26A0' + ' If a player is missing from this list, it could be because')],
-        ['', '', '', '', '' if str(now.year) == config['YEAR'] else f'many schools have not yet posted their {config["YEAR"]} rosters.'],
+        ['Pete Berryman', '', '', '', '' if str(now.year) == config()['YEAR'] else (u'\u26A0' + ' If a player is missing from this list, it could be because')],
+        ['', '', '', '', '' if str(now.year) == config()['YEAR'] else f'many schools have not yet posted their {config()["YEAR"]} rosters.'],
         ['Total', f'{len(players_df.index)} players', '', '', ''],
         blank_row
     ]
 
-    coach_data = [
-        ['Coaches', '', '', '', ''],
-        blank_row
-    ]
-    coaches_worksheet = hub_spreadsheet.worksheet('Coaches')
-    coaches_df = pd.merge(
-        df(coaches_worksheet),
-        df(schools_worksheet),
-        how = 'inner',
-        left_on = 'school',
-        right_on = 'roster_url'
-    )
+    coaches_df = hub_store.join(['Coaches'], 'Schools', left_on = 'school', right_on = 'roster_url', typed = True)
     coaches_df.rename({'positions': 'Position', 'name': 'School', 'state': 'State'}, axis = 1, inplace = True)
-    coaches_df['Name'] = coaches_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
-    coaches_df['Hometown'] = coaches_df.apply(lambda row: f'{row["city"]}, {row["province"]}' if (row['city'] != '') & (row['province'] != '') else row['city'] if row['city'] != '' else row['province'], axis = 1)
-
-    # Loop through divisions
-    player_data = list()
-    for league in cbn_utils.leagues:
-        league, division, label = league['league'], league['division'], league['label']
-        # Subset dataframe
-        df_split_div = players_df[players_df['league'] == league].copy()
-        if league != 'NAIA': # Ignore NAIA divisions but use for other leagues
-            df_split_div = df_split_div[df_split_div['division'] == division].copy()
-        df_split_div.drop(['league', 'division'], axis = 1, inplace = True)
-        if len(df_split_div.index) > 0:
-            # Row/Division Header
-            player_data.append([label, '', '', '', ''])
-
-        for class_year in ['Freshman', 'Sophomore', 'Junior', 'Senior']:
-            df_split_class = pd.DataFrame()
-            if class_year == 'Freshman':
-                df_split_class = df_split_div[df_split_div['year'].isin([class_year, ''])].drop(['year'], axis=1)
-                class_year = 'Freshmen'
-            else:
-                df_split_class = df_split_div[df_split_div['year'] == class_year].drop(['year'], axis=1)
-                if len(df_split_class.index) > 0:
-                    player_data.append(blank_row)
-                class_year += 's'
-            if len(df_split_class.index) > 0:
-                player_data += [[class_year, '', '', '', ''], list(col_widths.keys())] + df_split_class[list(col_widths.keys())].values.tolist()
-
-        # Compile data rows
-        if len(df_split_div.index) > 0:
-            player_data.append(blank_row)
-            summary_data.append([label + ' ', f'{len(df_split_div.index)} players', '', '', ''])
-
-        coaches_split_div = coaches_df[coaches_df['league'] == league].copy()
-        if league != 'NAIA': # Ignore NAIA divisions but use for other leagues
-            coaches_split_div = coaches_split_div[coaches_split_div['division'] == division].copy()
-        coaches_split_div.drop(['league', 'division'], axis = 1, inplace = True)
-        if len(coaches_split_div.index) > 0:
-            coach_data += [[label, '', '', '', ''], list(col_widths.keys())] + coaches_split_div[list(col_widths.keys())].values.tolist() + [blank_row]
+    coaches_df['Name'] = rosters.names(coaches_df)
+    coaches_df['Hometown'] = rosters.hometowns(coaches_df)
+
+    # Divisions (and class years within them) in one sorted pass each for players and coaches
+    league_labels = [league['label'] for league in cbn_utils.leagues]
+    player_data, player_counts = rosters.blocks(players_df, leaderboard.league_groups(players_df, cbn_utils.leagues), league_labels, list(col_widths.keys()), classes = rosters.class_years(players_df))
+    summary_data += [[league_labels[group] + ' ', f'{count} players', '', '', ''] for group, count in player_counts.items()]
+    coach_data = [['Coaches', '', '', '', ''], blank_row] + rosters.blocks(coaches_df, leaderboard.league_groups(coaches_df, cbn_utils.leagues), league_labels, list(col_widths.keys()))[0]
 
     # Add data to sheets
     data = summary_data + [blank_row] + player_data + coach_data
     data.pop()
+    cbn_utils.leagues.append({'league': '', 'division': '', 'label': 'Coaches'})
+    layout = {'summary_rows': len(summary_data), 'col_widths': list(col_widths.values()), **layout_rows(data, format_patterns())}
+    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'Canadians in College {config()["YEAR"]}')
+    # year_spreadsheet = google_spreadsheet.spreadsheet(name = 'Test - Canadians in College')
+    year_worksheet = year_spreadsheet.get_worksheet(0)
     try:
-        canadians_in_college_worksheet = hub_spreadsheet.worksheet('Canadians in College')
-        hub_spreadsheet.del_worksheet(canadians_in_college_worksheet)
-    except:
+        canadians_in_college_worksheet = hub_spreadsheet().worksheet('Canadians in College')
+        if publish_changes('Canadians in College', data, layout, [canadians_in_college_worksheet, year_worksheet]):
+            return # same layout, so only changed cells were sent
+        hub_spreadsheet().del_worksheet(canadians_in_college_worksheet)
+    except gspread.WorksheetNotFound:
         pass
-    canadians_in_college_worksheet = hub_spreadsheet.add_worksheet('Canadians in College', rows = 1, cols = 1)
+    canadians_in_college_worksheet = hub_spreadsheet().add_worksheet('Canadians in College', rows = 1, cols = 1)
     canadians_in_college_worksheet.insert_rows(data)
 
     # Visual formatting
-    cbn_utils.leagues.append({'league': '', 'division': '', 'label': 'Coaches'})
-    format_sheet(hub_spreadsheet, canadians_in_college_worksheet, total_rows = len(data), summary_data_rows = len(summary_data), col_widths_dict = col_widths)
+    format_sheet(hub_spreadsheet(), canadians_in_college_worksheet, total_rows = len(data), summary_data_rows = len(summary_data), col_widths_dict = col_widths, layout = layout)
 
     # Copy sheet from Hub to Shared sheet
-    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'Canadians in College {config["YEAR"]}')
-    # year_spreadsheet = google_spreadsheet.spreadsheet(name = 'Test - Canadians in College')
-    year_worksheet = year_spreadsheet.get_worksheet(0)
     copy_and_paste_sheet(year_spreadsheet, canadians_in_college_worksheet, year_worksheet)
+    save_published(layout, [canadians_in_college_worksheet, year_worksheet])
 
 def update_stats_sheet():
     col_widths = {'Rank': 50, 'Name': 170, 'Position': 75, 'School': 295, 'Stat': 200}
     blank_row = ['' for _ in col_widths.keys()]
 
-    players_worksheet = hub_spreadsheet.worksheet('Players')
-    players_manual_spreadsheet = hub_spreadsheet.worksheet('Players (Manual)')
-    schools_worksheet = hub_spreadsheet.worksheet('Schools')
-    players_df = pd.merge(
-        pd.concat(
-            [
-                df(players_worksheet),
-                df(players_manual_spreadsheet)
-            ],
-            ignore_index = True
-        ),
-        df(schools_worksheet),
-        how = 'inner',
-        left_on = 'school_roster_url',
-        right_on = 'roster_url'
-    )
+    players_df = hub_store.join(['Players', 'Players (Manual)'], 'Schools', left_on = 'school_roster_url', right_on = 'roster_url', typed = True)
     players_df.rename({'positions': 'Position', 'name': 'School', 'state': 'State'}, axis = 1, inplace = True)
-    players_df['Name'] = players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
 
     # initialize summary data
     summary_data = [
@@ -217,99 +347,59 @@ def update_stats_sheet():
             elif stat not in ['GS', 'L', 'ER', 'HA', 'BB']:
                 pitching_stats.append(stat)
                 pitching_labels.append(f'{label} ({"G" if stat == "APP" else stat})')
-    players_df[batting_stats + pitching_stats] = players_df[batting_stats + pitching_stats].replace('', 0)
-
-    for league in cbn_utils.leagues:
-        league, division, label = league['league'], league['division'], league['label']
-        added_league_header = False
-        # Subset dataframe
-        df_split_div = players_df[players_df['league'] == league].copy()
-        if league != 'NAIA': # Ignore NAIA divisions but use for other leagues
-            df_split_div = df_split_div[df_split_div['division'] == division]
-        df_split_div.drop(['league', 'division'], axis = 1, inplace = True)
-        df_split_div.rename({'positions': 'Position'}, axis = 1, inplace = True)
-        for i, stat in enumerate(batting_stats + pitching_stats):
-            avg_flg = stat in ['AVG', 'OBP', 'SLG', 'OPS']
-            df_filtered = df_split_div.copy()
-            if avg_flg == True:
-                df_filtered[stat] = df_filtered[stat].astype(float).round(3)
-                df_filtered = df_filtered[(df_filtered['AB'].astype(float) >= 30) & (df_filtered[stat] > 0)] # At least 30 At Bats
-            elif stat == 'ERA':
-                df_filtered[stat] = df_filtered[stat].astype(float).round(2)
-                df_filtered = df_filtered[df_filtered['IP'].astype(float) >= 20] # At least 20 Innings Pitched
-            else:
-                if stat == 'IP':
-                    df_filtered[stat] = df_filtered[stat].astype(float).round(1)
-                else:
-                    df_filtered[stat] = df_filtered[stat].astype(int)
-                df_filtered = df_filtered[df_filtered[stat] > 0] # Eliminate 0's
-
-            if len(df_filtered.index) > 0:
-                df_filtered.sort_values(by = [stat, 'last_name', 'first_name'], ascending = [stat == 'ERA', True, True], ignore_index = True, inplace = True)
-
-                cutoff = df_filtered[stat].iloc[9] if len(df_filtered.index) >= 10 else df_filtered[stat].iloc[-1]
-                df_filtered = df_filtered[df_filtered[stat] <= cutoff] if stat == 'ERA' else df_filtered[df_filtered[stat] >= cutoff]
-                df_filtered['Rank'] = df_filtered[stat].rank(method = 'min', ascending = (stat == 'ERA')).astype(int)
-                df_filtered['tied'] = df_filtered['Rank'] == df_filtered['Rank'].shift()
-                df_filtered['Rank'] = df_filtered.apply(lambda row: None if row['tied'] else row['Rank'], axis = 1)
-                df_filtered['Name'] = df_filtered.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
-                stat_label = (batting_labels + pitching_labels)[i]
-                df_filtered = df_filtered[['Rank', 'Name', 'Position', 'School', stat]]
-                if stat == 'APP':
-                    df_filtered.rename({stat: 'G'}, inplace = True)
-
-                if len(df_filtered.index) > 0:
-                    if added_league_header == False:
-                        stats_data += [[label, '', '', '', '']]
-                        added_league_header = True
-                    if avg_flg == True:
-                        df_filtered[stat] = df_filtered[stat].apply(lambda x: '{0:.3f}'.format(x) if x >= 1 else '{0:.3f}'.format(x)[1:])
-                    elif stat == 'ERA':
-                        df_filtered[stat] = df_filtered[stat].apply(lambda x: '{0:.2f}'.format(x))
-                    stats_data += [[stat_label, '', '', '', ''], df_filtered.columns.values.tolist()] + df_filtered.fillna('').values.tolist() + [blank_row]
+
+    # Top 10 (with ties) for every league and stat
+    players_df['league_group'] = leaderboard.league_groups(players_df, cbn_utils.leagues)
+    leaders_df = leaderboard.leaders(players_df, 'league_group', batting_stats + pitching_stats)
+    stats_data += leaderboard.blocks(
+        players_df,
+        leaders_df,
+        group_labels = [league['label'] for league in cbn_utils.leagues],
+        stat_labels = dict(zip(batting_stats + pitching_stats, batting_labels + pitching_labels))
+    )
 
     # Add data to sheets
     data = summary_data + [blank_row] + stats_data
     data.pop()
+    layout = {'summary_rows': len(summary_data), 'col_widths': list(col_widths.values()), **layout_rows(data, format_patterns())}
+    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'Canadians in College Stats: {config()["YEAR"]}')
+    # year_spreadsheet = google_spreadsheet.spreadsheet(name = 'Test - Canadians in College Stats')
+    year_worksheet = year_spreadsheet.get_worksheet(0)
     try:
-        canadians_in_college_stats_worksheet = hub_spreadsheet.worksheet('Canadians in College Stats')
-        hub_spreadsheet.del_worksheet(canadians_in_college_stats_worksheet)
-    except:
+        canadians_in_college_stats_worksheet = hub_spreadsheet().worksheet('Canadians in College Stats')
+        if publish_changes('Canadians in College Stats', data, layout, [canadians_in_college_stats_worksheet, year_worksheet]):
+            return # same layout, so only changed cells were sent
+        hub_spreadsheet().del_worksheet(canadians_in_college_stats_worksheet)
+    except gspread.WorksheetNotFound:
         pass
-    canadians_in_college_stats_worksheet = hub_spreadsheet.add_worksheet('Canadians in College Stats', rows = 1, cols = 1)
+    canadians_in_college_stats_worksheet = hub_spreadsheet().add_worksheet('Canadians in College Stats', rows = 1, cols = 1)
     canadians_in_college_stats_worksheet.insert_rows(data)
 
     # Visual formatting
-    format_sheet(hub_spreadsheet, canadians_in_college_stats_worksheet, total_rows = len(data), summary_data_rows = len(summary_data), col_widths_dict = col_widths)
+    format_sheet(hub_spreadsheet(), canadians_in_college_stats_worksheet, total_rows = len(data), summary_data_rows = len(summary_data), col_widths_dict = col_widths, layout = layout)
 
     # Copy sheet from Hub to Shared sheet
-    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'Canadians in College Stats: {config["YEAR"]}')
-    # year_spreadsheet = google_spreadsheet.spreadsheet(name = 'Test - Canadians in College Stats')
-    year_worksheet = year_spreadsheet.get_worksheet(0)
     copy_and_paste_sheet(year_spreadsheet, canadians_in_college_stats_worksheet, year_worksheet)
+    save_published(layout, [canadians_in_college_stats_worksheet, year_worksheet])
 
 def create_ballot_sheet():
-    players_worksheet = hub_spreadsheet.worksheet('Players')
-    players_manual_spreadsheet = hub_spreadsheet.worksheet('Players (Manual)')
-    schools_worksheet = hub_spreadsheet.worksheet('Schools')
-    players_df = pd.merge(
-        pd.concat([df(players_worksheet), df(players_manual_spreadsheet)]),
-        df(schools_worksheet), how = 'inner', left_on = 'roster_url', right_on = 'school_roster_url'
-    ) \
+    players_df = hub_store.join(['Players', 'Players (Manual)'], 'Schools', left_on = 'school_roster_url', right_on = 'roster_url') \
         .drop_duplicates(subset = ['last_name', 'first_name', 'roster_url']) \
         .sort_values(by = ['last_name', 'first_name'], ignore_index = True) \
         .rename({'name': 'School'}, axis = 1)
-    players_df['Name'] = players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
+    players_df['Name'] = rosters.names(players_df)
+    typed_df = schema.typed(players_df, ['Players', 'Players (Manual)', 'Schools']) # to pick players; the ballot shows the Hub's own values
 
-    pitchers_df = players_df[(players_df['APP'].replace('', 0).astype(int) > 0) & (players_df['IP'].replace('', 0).astype(float) >= 10)]
-    hitters_df = players_df[players_df['G.C'] != ''].copy()
-    hitters_df['primaryPosition'] = hitters_df[['G.C', 'G.1B', 'G.2B', 'G.3B', 'G.SS', 'G.OF', 'G.DH']] \
-        .astype(int).idxmax(axis = 1, numeric_only = True).apply(lambda x: x.replace('G.', ''))
+    pitchers_df = typed_df[(typed_df['APP'].fillna(0) > 0) & (typed_df['IP'].fillna(0) >= 10)]
+    hitters_df = typed_df[typed_df['G.C'].notna()].copy()
+    hitters_df['primaryPosition'] = hitters_df[schema.GAMES_BY_POSITION] \
+        .fillna(0).astype(int).idxmax(axis = 1).str.replace('G.', '', regex = False)
+    starts = (pitchers_df['GS'].fillna(0) / pitchers_df['APP']).astype(float) >= 0.5
 
     ballot_groups = [
-        ('Right-handers', (pitchers_df['throws'] == 'R') & (pitchers_df['GS'].astype(int) / pitchers_df['APP'].astype(int) >= 0.5)),
-        ('Left-handers', (pitchers_df['throws'] == 'L') & (pitchers_df['GS'].astype(int) / pitchers_df['APP'].astype(int) >= 0.5)),
-        ('Relievers', pitchers_df['GS'].astype(int) / pitchers_df['APP'].astype(int) < 0.5),
+        ('Right-handers', (pitchers_df['throws'] == 'R') & starts),
+        ('Left-handers', (pitchers_df['throws'] == 'L') & starts),
+        ('Relievers', ~starts),
         ('Catchers', hitters_df['primaryPosition'] == 'C'),
         ('First basemen', hitters_df['primaryPosition'] == '1B'),
         ('Second basemen', hitters_df['primaryPosition'] == '2B'),
@@ -326,17 +416,18 @@ def create_ballot_sheet():
         data.append([ballot_group])
         if ballot_group in ['Right-handers', 'Left-handers', 'Relievers']: # Pitchers
             data.append(['G' if col == 'APP' else 'H' if col == 'HA' else col for col in pitcher_cols])
-            data += pitchers_df[mask][pitcher_cols].values.tolist()
+            data += players_df.loc[pitchers_df[mask].index, pitcher_cols].values.tolist()
         else: # Hitters
             data.append(hitter_cols)
-            data += hitters_df[mask][hitter_cols].values.tolist()
+            data += players_df.loc[hitters_df[mask].index, hitter_cols].values.tolist()
         if ballot_group == 'Outfielders':
             data += [[], ['9 Choices'], ['3 1st'], ['3 2nd'], ['3 3rd'], ['Write-in'], [], [], []]
         else:
             data += [[], ['3 Choices'], ['1'], ['2'], ['3'], ['Write-in'], [], [], []]
     data.pop()
+    layout = layout_rows(data, {'groups': r'^(' + '|'.join([x[0] for x in ballot_groups]) + r')$', 'choices': r'^(3 Choices|9 Choices|Write-in)$'})
 
-    ballot_spreadsheet = google_spreadsheet.spreadsheet(name = f'All-Canadian Ballot {config["YEAR"]}')
+    ballot_spreadsheet = google_spreadsheet.spreadsheet(name = f'All-Canadian Ballot {config()["YEAR"]}')
     ballot_worksheet = ballot_spreadsheet.add_worksheet('New', rows = 1, cols = 1)
     old_worksheet = ballot_spreadsheet.get_worksheet(0)
     ballot_spreadsheet.del_worksheet(old_worksheet)
@@ -360,14 +451,14 @@ def create_ballot_sheet():
         }
     }]
 
-    for header in ballot_worksheet.findall(re.compile(r'^(' + '|'.join([x[0] for x in ballot_groups]) + r')$')):
+    for header_row in layout['groups']:
         # Position group
         range_ = {
             'sheetId': ballot_worksheet._properties['sheetId'],
             'startColumnIndex': 0,
             'endColumnIndex': 1,
-            'startRowIndex': header.row - 1,
-            'endRowIndex': header.row
+            'startRowIndex': header_row,
+            'endRowIndex': header_row + 1
         }
         requests.append({
             'repeatCell': {
@@ -405,7 +496,7 @@ def create_ballot_sheet():
             }
         })
 
-    for cell in ballot_worksheet.findall(re.compile(r'^(3 Choices|9 Choices|Write-in)$')):
+    for choice_row in layout['choices']:
         # 3 Choices / Write-in
         requests.append({
             'repeatCell': {
@@ -413,8 +504,8 @@ def create_ballot_sheet():
                     'sheetId': ballot_worksheet._properties['sheetId'],
                     'startColumnIndex': 0,
                     'endColumnIndex': 1,
-                    'startRowIndex': cell.row - 1,
-                    'endRowIndex': cell.row
+                    'startRowIndex': choice_row,
+                    'endRowIndex': choice_row + 1
                 },
                 'cell': {
                     'userEnteredFormat': {
@@ -431,7 +522,7 @@ def create_ballot_sheet():
         'requests': requests
     })
 
-def format_sheet(spreadsheet: gspread.Spreadsheet, worksheet: gspread.Worksheet, total_rows: int, summary_data_rows: int, col_widths_dict: dict[str, int]):
+def format_sheet(spreadsheet: gspread.Spreadsheet, worksheet: gspread.Worksheet, total_rows: int, summary_data_rows: int, col_widths_dict: dict[str, int], layout: dict[str, list[int]]):
     requests = list()
 
     # Resize columns
@@ -536,20 +627,15 @@ def format_sheet(spreadsheet: gspread.Spreadsheet, worksheet: gspread.Worksheet,
     })
 
     # Format headers & subheaders
-    headers = worksheet.findall(re.compile(r'^(' + '|'.join([x['label'] for x in cbn_utils.leagues]) + r')$'))
-    subheaders = worksheet.findall(
-        re.compile(r'^(' + '|'.join(['Freshmen', 'Sophomores', 'Juniors', 'Seniors']) + r')$')
-    ) + worksheet.findall(
-        re.compile(r'^(' + '|'.join(list(cbn_utils.stats_labels['batting'].values()) + list(cbn_utils.stats_labels['pitching'].values())) + r') \(.*\)$')
-    )
-    for i, header in enumerate(headers + subheaders):
+    headers, subheaders = layout['headers'], layout['classes'] + layout['stats'] # row indices from the sheet builder
+    for i, header_row in enumerate(headers + subheaders):
         color = 0.8 if i < len(headers) else 0.92
         range_ = {
             'sheetId': worksheet._properties['sheetId'],
             'startColumnIndex': 0,
             'endColumnIndex': len(col_widths_dict.keys()),
-            'startRowIndex': header.row - 1,
-            'endRowIndex': header.row
+            'startRowIndex': header_row,
+            'endRowIndex': header_row + 1
         }
         requests.append({
             'repeatCell': {
@@ -583,8 +669,8 @@ def format_sheet(spreadsheet: gspread.Spreadsheet, worksheet: gspread.Worksheet,
                     'sheetId': worksheet._properties['sheetId'],
                     'startColumnIndex': 0,
                     'endColumnIndex': len(col_widths_dict.keys()),
-                    'startRowIndex': header.row,
-                    'endRowIndex': header.row + 1
+                    'startRowIndex': header_row + 1,
+                    'endRowIndex': header_row + 2
                 },
                 'cell': {
                     'userEnteredFormat': {
@@ -672,13 +758,108 @@ def copy_and_paste_sheet(destination_spreadsheet: gspread.Spreadsheet, source_wo
         }
     )
 
+# Publishing
+published_layout_key = 'published_layout' # developer metadata on each published worksheet: hash of the layout it was formatted for
+
+def format_patterns() -> dict[str, str]:
+    # Rows format_sheet styles: division headers, then class year and stat subheaders
+    return {
+        'headers': r'^(' + '|'.join([x['label'] for x in cbn_utils.leagues]) + r')$',
+        'classes': r'^(' + '|'.join(['Freshmen', 'Sophomores', 'Juniors', 'Seniors']) + r')$',
+        'stats': r'^(' + '|'.join(list(cbn_utils.stats_labels['batting'].values()) + list(cbn_utils.stats_labels['pitching'].values())) + r') \(.*\)$'
+    }
+
+def layout_rows(data: list[list], patterns: dict[str, str]) -> dict[str, list[int]]:
+    # Row indices with a cell matching each pattern, found in the grid built in memory instead of with worksheet.findall
+    return {
+        name: [i for i, row in enumerate(data) if any([re.search(pattern, str(value)) != None for value in row])]
+        for name, pattern in patterns.items()
+    }
+
+def grid_changes(old_data: list[list], new_data: list[list]) -> list[dict]:
+    # A1 ranges (runs of changed cells within a row) and their new values
+    changes = list()
+    for i, new_row in enumerate(new_data):
+        old_row = old_data[i] if i < len(old_data) else list()
+        width = max(len(old_row), len(new_row))
+        old_row, new_row = list(old_row) + [''] * (width - len(old_row)), list(new_row) + [''] * (width - len(new_row))
+        changed = [local_store.cell(old_value) != local_store.cell(new_value) for old_value, new_value in zip(old_row, new_row)]
+        j = 0
+        while j < width:
+            if not changed[j]:
+                j += 1
+                continue
+            start = j
+            while (j < width) and changed[j]:
+                j += 1
+            changes.append({'range': f'{gspread.utils.rowcol_to_a1(i + 1, start + 1)}:{gspread.utils.rowcol_to_a1(i + 1, j)}', 'values': [new_row[start:j]]})
+    return changes
+
+def __layout_hash__(layout: dict) -> str:
+    return hashlib.sha1(json.dumps(layout, sort_keys = True, default = str).encode()).hexdigest()
+
+def published_layout(worksheet: gspread.Worksheet) -> str | None:
+    # Layout hash saved on the worksheet by save_published, or None if it was never published this way
+    sheets = worksheet.spreadsheet.fetch_sheet_metadata({'fields': 'sheets(properties(sheetId),developerMetadata)'})['sheets']
+    for sheet in sheets:
+        if sheet['properties']['sheetId'] == worksheet.id:
+            return next((metadata['metadataValue'] for metadata in sheet.get('developerMetadata', list()) if metadata['metadataKey'] == published_layout_key), None)
+    return None
+
+def save_published(layout: dict, worksheets: list[gspread.Worksheet]):
+    # Record on each rebuilt worksheet the layout its formatting follows
+    for worksheet in worksheets:
+        worksheet.spreadsheet.batch_update({
+            'requests': [
+                {
+                    'deleteDeveloperMetadata': {
+                        'dataFilter': {
+                            'developerMetadataLookup': {
+                                'metadataKey': published_layout_key,
+                                'metadataLocation': {'sheetId': worksheet.id}
+                            }
+                        }
+                    }
+                }, {
+                    'createDeveloperMetadata': {
+                        'developerMetadata': {
+                            'metadataKey': published_layout_key,
+                            'metadataValue': __layout_hash__(layout),
+                            'location': {'sheetId': worksheet.id},
+                            'visibility': 'DOCUMENT'
+                        }
+                    }
+                }
+            ]
+        })
+
+def publish_changes(title: str, data: list[list], layout: dict, worksheets: list[gspread.Worksheet]) -> bool:
+    # Write only the cells that differ from what each worksheet holds now; False when the sheet needs a full rebuild.
+    # The worksheets themselves are the reference (not a local snapshot), so hand edits and other runs' publishes are caught,
+    # and the formatting is trusted only if the layout hash saved on each worksheet matches the new layout.
+    row_count = max([i + 1 for i, row in enumerate(data) if any([local_store.cell(value) != '' for value in row])] + [0]) # the API drops trailing blank rows
+    live_data = list()
+    for worksheet in worksheets:
+        if published_layout(worksheet) != __layout_hash__(layout):
+            return False
+        live_data.append(worksheet.get_values(value_render_option = 'UNFORMATTED_VALUE'))
+        if len(live_data[-1]) != row_count:
+            return False
+    change_count = 0
+    for worksheet, worksheet_data in zip(worksheets, live_data):
+        changes = grid_changes(worksheet_data, data)
+        if len(changes) > 0:
+            worksheet.batch_update(changes)
+        change_count += len(changes)
+    cbn_utils.log(f'Published {change_count} changed ranges to {title}')
+    return True
+
 def update_minors_sheet():
-    players_worksheet = hub_spreadsheet.worksheet('Players (Minors)')
-    players_df = df(players_worksheet)
+    players_df, typed_df = hub_store.df('Players (Minors)'), hub_store.df('Players (Minors)', typed = True) # same rows; the sheet shows the Hub's own values
     data = []
     player_ids = list()
     for player_type in ['Hitters', 'Pitchers']:
-        player_type_players_df = players_df[~players_df['AB' if player_type == 'Hitters' else 'APP'].isin(['0', ''])].copy()
+        player_type_players_df = players_df[typed_df['AB' if player_type == 'Hitters' else 'APP'].fillna(0) > 0].copy()
         player_ids += player_type_players_df['mlbam_id'].to_list()
         player_type_players_df['Player'] = player_type_players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
         player_type_players_df['Hometown'] = player_type_players_df.apply(lambda row: f'{row["city"]}, {row["province"]}', axis = 1)
@@ -688,12 +869,17 @@ def update_minors_sheet():
     player_ids = set(player_ids)
     data = [[f'{len(player_ids)} Players'] + [''] * 14 + [f'Last updated: {datetime.now().strftime("%B %d, %Y")}']] + data
 
+    layout = layout_rows(data, {'headers': r'Players|Hitters|Pitchers'})
+    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'{config()["YEAR"]} Canadians in the Minors')
+    year_worksheet = year_spreadsheet.get_worksheet(0)
     try:
-        minors_worksheet = hub_spreadsheet.worksheet('Canadians in the Minors')
-        hub_spreadsheet.del_worksheet(minors_worksheet)
-    except:
+        minors_worksheet = hub_spreadsheet().worksheet('Canadians in the Minors')
+        if publish_changes('Canadians in the Minors', data, layout, [minors_worksheet, year_worksheet]):
+            return # same layout, so only changed cells were sent
+        hub_spreadsheet().del_worksheet(minors_worksheet)
+    except gspread.WorksheetNotFound:
         pass
-    minors_worksheet = hub_spreadsheet.add_worksheet('Canadians in the Minors', rows = 1, cols = 1)
+    minors_worksheet = hub_spreadsheet().add_worksheet('Canadians in the Minors', rows = 1, cols = 1)
     minors_worksheet.insert_rows(data)
 
     # Formatting
@@ -713,14 +899,14 @@ def update_minors_sheet():
         }
     }]
 
-    for header in minors_worksheet.findall(re.compile(r'Players|Hitters|Pitchers')):
+    for header_row in layout['headers']:
         # Position group
         range_ = {
             'sheetId': minors_worksheet._properties['sheetId'],
             'startColumnIndex': 0,
             'endColumnIndex': 1,
-            'startRowIndex': header.row - 1,
-            'endRowIndex': header.row
+            'startRowIndex': header_row,
+            'endRowIndex': header_row + 1
         }
         requests.append({
             'repeatCell': {
@@ -780,30 +966,24 @@ def update_minors_sheet():
             }
         })
 
-    hub_spreadsheet.batch_update({
+    hub_spreadsheet().batch_update({
         'requests': requests
     })
 
     # Copy sheet from Hub to Shared sheet
-    year_spreadsheet = google_spreadsheet.spreadsheet(name = f'{config["YEAR"]} Canadians in the Minors')
-    year_worksheet = year_spreadsheet.get_worksheet(0)
     copy_and_paste_sheet(year_spreadsheet, minors_worksheet, year_worksheet)
+    save_published(layout, [minors_worksheet, year_worksheet])
 
 def create_temp_ballot_sheet():
-    players_worksheet = hub_spreadsheet.worksheet('Players')
-    players_manual_spreadsheet = hub_spreadsheet.worksheet('Players (Manual)')
-    schools_worksheet = hub_spreadsheet.worksheet('Schools')
-    players_df = pd.merge(
-        pd.concat([df(players_worksheet), df(players_manual_spreadsheet)]),
-        df(schools_worksheet), how = 'inner', left_on = 'school_roster_url', right_on = 'roster_url'
-    ) \
+    players_df = hub_store.join(['Players', 'Players (Manual)'], 'Schools', left_on = 'school_roster_url', right_on = 'roster_url') \
         .drop_duplicates(subset = ['last_name', 'first_name', 'roster_url']) \
         .sort_values(by = ['last_name', 'first_name'], ignore_index = True) \
         .rename({'name': 'School'}, axis = 1)
-    players_df['Name'] = players_df.apply(lambda row: f'{row["first_name"]} {row["last_name"]}', axis = 1)
+    players_df['Name'] = rosters.names(players_df)
 
-    pitchers_df = players_df[((players_df['IP'].replace('', 0).astype('float') >= 40) & (players_df['ERA'].replace('', 0).astype('float') <= 4.5)) | (players_df['SV'].replace('', 0).astype('int') >= 5)].copy()
-    hitters_df = players_df[((players_df['AB'].replace('', 0).astype('int') >= 100) & (players_df['AVG'].replace('', 0).astype('float') >= 0.28)) | (players_df['HR'].replace('', 0).astype('int') >= 8)].copy()
+    stats_df = schema.typed(players_df, ['Players', 'Players (Manual)', 'Schools'])[schema.COUNT_STATS + schema.RATE_STATS].astype(float).fillna(0) # blanks count as 0; the ballot shows the Hub's own values
+    pitchers_df = players_df[((stats_df['IP'] >= 40) & (stats_df['ERA'] <= 4.5)) | (stats_df['SV'] >= 5)].copy()
+    hitters_df = players_df[((stats_df['AB'] >= 100) & (stats_df['AVG'] >= 0.28)) | (stats_df['HR'] >= 8)].copy()
     pitcher_cols = ['Name', 'School'] + list(cbn_utils.stats_labels['pitching'].keys())
     hitter_cols = ['Name', 'School'] + list(cbn_utils.stats_labels['batting'].keys())
 
@@ -820,7 +1000,7 @@ def create_temp_ballot_sheet():
     data += pitchers_df[pitcher_cols].values.tolist()
     data += [['']]
 
-    ballot_worksheet = hub_spreadsheet.worksheet('Ballot')
+    ballot_worksheet = hub_spreadsheet().worksheet('Ballot')
     ballot_worksheet.insert_rows(data)
 
 # if __name__ == '__main__':
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+# Stat rules
+RATE_STATS = ['AVG', 'OBP', 'SLG', 'OPS'] # shown as .xxx
+ASCENDING_STATS = ['ERA'] # lower is better
+DECIMALS = {'AVG': 3, 'OBP': 3, 'SLG': 3, 'OPS': 3, 'ERA': 2, 'IP': 1} # every other stat is a count
+QUALIFIERS = {'AVG': ('AB', 30), 'OBP': ('AB', 30), 'SLG': ('AB', 30), 'OPS': ('AB', 30), 'ERA': ('IP', 20)} # stat: (column, minimum)
+
+def numeric(df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    # Stats as floats, once for every stat; blanks count as 0. Typed frames (schema.py) are already numeric
+    return df[columns].apply(lambda values: pd.to_numeric(values.replace('', 0), errors = 'coerce') if values.dtype == object else values).astype(float).fillna(0)
+
+def league_groups(players_df: pd.DataFrame, leagues: list[dict]) -> pd.Series:
+    # Position in leagues of each player's board, -1 if none (NAIA ignores divisions)
+    groups = pd.Series(-1, index = players_df.index)
+    for i, league in reversed(list(enumerate(leagues))):
+        mask = players_df['league'] == league['league']
+        if league['league'] != 'NAIA':
+            mask &= players_df['division'] == league['division']
+        groups[mask] = i
+    return groups
+
+def leaders(players_df: pd.DataFrame, group_col: str, stats: list[str], top: int = 10) -> pd.DataFrame:
+    # Top players (with ties at the cutoff) for every group and stat in one pass.
+    # Returns one row per leader, ordered by group, stat (in the given order) and rank, with Rank blank for ties.
+    values = numeric(players_df, list(dict.fromkeys(stats + [column for column, _ in QUALIFIERS.values()])))
+    for stat in stats:
+        values[stat] = values[stat].round(DECIMALS.get(stat, 0))
+
+    # Long format: one row per player and stat that qualifies
+    long_df = pd.DataFrame({
+        'player': np.tile(np.arange(len(players_df.index)), len(stats)),
+        'stat': np.repeat(np.arange(len(stats)), len(players_df.index)),
+        'value': np.concatenate([values[stat].to_numpy() for stat in stats]) if len(stats) > 0 else np.array([], dtype = float)
+    })
+    qualified = np.concatenate([
+        (values[QUALIFIERS[stat][0]].to_numpy() >= QUALIFIERS[stat][1]) & ((values[stat].to_numpy() > 0) | (stat in ASCENDING_STATS))
+        if stat in QUALIFIERS else values[stat].to_numpy() > 0
+        for stat in stats
+    ]) if len(stats) > 0 else np.array([], dtype = bool)
+    long_df['group'] = players_df[group_col].to_numpy()[long_df['player'].to_numpy()]
+    long_df = long_df[qualified & (long_df['group'] != -1)]
+
+    # Best first: sort on a key where lower is always better, then by name
+    ascending = np.isin(np.array(stats)[long_df['stat'].to_numpy()], ASCENDING_STATS) if len(stats) > 0 else np.array([], dtype = bool)
+    long_df['key'] = np.where(ascending, long_df['value'], -long_df['value'])
+    long_df['last_name'] = players_df['last_name'].to_numpy()[long_df['player'].to_numpy()]
+    long_df['first_name'] = players_df['first_name'].to_numpy()[long_df['player'].to_numpy()]
+    long_df = long_df.sort_values(['group', 'stat', 'key', 'last_name', 'first_name'], kind = 'mergesort', ignore_index = True)
+
+    # Keep everyone at or above the top-th value
+    board = long_df.groupby(['group', 'stat'], sort = False)
+    position, size = board.cumcount(), board['key'].transform('size')
+    cutoff = long_df['key'].where(position == np.minimum(top, size) - 1)
+    long_df = long_df[long_df['key'] <= cutoff.groupby([long_df['group'], long_df['stat']]).transform('max')].reset_index(drop = True)
+
+    # Rank with ties sharing the best rank; only the first of a tie shows it
+    board = long_df.groupby(['group', 'stat'], sort = False)
+    long_df['Rank'] = board['key'].rank(method = 'min').astype(int)
+    long_df['tied'] = long_df['Rank'] == board['Rank'].shift()
+    long_df['stat'] = np.array(stats, dtype = object)[long_df['stat'].to_numpy()] if len(long_df.index) > 0 else pd.Series(dtype = object)
+    return long_df
+
+def format_values(stat: str, values: pd.Series) -> pd.Series:
+    if stat in RATE_STATS:
+        return values.map(lambda x: '{0:.3f}'.format(x) if x >= 1 else '{0:.3f}'.format(x)[1:])
+    if stat == 'ERA':
+        return values.map(lambda x: '{0:.2f}'.format(x))
+    if stat == 'IP':
+        return values
+    return values.astype(int)
+
+def blocks(players_df: pd.DataFrame, leaders_df: pd.DataFrame, group_labels: list[str], stat_labels: dict[str, str], columns: list[str] = ['Rank', 'Name', 'Position', 'School']) -> list[list]:
+    # Ready-to-publish rows: a header per group, then a titled table per stat, each followed by a blank row
+    width = len(columns) + 1
+    blank_row = [''] * width
+    players = leaders_df['player'].to_numpy()
+    table_df = pd.DataFrame({
+        'Rank': leaders_df['Rank'].where(~leaders_df['tied'], ''),
+        'Name': players_df['first_name'].to_numpy()[players] + ' ' + players_df['last_name'].to_numpy()[players]
+    })
+    for column in columns:
+        if column not in table_df.columns:
+            table_df[column] = players_df[column].to_numpy()[players]
+
+    rows = list()
+    for group, group_df in leaders_df.groupby('group', sort = False):
+        rows.append([group_labels[group]] + [''] * (width - 1))
+        for stat, stat_df in group_df.groupby('stat', sort = False):
+            stat_table_df = table_df.loc[stat_df.index, columns].copy()
+            stat_table_df[stat] = format_values(stat, stat_df['value']).to_numpy()
+            rows += [[stat_labels[stat]] + [''] * (width - 1), stat_table_df.columns.tolist()] + stat_table_df.values.tolist() + [blank_row]
+    return rows
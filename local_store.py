@@ -0,0 +1,242 @@
+import cbn_utils
+import gspread
+import sqlite3
+import threading
+import json
+import time
+import os
+import pandas as pd
+
+def cell(value) -> str:
+    # Stored value as Google Sheets would display it, so frames match google_sheets.df
+    if value is pd.NA:
+        return ''
+    if value == None:
+        return ''
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else str(value)
+    return str(value)
+
+class LocalStore:
+    # SQLite copy of spreadsheet tabs: pulled in one request per run, read and joined locally, published back in bulk.
+    # Each tab is a table keyed by sheet row number with one column per sheet column (c1, c2, ...) so A1 ranges map directly.
+    def __init__(self, path: str, tabs: list[str], spreadsheet, parse = None):
+        self.__path__ = path
+        self.__tabs__ = tabs
+        self.__spreadsheet__ = spreadsheet # function returning the gspread.Spreadsheet, called on first pull
+        self.__parse__ = parse # function (df, tabs) -> typed df, for df(..., typed = True) and join(..., typed = True)
+        self.__typed__: dict[str, pd.DataFrame] = dict() # parsed frames, dropped whenever their tab changes
+        self.__connection__: sqlite3.Connection | None = None
+        self.__lock__ = threading.RLock()
+        self.__pulled__: set[str] = set() # tabs pulled by this process
+        self.__dirty__: set[str] = set() # tabs changed locally and waiting for push()
+
+    def __db__(self) -> sqlite3.Connection:
+        if self.__connection__ == None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.__path__)), exist_ok = True)
+            self.__connection__ = sqlite3.connect(self.__path__, check_same_thread = False)
+            self.__connection__.execute('CREATE TABLE IF NOT EXISTS __tabs__ (tab TEXT PRIMARY KEY, columns TEXT, pulled_at REAL)')
+        return self.__connection__
+
+    @staticmethod
+    def __table__(tab: str) -> str:
+        return '"' + tab.replace('"', '""') + '"'
+
+    def tracks(self, tab: str) -> bool:
+        return tab in self.__tabs__
+
+    def columns(self, tab: str) -> list[str]:
+        self.__ensure__([tab])
+        row = self.__db__().execute('SELECT columns FROM __tabs__ WHERE tab = ?', (tab,)).fetchone()
+        return json.loads(row[0]) if row != None else list()
+
+    def __ensure__(self, tabs: list[str]):
+        # Pull every tracked tab not yet pulled by this process in a single batchGet
+        with self.__lock__:
+            if all([tab in self.__pulled__ for tab in tabs]):
+                return
+            self.pull([tab for tab in self.__tabs__ + [tab for tab in tabs if tab not in self.__tabs__] if tab not in self.__pulled__])
+
+    def pull(self, tabs: list[str] | None = None):
+        tabs = self.__tabs__ if tabs == None else tabs
+        start_time = time.time()
+        value_ranges = self.__spreadsheet__().values_batch_get([f"'{tab}'" for tab in tabs])['valueRanges']
+        with self.__lock__:
+            for tab, value_range in zip(tabs, value_ranges):
+                values = value_range.get('values', list())
+                self.__write__(tab, values[0] if len(values) > 0 else list(), values[1:])
+                self.__pulled__.add(tab)
+                self.__dirty__.discard(tab)
+        cbn_utils.log(f'Pulled {len(tabs)} tabs into {self.__path__} in {round(time.time() - start_time, 1)}s')
+
+    def __write__(self, tab: str, columns: list[str], rows: list[list]):
+        self.__typed__.pop(tab, None)
+        db = self.__db__()
+        db.execute(f'DROP TABLE IF EXISTS {self.__table__(tab)}')
+        db.execute(f'CREATE TABLE {self.__table__(tab)} (row INTEGER PRIMARY KEY{"".join([f", c{i + 1}" for i in range(len(columns))])})')
+        if len(columns) > 0:
+            db.executemany(
+                f'INSERT INTO {self.__table__(tab)} VALUES (?{", ?" * len(columns)})',
+                [[row_number] + (list(row) + [''] * len(columns))[:len(columns)] for row_number, row in enumerate(rows, start = 2)]
+            )
+        db.execute('INSERT OR REPLACE INTO __tabs__ VALUES (?, ?, ?)', (tab, json.dumps(columns), time.time()))
+        db.commit()
+
+    def read(self, columns: dict[str, list[str]], typed: bool = False) -> dict[str, pd.DataFrame]:
+        # Only the named columns of each tab ({tab: [column, ...]}), in sheet row order (index + 2 is the row number).
+        # Read from the sheet, trailing rows blank in every named column are left out: the API drops them.
+        # Tabs already pulled by this process come from the store. The rest are read as column ranges in one batchGet,
+        # located with the headers saved by an earlier pull; a tab whose header moved (or was never saved) costs one more
+        # batchGet for its header row and one for its columns.
+        frames = dict()
+        with self.__lock__:
+            for tab in [tab for tab in columns.keys() if tab in self.__pulled__]:
+                frames[tab] = self.df(tab, typed = typed)[columns[tab]]
+        tabs = [tab for tab in columns.keys() if tab not in frames]
+        if len(tabs) == 0:
+            return {tab: frames[tab] for tab in columns.keys()}
+        start_time = time.time()
+        headers = dict()
+        for tab in tabs:
+            row = self.__db__().execute('SELECT columns FROM __tabs__ WHERE tab = ?', (tab,)).fetchone()
+            if row != None:
+                headers[tab] = json.loads(row[0])
+        values = self.__read_columns__([tab for tab in tabs if all([column in headers.get(tab, list()) for column in columns[tab]])], columns, headers)
+        stale = [tab for tab in tabs if tab not in values]
+        if len(stale) > 0:
+            value_ranges = self.__spreadsheet__().values_batch_get([f"'{tab}'!1:1" for tab in stale])['valueRanges']
+            headers.update({tab: value_range.get('values', [[]])[0] for tab, value_range in zip(stale, value_ranges)})
+            for tab in stale:
+                missing = [column for column in columns[tab] if column not in headers[tab]]
+                if len(missing) > 0:
+                    raise KeyError(f'{", ".join(missing)} not found in {tab}')
+            values.update(self.__read_columns__(stale, columns, headers))
+
+        for tab in tabs:
+            row_count = max([len(column_values) for column_values in values[tab]] + [0]) # the API drops trailing blanks
+            frames[tab] = pd.DataFrame({column: column_values + [''] * (row_count - len(column_values)) for column, column_values in zip(columns[tab], values[tab])})
+            if typed & (self.__parse__ != None):
+                frames[tab] = self.__parse__(frames[tab], [tab])
+        cbn_utils.log(f'Read {sum([len(columns[tab]) for tab in tabs])} columns from {", ".join(tabs)} in {round(time.time() - start_time, 1)}s')
+        return {tab: frames[tab] for tab in columns.keys()}
+
+    def __read_columns__(self, tabs: list[str], columns: dict[str, list[str]], headers: dict[str, list[str]]) -> dict[str, list[list]]:
+        # One batchGet of each tab's column ranges, header cell included; tabs whose header cells don't match are left out
+        if len(tabs) == 0:
+            return dict()
+        ranges = list()
+        for tab in tabs:
+            for column in columns[tab]:
+                letter = gspread.utils.rowcol_to_a1(1, headers[tab].index(column) + 1)[:-1]
+                ranges.append(f"'{tab}'!{letter}1:{letter}")
+        value_ranges = iter(self.__spreadsheet__().values_batch_get(ranges, params = {'majorDimension': 'COLUMNS'})['valueRanges'])
+        values = dict()
+        for tab in tabs:
+            tab_values = [next(value_ranges).get('values', [[]])[0] for _ in columns[tab]]
+            if all([(len(column_values) > 0) and (column_values[0] == column) for column, column_values in zip(columns[tab], tab_values)]):
+                values[tab] = [column_values[1:] for column_values in tab_values]
+        return values
+
+    def invalidate(self, tab: str):
+        # The sheet was changed in a way the store can't mirror (e.g. sorted), so pull it again on next read
+        with self.__lock__:
+            self.__pulled__.discard(tab)
+            self.__typed__.pop(tab, None)
+
+    def df(self, tab: str, typed: bool = False) -> pd.DataFrame:
+        # Display strings, or with typed = True columns parsed once per change to the tab (callers get a copy)
+        if typed & (self.__parse__ != None):
+            with self.__lock__:
+                self.__ensure__([tab])
+                if tab not in self.__typed__:
+                    self.__typed__[tab] = self.__parse__(self.df(tab), [tab])
+                return self.__typed__[tab].copy()
+        columns = self.columns(tab)
+        if len(columns) == 0:
+            return pd.DataFrame()
+        rows = self.__db__().execute(f'SELECT * FROM {self.__table__(tab)} ORDER BY row').fetchall()
+        return pd.DataFrame([[cell(value) for value in row[1:]] for row in rows], columns = columns)
+
+    def apply(self, tab: str, range_name: str, values: list[list]):
+        # Mirror a range update already written to the sheet
+        if tab not in self.__pulled__:
+            return
+        grid = gspread.utils.a1_range_to_grid_range(range_name)
+        column_count = len(self.columns(tab))
+        with self.__lock__:
+            self.__typed__.pop(tab, None)
+            db = self.__db__()
+            for row_offset, row_values in enumerate(values):
+                row_number = grid.get('startRowIndex', 0) + row_offset + 1
+                if row_number < 2: continue # header
+                db.execute(f'INSERT OR IGNORE INTO {self.__table__(tab)} (row) VALUES (?)', (row_number,))
+                assignments = [(f'c{grid.get("startColumnIndex", 0) + col_offset + 1}', value.item() if hasattr(value, 'item') else value) for col_offset, value in enumerate(row_values) if grid.get('startColumnIndex', 0) + col_offset < column_count]
+                if len(assignments) > 0:
+                    db.execute(f'UPDATE {self.__table__(tab)} SET {", ".join([f"{column} = ?" for column, _ in assignments])} WHERE row = ?', [value for _, value in assignments] + [row_number])
+            db.commit()
+
+    def append(self, tab: str, rows: list[list]):
+        # Mirror rows already appended to the sheet
+        if tab not in self.__pulled__:
+            return
+        with self.__lock__:
+            last_row = self.__db__().execute(f'SELECT COALESCE(MAX(row), 1) FROM {self.__table__(tab)}').fetchone()[0]
+            self.apply(tab, f'A{last_row + 1}', rows)
+
+    def replace(self, tab: str, df: pd.DataFrame):
+        # Rewrite a tab locally; push() publishes it
+        with self.__lock__:
+            self.__write__(tab, list(df.columns), df.values.tolist())
+            self.__pulled__.add(tab)
+            self.__dirty__.add(tab)
+
+    def push(self):
+        # Publish every locally rewritten tab: one batchClear and one batchUpdate for all of them
+        with self.__lock__:
+            tabs = [tab for tab in self.__tabs__ if tab in self.__dirty__]
+            if len(tabs) == 0:
+                return
+            data = list()
+            for tab in tabs:
+                rows = self.__db__().execute(f'SELECT * FROM {self.__table__(tab)} ORDER BY row').fetchall()
+                data.append({'range': f"'{tab}'!A1", 'values': [self.columns(tab)] + [[value if value != None else '' for value in row[1:]] for row in rows]})
+            spreadsheet = self.__spreadsheet__()
+            # Rows below the header, and header cells past the new width in case the tab lost columns; the header itself is overwritten
+            spreadsheet.values_batch_clear(body = {'ranges': sum([[f"'{tab}'!A2:ZZZ", f"'{tab}'!{gspread.utils.rowcol_to_a1(1, len(self.columns(tab)) + 1)}:ZZZ1"] for tab in tabs], list())})
+            spreadsheet.values_batch_update(body = {'valueInputOption': 'RAW', 'data': data})
+            self.__dirty__ -= set(tabs)
+            cbn_utils.log(f'Pushed {", ".join(tabs)}')
+
+    def join(self, left_tabs: list[str], right_tab: str, left_on: str, right_on: str, suffixes: tuple[str, str] = ('_x', '_y'), typed: bool = False) -> pd.DataFrame:
+        # Inner join of the stacked left tabs to the right tab, in the same row order as pd.merge(pd.concat(left), right)
+        self.__ensure__(left_tabs + [right_tab])
+        left_columns, right_columns = list(), self.columns(right_tab)
+        for tab in left_tabs:
+            left_columns += [column for column in self.columns(tab) if column not in left_columns]
+        if (left_on not in left_columns) | (right_on not in right_columns):
+            raise KeyError(f'{left_on} or {right_on} not found')
+
+        db = self.__db__()
+        right_key = f'c{right_columns.index(right_on) + 1}'
+        db.execute(f'CREATE INDEX IF NOT EXISTS {self.__table__(f"{right_tab}.{right_on}")} ON {self.__table__(right_tab)} ({right_key})')
+        stacked = ' UNION ALL '.join([
+            f'SELECT {position} AS tab_position, row AS tab_row, ' + ', '.join([
+                f'c{self.columns(tab).index(column) + 1} AS l{i}' if column in self.columns(tab) else f'NULL AS l{i}' for i, column in enumerate(left_columns)
+            ]) + f' FROM {self.__table__(tab)}'
+            for position, tab in enumerate(left_tabs)
+        ])
+        # pandas 1.5 orders an inner merge by each key's first appearance on the left, then left row, then right row
+        left_key = f'l{left_columns.index(left_on)}'
+        rows = db.execute(
+            f'SELECT l.*, r.* FROM (SELECT MIN(tab_position * 1000000000 + tab_row) OVER (PARTITION BY {left_key}) AS key_order, s.* FROM ({stacked}) s) l ' +
+            f'JOIN {self.__table__(right_tab)} r ON r.{right_key} = l.{left_key} ORDER BY l.key_order, l.tab_position, l.tab_row, r.row'
+        ).fetchall()
+
+        overlap = [column for column in left_columns if column in right_columns]
+        columns = [f'{column}{suffixes[0]}' if column in overlap else column for column in left_columns] + \
+            [f'{column}{suffixes[1]}' if column in overlap else column for column in right_columns]
+        joined_df = pd.DataFrame(
+            [[cell(value) if value != None else float('nan') for value in row[3:3 + len(left_columns)] + row[4 + len(left_columns):]] for row in rows],
+            columns = columns
+        )
+        return self.__parse__(joined_df, left_tabs + [right_tab]) if typed & (self.__parse__ != None) else joined_df
@@ -1,9 +1,14 @@
 import cbn_utils
-from google_sheets import config
-from bs4 import BeautifulSoup, element
+import google_sheets
+import normalize
+from bs4 import element
 import pandas as pd
 import json
+import base64
+import functools
 import re
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
 
@@ -12,10 +17,16 @@ class WebPage:
     __SUCCESS_ICON__ = u'\u2705'
     __ERROR_ICON__ = u'\u274C'
     __REDIRECT_ICON__ = u'\u27A1'
+    __READY_SCRIPTS__ = { # evaluated in the browser, true once the content we parse has rendered
+        cbn_utils.PLAYER: "return Array.from(document.querySelectorAll('th')).some(th => th.textContent.includes('Total'));",
+        cbn_utils.ROSTER: "return (document.querySelector('.sidearm-roster-player-container, .s-person-card, table') !== null) || (window.__INITIAL_STATE__ !== undefined);"
+    }
+    __XHR_READY_SCRIPT__ = "return performance.getEntriesByType('resource').some(entry => (entry.responseEnd > 0) && arguments[0].some(pattern => new RegExp(pattern, 'i').test(entry.name)));"
 
-    def __init__(self, url = ''):
+    def __init__(self, url = '', browser = False):
         # Check types
         cbn_utils.check_arg_type(name = 'url', value = url, value_type = str)
+        cbn_utils.check_arg_type(name = 'browser', value = browser, value_type = bool)
 
         # Check values
         cbn_utils.check_string_arg(name = 'url', value = url, disallowed_values = [''])
@@ -24,7 +35,15 @@ class WebPage:
         self.__url__ = url
         if cbn_utils.CCCAA_DOMAIN in url:
             self.__url__ += '?serverSide'
+        self.__browser__ = browser # skip the HTTP client, e.g. for pages that are clicked through with JavaScript
         self.__driver__ = None
+        self.__current_url__ = ''
+        self.__strategy__ = ''
+        self.__validators__ = {'etag': '', 'last_modified': ''}
+        self.__xhr_payloads__: list[str] = list()
+        self.__performance_log__: list[dict] = list() # browser network events, kept since each read of the log empties it
+        self.__xhr_request_ids__: set[str] = set() # API responses whose bodies were already read
+        self.__bytes__ = 0 # downloaded by the browser, to measure resource blocking
         self.__html__ = ''
         self.__success__ = False
         self.__error_message__ = ''
@@ -33,7 +52,7 @@ class WebPage:
         start_time = datetime.now()
         self.html()
         self.__time_to_read__ = (datetime.now() - start_time).total_seconds()
-        cbn_utils.log(f'{url}{self.status()}')
+        cbn_utils.log(f'{url}{self.status()}{f" {round(self.__bytes__ / 1024)} KB" if self.__bytes__ > 0 else ""}')
 
     def __repr__(self):
         return self.__url__ + self.status()
@@ -56,8 +75,8 @@ class WebPage:
         return self.__success__
 
     def redirected_to(self):
-        if self.__driver__.current_url != self.url():
-            return self.__driver__.current_url
+        if self.__current_url__ != self.url():
+            return self.__current_url__
 
     def status_code(self):
         return self.__status_code__
@@ -68,56 +87,201 @@ class WebPage:
             return self.__html__
 
         url_split = self.url().split('#')
-        self.__driver__ = cbn_utils.get(url_split[0])
-        if ('/players/' in self.url()) & (cbn_utils.NCAA_DOMAIN not in self.url()):
-            attempt = 1
-            stats_loaded = False
-            while (attempt <= 10) & (not stats_loaded):
-                soup = BeautifulSoup(self.__driver__.page_source, 'html.parser')
-                stats_loaded = soup.find('th', string = re.compile('Total')) != None
-                cbn_utils.pause(None) # Make sure tables have loaded
-                attempt += 1
-            if not stats_loaded:
+        cached = None if self.__browser__ else cbn_utils.page_cache.get(url_split[0])
+        if (cached != None) and cbn_utils.page_cache.fresh(url_split[0], cached):
+            self.__load__(cached)
+            return self.__html__
+        strategy = cbn_utils.BROWSER if self.__browser__ else cbn_utils.fetch_strategy(url_split[0])
+        if strategy == cbn_utils.HTTP:
+            if self.__fetch_http__(url_split[0], cached):
+                cbn_utils.remember_strategy(url_split[0], cbn_utils.HTTP)
+                self.__save__(url_split[0])
+                return self.__html__
+        http_status = self.__status_code__ # set only when the HTTP client got an error page
+        self.__fetch_browser__(url_split[0])
+        if (strategy == cbn_utils.HTTP) & (http_status < 400) & self.success() & self.__ready__(self.__html__):
+            cbn_utils.remember_strategy(url_split[0], cbn_utils.BROWSER) # HTTP client was not enough for this domain
+        self.__save__(url_split[0])
+        return self.__html__
+
+    def __load__(self, cached: dict):
+        self.__strategy__ = cbn_utils.CACHE
+        self.__current_url__ = cached['current_url']
+        self.__html__ = cached['html']
+        self.__status_code__ = cached['status_code']
+        self.__success__ = True
+        self.__validators__ = {'etag': cached['etag'], 'last_modified': cached['last_modified']}
+        self.__xhr_payloads__ = cached.get('xhr_payloads', list())
+
+    def __save__(self, url: str):
+        if self.__browser__ | (not self.success()) | (self.__strategy__ == cbn_utils.CACHE) | (not self.__ready__(self.__html__)):
+            return
+        cbn_utils.page_cache.put(url, {
+            'current_url': self.__current_url__,
+            'html': self.__html__,
+            'status_code': self.__status_code__,
+            'etag': self.__validators__['etag'],
+            'last_modified': self.__validators__['last_modified'],
+            'xhr_payloads': self.__xhr_payloads__
+        })
+
+    def __ready_check__(self) -> str:
+        # Page type whose content is rendered with JavaScript, if any
+        if cbn_utils.NCAA_DOMAIN in self.url():
+            return '' # rendered on the server
+        page_type = cbn_utils.page_type(self.url())
+        return page_type if page_type in self.__READY_SCRIPTS__.keys() else ''
+
+    def __ready__(self, html: str) -> bool:
+        # Has the content we parse been rendered?
+        page_type = self.__ready_check__()
+        if page_type == cbn_utils.PLAYER:
+            return re.search(r'<th[^>]*>[^<]*Total', html) != None
+        if page_type == cbn_utils.ROSTER:
+            if any([cbn_utils.is_roster_payload(payload) for payload in self.__xhr_payloads__]):
+                return True # parsed without the DOM
+            markers = ['sidearm-roster-player-container', 's-person-card', '<table', 'roster: {', 'window.__INITIAL_STATE__']
+            return any(marker in html for marker in markers) | html.lstrip().startswith(('{', '[')) # JSON from API
+        return True
+
+    def __wait_until_ready__(self):
+        # Evaluate the page type's readiness predicate in the browser until it passes or times out
+        page_type = self.__ready_check__()
+        if page_type == '':
+            return
+        def ready(driver) -> bool:
+            if driver.execute_script(self.__READY_SCRIPTS__[page_type]):
+                return True
+            if (not (cbn_utils.CAPTURE_XHR & (page_type == cbn_utils.ROSTER))) or (not driver.execute_script(self.__XHR_READY_SCRIPT__, cbn_utils.xhr_patterns)):
+                return False
+            # No need to wait for the DOM once an API response holding the roster has arrived; other responses keep us waiting
+            self.__read_xhr_payloads__()
+            return any([cbn_utils.is_roster_payload(payload) for payload in self.__xhr_payloads__])
+        try:
+            WebDriverWait(self.__driver__, cbn_utils.ready_timeouts[page_type], poll_frequency = 0.1).until(ready)
+        except TimeoutException:
+            if page_type == cbn_utils.PLAYER:
                 cbn_utils.log('Stats never loaded...')
-        elif ('/roster' in self.url()) & (cbn_utils.NCAA_DOMAIN not in self.url()):
-            pauses = 0
-            while ('sidearm-roster-player-container' not in self.__driver__.page_source) & ('<table' not in self.__driver__.page_source) & (pauses < 3):
-                cbn_utils.pause(None) # Make sure sidearm has loaded
-                pauses += 1
+
+    def __fetch_http__(self, url: str, cached: dict | None = None) -> bool:
+        headers = dict()
+        if cached != None:
+            # Ask the server whether our stale copy is still current
+            if cached['etag'] != '':
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified'] != '':
+                headers['If-Modified-Since'] = cached['last_modified']
+        response = cbn_utils.http_get(url, headers = headers)
+        if response == None:
+            return False
+        if (response.status_code == 304) & (cached != None):
+            self.__load__(cached)
+            cbn_utils.page_cache.touch(url)
+            return True
+        self.__validators__ = {'etag': response.headers.get('ETag', ''), 'last_modified': response.headers.get('Last-Modified', '')}
+        html = response.text
+        if cbn_utils.is_challenge(response.status_code, html):
+            return False # escalate to browser
+        if not (200 <= response.status_code < 300):
+            self.__status_code__ = response.status_code
+            return False # error pages are not content; let the browser try (http_get already retried 429 and 5xx)
+        if not self.__ready__(html):
+            return False # needs JavaScript to render
+        self.__strategy__ = cbn_utils.HTTP
+        self.__current_url__ = response.url
+        self.__html__ = html
+        self.__status_code__ = response.status_code
+        self.__success__ = True
+        return True
+
+    def __fetch_browser__(self, url: str):
+        self.__strategy__ = cbn_utils.BROWSER
+        self.__driver__ = cbn_utils.driver_pool.lease()
+        try:
+            self.__read_browser__(url)
+            if self.success() & (not cbn_utils.is_challenge(self.__status_code__, self.__html__)):
+                cbn_utils.save_browser_session(self.__driver__, url) # e.g. a solved WAF challenge, for the HTTP client and later runs
+        finally:
+            if not self.__browser__:
+                self.release() # interactive pages keep their driver until released
+
+    def __read_browser__(self, url: str):
+        cbn_utils.get(url, self.__driver__)
+        self.__wait_until_ready__()
         self.__html__ = self.__driver__.page_source
+        self.__current_url__ = self.__driver__.current_url
 
-        for log_entry in self.__driver__.get_log('performance'):
-            message = json.loads(log_entry['message'])['message']
+        self.__read_xhr_payloads__()
+        status_found = False
+        for message in self.__performance_log__:
             if message['method'] == 'Network.responseReceived':
                 response = message['params']['response']
-                if self.__driver__.current_url.replace('?serverSide', '') == response['url'].replace('?serverSide', ''):
+                if (not status_found) & (self.__driver__.current_url.replace('?serverSide', '') == response['url'].replace('?serverSide', '')):
                     self.__status_code__ = response['status']
                     self.__success__ = (200 <= self.__status_code__ < 300)
                     if not self.__success__:
                         self.__error_message__ = self.__status_code__
-                    break
-        return self.__html__
+                    status_found = True
+            elif message['method'] == 'Network.loadingFinished':
+                self.__bytes__ += message['params']['encodedDataLength']
+
+    def __read_xhr_payloads__(self):
+        # Keep the JSON the page requested for itself so it can be parsed without the DOM
+        self.__performance_log__ += [json.loads(log_entry['message'])['message'] for log_entry in self.__driver__.get_log('performance')]
+        if not cbn_utils.CAPTURE_XHR:
+            return
+        xhr_request_ids, finished_request_ids = list(), set()
+        for message in self.__performance_log__:
+            if message['method'] == 'Network.responseReceived':
+                response = message['params']['response']
+                if cbn_utils.is_xhr_payload(response['url'], response.get('mimeType', '')):
+                    xhr_request_ids.append(message['params']['requestId'])
+            elif message['method'] == 'Network.loadingFinished':
+                finished_request_ids.add(message['params']['requestId'])
+        for request_id in xhr_request_ids:
+            if (request_id not in finished_request_ids) | (request_id in self.__xhr_request_ids__):
+                continue
+            self.__xhr_request_ids__.add(request_id)
+            try:
+                body = self.__driver__.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            except Exception:
+                continue # evicted from the browser's buffer
+            self.__xhr_payloads__.append(base64.b64decode(body['body']).decode() if body['base64Encoded'] else body['body'])
+
+    def xhr_payloads(self) -> list[str]:
+        return self.__xhr_payloads__
+
+    def strategy(self) -> str:
+        return self.__strategy__
 
     def driver(self):
         return self.__driver__
 
+    def release(self):
+        # Return the browser to the pool
+        cbn_utils.driver_pool.release(self.__driver__)
+        self.__driver__ = None
+
 class RosterPage(WebPage):
-    # Class variables
-    __GRAD_YEAR_MAP__ = {
-        int(config['YEAR_SHORT']): "Senior",
-        (int(config['YEAR_SHORT']) + 1): "Junior",
-        (int(config['YEAR_SHORT']) + 2): "Sophomore",
-        (int(config['YEAR_SHORT']) + 3): "Freshman",
-        (int(config['YEAR_SHORT']) + 4): "Freshman",
-        (int(config['YEAR_SHORT']) + 5): "Freshman"
-    }
-    __GRAD_YEAR_MAP__ = {f"'{k}": v for k, v in __GRAD_YEAR_MAP__.items()}
+    @staticmethod
+    @functools.cache
+    def __grad_year_map__() -> dict[str, str]:
+        year_short = int(google_sheets.config()['YEAR_SHORT'])
+        grad_year_map = {
+            year_short: "Senior",
+            (year_short + 1): "Junior",
+            (year_short + 2): "Sophomore",
+            (year_short + 3): "Freshman",
+            (year_short + 4): "Freshman",
+            (year_short + 5): "Freshman"
+        }
+        return {f"'{k}": v for k, v in grad_year_map.items()}
 
-    def __init__(self, url = '', corrections: dict[str, str] = dict()):
+    def __init__(self, url = '', corrections: dict[str, str] | cbn_utils.Corrections = dict()):
         WebPage.__init__(self, url)
         self.__result__ = ''
         self.__players__: list[Player] = None
-        self.__corrections__ = corrections
+        self.__corrections__ = cbn_utils.corrections(corrections) # compiled once per page
         if url != '':
             self.__fetch_players__()
 
@@ -144,10 +308,17 @@ class RosterPage(WebPage):
             # roster has already been fetched
             return
         html = super().html()
+        for payload in self.xhr_payloads():
+            try:
+                # Parse roster JSON the page requested from the API
+                self.__parse_sidearm_json__(payload, from_api = True)
+                return
+            except (ValueError, KeyError, TypeError, AttributeError):
+                self.__result__, self.__players__ = '', None # not a roster, keep looking
         if len(html) == 0:
             self.__players__ = list()
             return
-        if (html[0] == '{') & (html[-1] == '}'): # Actually JSON, not HTML
+        if html.strip()[:1] + html.strip()[-1:] in ['{}', '[]']: # Actually JSON, not HTML
             # Parse roster JSON from API
             self.__parse_sidearm_json__(html, from_api = True)
             return
@@ -156,15 +327,15 @@ class RosterPage(WebPage):
             # Parse roster JSON
             self.__parse_sidearm_json__(roster_json_match[1])
             return
-        soup = BeautifulSoup(html, 'html.parser')
-        for script in soup.find_all('script'):
-            if re.search('window.__INITIAL_STATE__', script.text) != None:
-                # Parse roster JSON
-                json_string = script.text.replace("window.__INITIAL_STATE__=\'", '')[:-2]
-                json_string = json_string[(json_string.find(',"players":') + 11):(json_string.find('"coaches":') - 1)]
-                json_string = json_string.replace('\\', '').replace("'", '')
-                self.__parse_sidearm_json__(json_string, from_api = True)
-                return
+        script = cbn_utils.script_text(html, 'window.__INITIAL_STATE__')
+        if script != None:
+            # Parse roster JSON
+            json_string = script.replace("window.__INITIAL_STATE__=\'", '')[:-2]
+            json_string = json_string[(json_string.find(',"players":') + 11):(json_string.find('"coaches":') - 1)]
+            json_string = json_string.replace('\\', '').replace("'", '')
+            self.__parse_sidearm_json__(json_string, from_api = True)
+            return
+        soup = cbn_utils.soup(html, parse_only = cbn_utils.roster_content)
         cards = soup.find_all('div', {'class': 's-person-card'})
         if len(cards) > 0:
             # Parse sidearm cards
@@ -364,7 +535,8 @@ class RosterPage(WebPage):
         self.__result__ += f' Parsed table: | {" | ".join(list(df.columns))} |'
         df.dropna(axis = 0, how = 'all', inplace = True) # remove rows with all NaN
         cols = ['last_name', 'first_name', 'positions', 'throws', 'year', 'city', 'province', 'canadian']
-        for dictionary in df.to_dict(orient = 'records'):
+        canadian_df = df.astype(str).apply(lambda column: cbn_utils.is_canadian_series(column.str.split(':').str[-1].str.strip())) # every cell classified up front, a column at a time
+        for dictionary, canadian_dictionary in zip(df.to_dict(orient = 'records'), canadian_df.to_dict(orient = 'records')):
             last_name = ''
             first_name = ''
             positions = set()
@@ -390,8 +562,6 @@ class RosterPage(WebPage):
                         if ((key == 'name') & ('name.1' in dictionary.keys())) | ((key == 'name.1') & ('name' in dictionary.keys())):
                             first_name, last_name = dictionary['name'], dictionary['name.1']
                         else:
-                            for old, new in self.__corrections__.items():
-                                value_str = value_str.replace(old, new)
                             first_name, last_name = self.format_player_name(cbn_utils.replace(value_str, self.__corrections__))
 
                     # Set positions column
@@ -415,7 +585,7 @@ class RosterPage(WebPage):
                         if is_canadian:
                             city, province = self.format_player_hometown(value_str)
                     elif (not is_canadian) & (key != 'connect'): # elif ('home' in key) | ('province' in key):
-                        is_canadian = cbn_utils.is_canadian(value_str)
+                        is_canadian = bool(canadian_dictionary[key])
                         if is_canadian:
                             city, province = self.format_player_hometown(value_str)
             player = Player(
@@ -432,76 +602,17 @@ class RosterPage(WebPage):
 
     def format_player_class(self, string: str):
         # Output Freshman, Sophomore, Junior or Senior
-        if string in self.__GRAD_YEAR_MAP__.keys():
-            return self.__GRAD_YEAR_MAP__[string]
-        if ('j' in string) | ('3' in string):
-            return 'Junior'
-        elif ('so' in string) | (string == 's') | ('2' in string):
-            return 'Sophomore'
-        elif ('sen' in string) | ('sr' in string) | ('gr' in string) | ('4' in string) | ('5' in string) | ('6' in string):
-            return 'Senior'
-        elif ('f' in string) | ('1' in string) | ('hs' in string) | (string == 'rs.') | (string == 'rs'):
-            return 'Freshman'
-        return ''
+        if string in self.__grad_year_map__().keys():
+            return self.__grad_year_map__()[string]
+        return normalize.player_class(string)
 
     @staticmethod
     def format_player_name(name_string: str):
-        if name_string == name_string.upper(): # All caps... Set to proper case
-            name_string = ' '.join([name_part[0].upper() + name_part[1:].lower() for name_part in name_string.split()])
-        full_name_string =  ' '.join(name_string.split(',')[::-1]).strip() # Format as "First Last"
-        full_name_string = re.sub(r'\s*\d+', '', full_name_string) # Remove digits, e.g. First Last 0
-
-        # Account for tables that have name as First Last First Last
-        half_length = int(len(full_name_string) / 2)
-        if half_length % 2 == 1:
-            half_length = half_length - 1
-        if full_name_string[:half_length].strip() == full_name_string[half_length:].strip():
-            full_name_string = full_name_string[:half_length].strip() 
-
-        full_name_string_split = full_name_string.split(None, 1)
-        if len(full_name_string_split) == 2:
-            first_name, last_name = full_name_string_split
-        else:
-            first_name, last_name = ' ', full_name_string
-        return first_name, last_name
+        return normalize.name(name_string)
 
     @staticmethod
     def format_player_position(string: str):
-        position_set = set()
-        # Pitcher
-        if ('P' in string) & ('STOP' not in string) & ('PLAY' not in string):
-            position_set.add('P')
-        # Catcher
-        if ('C' in string) & ('CF' not in string) & ('CI' not in string) & ('PITCHER' not in string):
-            position_set.add('C')
-        # Infield
-        if ('IN' in string) | ('IF' in string):
-            position_set.add('INF')
-        else: # 1B, 2B, 3B
-            for base in range(1, 4):
-                if str(base) in string:
-                    position_set.add(f'{base}B')
-            if 'FIRST' in string:
-                position_set.add('1B')
-            if 'SECOND' in string:
-                position_set.add('2B')
-            if 'THIRD' in string:
-                position_set.add('3B')
-            if ('SS' in string) | ('SHORT' in string):
-                position_set.add('SS')
-        # Outfield
-        if ('OF' in string) | ('OUT' in string):
-            position_set.add('OF')
-        else:
-            for outfield in ['LF', 'CF', 'RF']:
-                if outfield in string:
-                    position_set.add(outfield)
-        # Designated Hitter & Utility
-        if ('DH' in string) | ('DES' in string):
-            position_set.add('DH')
-        if ('UT' in string) & ('OUT' not in string):
-            position_set.add('UTIL')
-        return position_set
+        return set(normalize.position(string))
 
     @staticmethod
     def format_player_handedness(character: str):
@@ -516,42 +627,18 @@ class RosterPage(WebPage):
 
     @staticmethod
     def format_player_hometown(string: str):
-        city, province = '', ''
-        string2 = re.sub(r'\s*\(*(?:Canada|CANADA|Can.|CN|CAN|CA)\)*\.*', '', string) # Remove references to Canada
-
-        parentheses_search = re.search(r'\(([^)]+)', string2) # Search for text within parentheses
-        if parentheses_search != None:
-            if parentheses_search.group(1).count(',') == 1:
-                string2 = parentheses_search.group(1) # Text within parentheses is city/province
-            else:
-                string2 = string2.split('(')[0].strip() # Text within parentheses is not helpful
-
-        formatted = False
-        for province_name, province_abbreviations in cbn_utils.province_strings.items():
-            for province_abbreviation in [province_name] + province_abbreviations:
-                if province_abbreviation.lower() in string2.lower():
-                    # Ex. ', on' in "burlington, on / nelson hs" or "nelson hs / burlington, on"
-                    city = re.split(province_abbreviation, string2, flags=re.IGNORECASE)[0].split('/')[-1]
-                    province = province_name
-                    formatted = True
-        if not formatted: # Province likely not listed, just get city
-            city = string2.split(',')[0]
-        city = re.sub(r'[^\w\-\s\.]', '', city).strip() # remove unwanted characters from city
-        city = city.replace('Hometown ', '')
-        if city == city.upper(): # convert from all-caps to proper case, if necessary
-            city = ' '.join([city_part[0].upper() + city_part[1:].lower() for city_part in city.split()])
-
+        city, province = normalize.hometown(string)
         cbn_utils.log(f'   "{string}" parsed to ---> City: "{city}" | Province: "{province}"')
-        return city, province 
+        return city, province
 
 class StatsPage(WebPage):
     # Class variables
     __DF_COLUMNS__ = list(cbn_utils.stats_labels['batting'].keys()) + list(cbn_utils.stats_labels['pitching'].keys())
 
-    def __init__(self, url = '', year = '', corrections: dict[str, str] = dict()):
+    def __init__(self, url = '', year = '', corrections: dict[str, str] | cbn_utils.Corrections = dict()):
         WebPage.__init__(self, url)
         self.__df__ = pd.DataFrame(0, columns = self.__DF_COLUMNS__, index = [0])
-        self.__corrections__ = corrections
+        self.__corrections__ = cbn_utils.corrections(corrections) # compiled once per page
         self.__year__ = year
         if url.endswith('roster') | url.endswith('lineup'):
             self.__fetch_stat_ids__()
@@ -571,7 +658,7 @@ class StatsPage(WebPage):
         url_parts = urlparse(self.url())
         if not self.success():
             return
-        soup = BeautifulSoup(self.html(), 'html.parser')
+        soup = cbn_utils.soup(self.html())
         player_links = list()
         if self.url().endswith('lineup'):
             for div in soup.find_all('div', {'class': 'tabbed-ajax-content'}):
@@ -580,35 +667,27 @@ class StatsPage(WebPage):
                     if ('&pos=h&r=0&' in data_url) | ('&pos=p&r=0&' in data_url):
                         data_url = data_url.replace('sort=avg', 'sort=gp').replace('sort=era', 'sort=pgp')
                         players_page = WebPage(data_url)
-                        soup2 = BeautifulSoup(players_page.html(), 'html.parser')
+                        soup2 = cbn_utils.soup(players_page.html())
                         for a in soup2.find_all('a'):
                             if '/players/' in a['href']:
-                                player = a.text
-                                for correct_from, correct_to in self.__corrections__.items():
-                                    player = player.replace(correct_from, correct_to)
-                                last_name = RosterPage.format_player_name(player)[1]
-                                first_name = RosterPage.format_player_name(player)[0]
+                                first_name, last_name = normalize.name(cbn_utils.replace(a.text, self.__corrections__))
                                 player_links.append({'last_name': last_name, 'first_name': first_name, 'stats_url': f'{url_parts.scheme}://{url_parts.netloc}{a["href"]}'})
         else:
             for a in soup.find_all('a'):
                 if '/players/' in a['href']:
-                    player = a.text
-                    for correct_from, correct_to in self.__corrections__.items():
-                        player = player.replace(correct_from, correct_to)
-                    last_name = RosterPage.format_player_name(player)[1]
-                    first_name = RosterPage.format_player_name(player)[0]
+                    first_name, last_name = normalize.name(cbn_utils.replace(a.text, self.__corrections__))
                     player_links.append({'last_name': last_name, 'first_name': first_name, 'stats_url': f'{url_parts.scheme}://{url_parts.netloc}{a["href"]}'})
         self.__df__ = pd.DataFrame(player_links).drop_duplicates(ignore_index = True)
 
     def __fetch_ncaa_stats__(self):
-        soup = BeautifulSoup(self.html(), 'html.parser')
+        soup = cbn_utils.soup(self.html())
         if soup.find('table') == None:
             return cbn_utils.log(f'ERROR: {self.url()} had no tables')
         hitting_cols = ['G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'BA', 'OBPct', 'SlgPct']
         pitching_cols = ['App', 'GS', 'IP', 'W', 'L', 'ER', 'H', 'BB', 'ERA', 'SV', 'SO']
         hitting_df, pitching_df = pd.DataFrame(columns = hitting_cols), pd.DataFrame(columns = pitching_cols)
+        dfs = pd.read_html(self.html()) # both tabs read the same tables, so parse them once
         for tab in ['current', 'other']:
-            dfs = pd.read_html(self.html())
             for df in dfs:
                 if 'Year' not in df.columns:
                     continue
@@ -680,14 +759,18 @@ class StatsPage(WebPage):
 class SchedulePage(WebPage):
     def __init__(self, url = ''):
         WebPage.__init__(self, url)
-        soup = BeautifulSoup(self.html(), 'html.parser')
-        self.box_score_links = {urljoin(url, a['href']) for a in soup.find_all('a') if ('/boxscore' in a['href'].replace('_', '') if a.has_attr('href') else False)}
+        soup = cbn_utils.soup(self.html(), parse_only = cbn_utils.box_score_links)
+        self.box_score_links = {urljoin(url, a['href']) for a in soup.find_all(cbn_utils.box_score_links)} # filtered again for html5lib, which builds every tag
 
 class BoxScore(WebPage):
-    def __init__(self, url = '', corrections: dict[str, str] = dict()):
+    def __init__(self, url = '', corrections: dict[str, str] | cbn_utils.Corrections = dict()):
         url = url.replace('box_score', 'individual_stats')
         WebPage.__init__(self, url)
-        soup = BeautifulSoup(self.html(), 'html.parser')
+        self.__corrections__ = cbn_utils.corrections(corrections)
+        self.__parse_positions__(url)
+
+    def __parse_positions__(self, url: str):
+        soup = cbn_utils.soup(self.html())
         positions = list()
 
         for table in soup.find_all('table'):
@@ -697,18 +780,19 @@ class BoxScore(WebPage):
                     a = tds[1].find('a')
                     if a != None:
                         if '/players/' in a['href']:
-                            for position in tds[2].text.upper().split('/'):
-                                positions.append({'player': cbn_utils.replace(a.text.strip(), corrections), 'positions': position.strip()})
+                            for position in normalize.box_score_positions(tds[2].text):
+                                positions.append({'player': a.text.strip(), 'positions': position})
 
         for th in soup.find_all('th'):
             a = th.find('a')
             if a != None:
                 position_span = th.find('span')
                 if ('/players' in a['href']) & (position_span != None):
-                    for position in position_span.text.upper().split('/'):
-                        positions.append({'player': cbn_utils.replace(a.text, corrections), 'positions': position})
+                    for position in normalize.box_score_positions(position_span.text):
+                        positions.append({'player': a.text, 'positions': position})
 
         self.positions_df = pd.DataFrame(positions, columns = ['player', 'positions'])
+        self.positions_df['player'] = self.__corrections__.replace_series(self.positions_df['player'])
         self.positions_df = self.positions_df.drop_duplicates()
         self.positions_df = self.positions_df[self.positions_df['positions'] != '']
         self.positions_df['url'] = url
@@ -719,7 +803,7 @@ class School:
     school = School(name = 'U.S. Air Force Academy', league = 'NCAA', division = '1', state = 'CO', roster_page = Page(url = 'https://goairforcefalcons.com/sports/baseball/roster/2023'))
     school.players()
     '''
-    def __init__(self, id = '', name = '', league = '', division = '', state = '', roster_url = '', stats_url = '', corrections: dict[str, str] = dict()):
+    def __init__(self, id = '', name = '', league = '', division = '', state = '', roster_url = '', stats_url = '', corrections: dict[str, str] | cbn_utils.Corrections = dict()):
         # Check types
         cbn_utils.check_arg_type(name = 'id', value = id, value_type = str)
         cbn_utils.check_arg_type(name = 'name', value = name, value_type = str)
@@ -0,0 +1,140 @@
+import cbn_utils
+import functools
+import re
+
+# Roster text -> sheet values. The same strings ('RHP', 'So.', 'Toronto, Ont.') repeat across thousands of rosters,
+# so every normalizer is memoized in a bounded LRU cache; cache_info() shows how well that's working.
+CACHE_SIZE = int(cbn_utils.setting('NORMALIZE_CACHE_SIZE', 8192))
+
+canada_reference_pattern = re.compile(r'\s*\(*(?:Canada|CANADA|Can.|CN|CAN|CA)\)*\.*')
+parentheses_pattern = re.compile(r'\(([^)]+)')
+city_characters_pattern = re.compile(r'[^\w\-\s\.]')
+name_digits_pattern = re.compile(r'\s*\d+')
+# (province, abbreviation as written, pattern to split on), in cbn_utils.province_strings order; abbreviations are used as regexes, as before
+province_patterns = [
+    (province_name, province_abbreviation.lower(), re.compile(province_abbreviation, re.IGNORECASE))
+    for province_name, province_abbreviations in cbn_utils.province_strings.items()
+    for province_abbreviation in [province_name] + province_abbreviations
+]
+any_province_pattern = re.compile('|'.join([re.escape(abbreviation) for _, abbreviation, _ in sorted(province_patterns, key = lambda x: len(x[1]), reverse = True)]))
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def hometown(string: str) -> tuple[str, str]:
+    # (city, province)
+    city, province = '', ''
+    string2 = canada_reference_pattern.sub('', string) # Remove references to Canada
+
+    parentheses_search = parentheses_pattern.search(string2) # Search for text within parentheses
+    if parentheses_search != None:
+        if parentheses_search.group(1).count(',') == 1:
+            string2 = parentheses_search.group(1) # Text within parentheses is city/province
+        else:
+            string2 = string2.split('(')[0].strip() # Text within parentheses is not helpful
+
+    formatted = False
+    lower = string2.lower()
+    if any_province_pattern.search(lower) != None: # skip the per-province loop when no province is mentioned
+        for province_name, province_abbreviation, province_pattern in province_patterns:
+            if province_abbreviation in lower:
+                # Ex. ', on' in "burlington, on / nelson hs" or "nelson hs / burlington, on"
+                city = province_pattern.split(string2)[0].split('/')[-1]
+                province = province_name
+                formatted = True
+    if not formatted: # Province likely not listed, just get city
+        city = string2.split(',')[0]
+    city = city_characters_pattern.sub('', city).strip() # remove unwanted characters from city
+    city = city.replace('Hometown ', '')
+    if city == city.upper(): # convert from all-caps to proper case, if necessary
+        city = ' '.join([city_part[0].upper() + city_part[1:].lower() for city_part in city.split()])
+    return city, province
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def position(string: str) -> frozenset[str]:
+    position_set = set()
+    # Pitcher
+    if ('P' in string) & ('STOP' not in string) & ('PLAY' not in string):
+        position_set.add('P')
+    # Catcher
+    if ('C' in string) & ('CF' not in string) & ('CI' not in string) & ('PITCHER' not in string):
+        position_set.add('C')
+    # Infield
+    if ('IN' in string) | ('IF' in string):
+        position_set.add('INF')
+    else: # 1B, 2B, 3B
+        for base in range(1, 4):
+            if str(base) in string:
+                position_set.add(f'{base}B')
+        if 'FIRST' in string:
+            position_set.add('1B')
+        if 'SECOND' in string:
+            position_set.add('2B')
+        if 'THIRD' in string:
+            position_set.add('3B')
+        if ('SS' in string) | ('SHORT' in string):
+            position_set.add('SS')
+    # Outfield
+    if ('OF' in string) | ('OUT' in string):
+        position_set.add('OF')
+    else:
+        for outfield in ['LF', 'CF', 'RF']:
+            if outfield in string:
+                position_set.add(outfield)
+    # Designated Hitter & Utility
+    if ('DH' in string) | ('DES' in string):
+        position_set.add('DH')
+    if ('UT' in string) & ('OUT' not in string):
+        position_set.add('UTIL')
+    return frozenset(position_set) # shared between callers, so immutable
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def player_class(string: str) -> str:
+    # Freshman, Sophomore, Junior or Senior from a lowercase class string (graduation years are handled by RosterPage)
+    if ('j' in string) | ('3' in string):
+        return 'Junior'
+    elif ('so' in string) | (string == 's') | ('2' in string):
+        return 'Sophomore'
+    elif ('sen' in string) | ('sr' in string) | ('gr' in string) | ('4' in string) | ('5' in string) | ('6' in string):
+        return 'Senior'
+    elif ('f' in string) | ('1' in string) | ('hs' in string) | (string == 'rs.') | (string == 'rs'):
+        return 'Freshman'
+    return ''
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def name(name_string: str) -> tuple[str, str]:
+    # (first_name, last_name)
+    if name_string == name_string.upper(): # All caps... Set to proper case
+        name_string = ' '.join([name_part[0].upper() + name_part[1:].lower() for name_part in name_string.split()])
+    full_name_string =  ' '.join(name_string.split(',')[::-1]).strip() # Format as "First Last"
+    full_name_string = name_digits_pattern.sub('', full_name_string) # Remove digits, e.g. First Last 0
+
+    # Account for tables that have name as First Last First Last
+    half_length = int(len(full_name_string) / 2)
+    if half_length % 2 == 1:
+        half_length = half_length - 1
+    if full_name_string[:half_length].strip() == full_name_string[half_length:].strip():
+        full_name_string = full_name_string[:half_length].strip()
+
+    full_name_string_split = full_name_string.split(None, 1)
+    if len(full_name_string_split) == 2:
+        first_name, last_name = full_name_string_split
+    else:
+        first_name, last_name = ' ', full_name_string
+    return first_name, last_name
+
+@functools.lru_cache(maxsize = CACHE_SIZE)
+def box_score_positions(string: str) -> tuple[str, ...]:
+    # "ss/2b" -> ('SS', '2B')
+    return tuple([position_string.strip() for position_string in string.upper().split('/')])
+
+normalizers = [hometown, position, player_class, name, box_score_positions]
+
+def cache_info() -> dict[str, dict]:
+    # Hits, misses and hit rate of every normalizer in this process
+    info = dict()
+    for normalizer in normalizers:
+        hits, misses, _, size = normalizer.cache_info()
+        info[normalizer.__name__] = {'hits': hits, 'misses': misses, 'size': size, 'hit_rate': round(hits / (hits + misses), 3) if hits + misses > 0 else 0}
+    return info
+
+def log_cache_info():
+    cbn_utils.log('Normalizer caches: ' + ', '.join([f'{name_} {info["hit_rate"]:.0%} of {info["hits"] + info["misses"]}' for name_, info in cache_info().items()]))
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+CLASS_YEARS = {'Freshman': 'Freshmen', 'Sophomore': 'Sophomores', 'Junior': 'Juniors', 'Senior': 'Seniors'} # year: section label
+
+def names(df: pd.DataFrame) -> pd.Series:
+    return df['first_name'] + ' ' + df['last_name']
+
+def hometowns(df: pd.DataFrame) -> pd.Series:
+    # "City, Province", or whichever of the two is known
+    city, province = df['city'].astype(str), df['province'].astype(str) # province may be categorical
+    both = (city != '') & (province != '')
+    return (city + ', ' + province).where(both, city + province)
+
+def positions(df: pd.DataFrame, column: str = 'positions') -> pd.Series:
+    # P -> LHP/RHP, one vectorized replace per throws value
+    result = df[column].copy()
+    for throws in df['throws'].unique():
+        mask = df['throws'] == throws
+        result[mask] = df.loc[mask, column].str.replace('P', f'{throws}HP', regex = False)
+    return result
+
+def class_years(df: pd.DataFrame) -> pd.Series:
+    # Position in CLASS_YEARS of each player's section (no year counts as Freshman), -1 if none
+    order = {year: i for i, year in enumerate(CLASS_YEARS.keys())}
+    order[''] = 0
+    return df['year'].astype(str).map(order).fillna(-1).astype(int)
+
+def blocks(df: pd.DataFrame, groups: pd.Series, group_labels: list[str], columns: list[str], classes: pd.Series | None = None) -> tuple[list[list], dict[int, int]]:
+    # Ready-to-publish rows for every group in one sort: a header, then a titled table per class year
+    # (or a single untitled table without classes), then a blank row. Rows keep the frame's order within a table.
+    # Also returns the number of rows in each group, including those without a class year.
+    width = len(columns)
+    blank_row = [''] * width
+    labelled = classes is not None
+    groups = groups.to_numpy()
+    classes = np.zeros(len(groups), dtype = int) if classes is None else classes.to_numpy()
+    order = np.lexsort((classes, groups)) # stable, so the frame's order survives within a table
+    order = order[groups[order] != -1]
+    if len(order) == 0:
+        return list(), dict()
+    values = df[columns].iloc[order].values.tolist()
+    group_keys, class_keys = groups[order], classes[order]
+    starts = np.flatnonzero(np.r_[True, (group_keys[1:] != group_keys[:-1]) | (class_keys[1:] != class_keys[:-1])])
+    ends = np.r_[starts[1:], len(order)]
+
+    rows, counts = list(), dict()
+    for start, end in zip(starts, ends):
+        group, class_year = int(group_keys[start]), int(class_keys[start])
+        if group not in counts:
+            if len(counts) > 0:
+                rows.append(blank_row)
+            rows.append([group_labels[group]] + [''] * (width - 1))
+            counts[group] = 0
+        counts[group] += int(end - start)
+        if class_year == -1:
+            continue
+        if class_year > 0:
+            rows.append(blank_row)
+        if labelled:
+            rows.append([list(CLASS_YEARS.values())[class_year]] + [''] * (width - 1))
+        rows += [list(columns)] + values[start:end]
+    if len(counts) > 0:
+        rows.append(blank_row)
+    return rows, counts
@@ -0,0 +1,63 @@
+import pandas as pd
+
+# Column types for the Hub's data tabs; columns not listed stay strings
+INT = 'Int64' # nullable, blank -> <NA>
+FLOAT = 'float64' # blank -> NaN
+DATE = 'datetime64[ns]' # YYYY-MM-DD, blank -> NaT
+CATEGORY = 'category' # blank stays '' so comparisons to '' still work
+
+COUNT_STATS = ['G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'APP', 'GS', 'W', 'L', 'ER', 'HA', 'BB', 'SV', 'K']
+RATE_STATS = ['AVG', 'OBP', 'SLG', 'OPS', 'ERA', 'IP']
+GAMES_BY_POSITION = ['G.C', 'G.1B', 'G.2B', 'G.3B', 'G.SS', 'G.OF', 'G.DH']
+
+STATS = {**{stat: INT for stat in COUNT_STATS}, **{stat: FLOAT for stat in RATE_STATS}}
+PLAYERS = {
+    'year': CATEGORY,
+    'province': CATEGORY,
+    'added': DATE,
+    'last_confirmed_on_roster': DATE,
+    'last_stats_update': DATE,
+    **STATS,
+    **{column: INT for column in GAMES_BY_POSITION}
+}
+
+SCHEMAS = {
+    'Schools': {'league': CATEGORY, 'division': CATEGORY, 'state': CATEGORY, 'last_roster_check': DATE},
+    'Players': PLAYERS,
+    'Players (Manual)': PLAYERS,
+    'Players (Minors)': {'mlbam_id': INT, 'province': CATEGORY, 'added': DATE, 'last_confirmed': DATE, 'last_stats_update': DATE, **STATS},
+    'Coaches': {'province': CATEGORY},
+    'Corrections': {}
+}
+
+def column_types(tabs: list[str], columns: list[str], suffixes: tuple[str, str] = ('_x', '_y')) -> dict[str, str]:
+    # Type of every column of a frame read from (or joined across) tabs, following join suffixes back to their tab
+    schema = dict()
+    for tab in reversed(tabs): # earlier tabs win
+        schema.update(SCHEMAS.get(tab, dict()))
+    types = dict()
+    for column in columns:
+        base = next((column[:-len(suffix)] for suffix in suffixes if (suffix != '') and column.endswith(suffix)), column)
+        if column in schema:
+            types[column] = schema[column]
+        elif base in schema:
+            types[column] = schema[base]
+    return types
+
+def parse(df: pd.DataFrame, types: dict[str, str]) -> pd.DataFrame:
+    # Sheet display strings to typed columns, once per frame
+    df = df.copy()
+    for column, type_ in types.items():
+        values = df[column].where(df[column].notna(), '').astype(str).str.strip()
+        if type_ == INT:
+            df[column] = pd.to_numeric(values.str.replace(',', '', regex = False), errors = 'coerce').round().astype(INT)
+        elif type_ == FLOAT:
+            df[column] = pd.to_numeric(values.str.replace(',', '', regex = False), errors = 'coerce').astype(FLOAT)
+        elif type_ == DATE:
+            df[column] = pd.to_datetime(values, format = '%Y-%m-%d', errors = 'coerce')
+        elif type_ == CATEGORY:
+            df[column] = values.astype(CATEGORY)
+    return df
+
+def typed(df: pd.DataFrame, tabs: list[str]) -> pd.DataFrame:
+    return parse(df, column_types(tabs, list(df.columns)))
@@ -1,7 +1,7 @@
 import google_sheets
 import cbn_utils
+import normalize
 from model import School, Player, WebPage, StatsPage, SchedulePage, BoxScore
-from bs4 import BeautifulSoup
 import pandas as pd
 from datetime import datetime, timedelta
 import time
@@ -13,12 +13,12 @@ pd.set_option('display.max_colwidth', None) # show full width of showing cols
 pd.set_option('display.expand_frame_repr', False) # print cols side by side as it's supposed to be
 
 today_str = (datetime.now() if cbn_utils.RUNNING_LOCALLY else datetime.now() - timedelta(hours = 5)).strftime("%Y-%m-%d")
+run_id = cbn_utils.setting('RUN_ID', cbn_utils.setting('GITHUB_RUN_ID', today_str)) # re-running a GitHub Actions job resumes its journal
 
 def schools():
     # Fetch existing schools to dataframe
-    schools_worksheet = google_sheets.hub_spreadsheet.worksheet('Schools')
     school_cols = ['id', 'name', 'league', 'division', 'state']
-    old_schools_df = google_sheets.df(schools_worksheet)[school_cols]
+    old_schools_df = google_sheets.hub_store.df('Schools')[school_cols]
 
     def compare(league: str, df: pd.DataFrame):
         if len(df.index) == 0: return
@@ -49,8 +49,8 @@ def schools():
 
     def get_ncaa_schools() :
         json_page = WebPage('https://web3.ncaa.org/directory/api/directory/memberList?type=12&sportCode=MBA').html()
-        soup = BeautifulSoup(json_page, 'html.parser')
-        json_text = soup.find('pre').text
+        soup = cbn_utils.soup(json_page)
+        json_text = soup.find('pre').text if soup.find('pre') != None else json_page # browser wraps JSON in <pre>
         df = pd.read_json(json_text)
         df = df[['orgId', 'nameOfficial', 'division', 'athleticWebUrl', 'memberOrgAddress']]
         df['name'] = df['nameOfficial'].apply(lambda x: x.split(' (')[0].strip()) # no parentheses, please
@@ -73,10 +73,10 @@ def schools():
             domain = cbn_utils.USCAA_DOMAIN
         else:
             return pd.DataFrame()
-        url = f'https://{domain}/sports/bsb/{google_sheets.config["ACADEMIC_YEAR"]}/teams?dec=printer-decorator'
+        url = f'https://{domain}/sports/bsb/{google_sheets.config()["ACADEMIC_YEAR"]}/teams?dec=printer-decorator'
         web_page = WebPage(url)
         html = web_page.html()
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = cbn_utils.soup(html)
         schools = list()
         schools_table = soup.find('table')
         if schools_table != None:
@@ -104,10 +104,10 @@ def schools():
     def get_juco_schools():
         schools = list()
 
-        web_page = WebPage('https://njcaastats.prestosports.com/sports/bsb/teams-page')
+        web_page = WebPage('https://njcaastats.prestosports.com/sports/bsb/teams-page', browser = True)
         for division_num in [0, 1, 2]:
             for _ in range(0, 10):
-                soup = BeautifulSoup(web_page.driver().page_source, 'html.parser')
+                soup = cbn_utils.soup(web_page.driver().page_source)
                 table_div = soup.find('div', {'id': f'team-listing-tab-content{division_num + 1}'})
                 school_tables = table_div.find_all('table')
 
@@ -133,6 +133,7 @@ def schools():
                 if web_page.driver().execute_script('return $("button.page-link.next").eq(' + str(division_num) + ').parent().hasClass("disabled");'):
                     break
                 web_page.driver().execute_script('$("button.page-link.next").eq(' + str(division_num) + ').click();')
+        web_page.release()
         return compare('JUCO', pd.DataFrame(schools))
 
     def get_cccaa_schools():
@@ -152,55 +153,76 @@ def schools():
     get_uscaa_schools()
 
 def find_ncaa_school_stat_ids():
-    schools_worksheet = google_sheets.hub_spreadsheet.worksheet('Schools')
-    schools_df = google_sheets.df(schools_worksheet)
+    schools_worksheet = google_sheets.hub_spreadsheet().worksheet('Schools')
+    schools_df = google_sheets.hub_store.df('Schools')
+    schools_writer = google_sheets.BatchWriter(schools_worksheet)
 
     for i, school_series in schools_df.iterrows():
         if (school_series['league'] != 'NCAA'): continue
         if (school_series['stats_id'] != ''): continue
         school_history_page = WebPage(f'https://{cbn_utils.NCAA_DOMAIN}/teams/history/MBA/{school_series["id"]}')
-        soup = BeautifulSoup(school_history_page.html(), 'html.parser')
+        soup = cbn_utils.soup(school_history_page.html())
         table = soup.find('table')
         a = table.find('a')
         if a == None: continue
-        if a.text == google_sheets.config['ACADEMIC_YEAR']:
+        if a.text == google_sheets.config()['ACADEMIC_YEAR']:
             school_stats_id = a['href'].split('/')[-1]
-            cbn_utils.pause(schools_worksheet.update(f'F{i + 2}', school_stats_id))
+            schools_writer.update(f'F{i + 2}', school_stats_id)
+    schools_writer.flush()
 
 def players():
-    schools_worksheet = google_sheets.hub_spreadsheet.worksheet('Schools')
-    schools_df = google_sheets.df(schools_worksheet)
-    players_worksheet = google_sheets.hub_spreadsheet.worksheet('Players')
+    schools_worksheet = google_sheets.hub_spreadsheet().worksheet('Schools')
+    schools_sheet = google_sheets.WorksheetCopy(schools_worksheet, index_col = 'roster_url')
+    schools_df = schools_sheet.df()
+    players_worksheet = google_sheets.hub_spreadsheet().worksheet('Players')
+    players_sheet = google_sheets.WorksheetCopy(players_worksheet, index_col = 'school_roster_url') # read once, written back every few schools
     cols = ['school_roster_url', 'last_name', 'first_name', 'positions', 'throws', 'year', 'city', 'province']
 
     # Manual corrections
-    corrections_df = google_sheets.df(google_sheets.hub_spreadsheet.worksheet('Corrections'))
-    corrections = dict(zip(corrections_df['From'], corrections_df['To']))
+    corrections_df = google_sheets.hub_store.df('Corrections')
+    corrections = cbn_utils.Corrections(dict(zip(corrections_df['From'], corrections_df['To']))) # compiled once per run
 
-    # Iterate schools' roster pages
-    roster_url = ''
+    # Schools to check
+    journal = cbn_utils.run_journal('players', run_id)
+    schools_to_check = list()
     for i, school_series in schools_df.iterrows():
         school_last_roster_check = school_series['last_roster_check']
         days_since_last_check = (datetime.today() - datetime.strptime(school_last_roster_check, "%Y-%m-%d")).days if school_last_roster_check != '' else 99
-        if i < 1459: continue # test a specific school (i should be 2 less than the row number in the google sheet)
         if (school_series['roster_url'] in ['']) | school_series['roster_url'].endswith('#') | (days_since_last_check < 2):
             continue # Skip schools that have no parseable roster site or have already been scraped recently
+        if journal.done(school_series['roster_url']):
+            continue # Already checked earlier in this run
+        schools_to_check.append((i, school_series))
 
-        school, roster_url = None, school_series['roster_url']
+    def fetch_school(school_series: pd.Series):
         try:
-            school = School(
+            return School(
                 id = school_series['id'],
                 name = school_series['name'],
                 league = school_series['league'],
                 division = school_series['division'],
                 state = school_series['state'],
-                roster_url = roster_url,
+                roster_url = school_series['roster_url'],
                 # stats_url = school_series['stats_url'],
                 corrections = corrections
             )
         except Exception as e:
             cbn_utils.log(f'{school_series["roster_url"]} - {str(e)}')
-            continue # Skip iteration
+
+    # Write sheet changes in bulk, then mark those schools done in the journal
+    flush_every, checked_roster_urls = int(cbn_utils.setting('FLUSH_EVERY', 25)), list()
+    def flush():
+        players_sheet.flush()
+        schools_sheet.flush()
+        for checked_roster_url in checked_roster_urls:
+            journal.complete(checked_roster_url)
+        checked_roster_urls.clear()
+
+    # Iterate schools' roster pages, fetching several at once
+    fetched_schools = cbn_utils.concurrent_map(fetch_school, [school_series for _, school_series in schools_to_check])
+    for (i, school_series), school in zip(schools_to_check, fetched_schools):
+        if school == None: continue # Skip iteration
+        school_last_roster_check, roster_url = school_series['last_roster_check'], school_series['roster_url']
 
         # Fetch players from school's roster page
         players = school.players()
@@ -212,9 +234,7 @@ def players():
             school_last_roster_check = today_str
 
             # Get existing values
-            players_df = google_sheets.df(players_worksheet)
-            existing_school_canadians_df: pd.DataFrame = players_df[players_df['school_roster_url'] == school_series['roster_url']].copy()
-            existing_school_canadians_df['row'] = existing_school_canadians_df.index.to_series() + 2
+            existing_school_canadians_df = players_sheet.rows(roster_url)
             existing_school_canadians_df['positions'] = existing_school_canadians_df['positions'].str.upper() # INF is converted to inf
 
             # Re-use existing_players_df to update new_players_df with manually updated info...
@@ -238,47 +258,63 @@ def players():
             rows_to_add_df = compare_df[compare_df['source'] == 'right_only'][cols]
             rows_to_add_df['added'] = today_str
             rows_to_add_df['last_confirmed_on_roster'] = today_str
-            if len(rows_to_add_df.index):
-                cbn_utils.pause(players_worksheet.append_rows(rows_to_add_df.values.tolist()))
+            players_sheet.append(rows_to_add_df.values.tolist())
             confirmed_rows_indices = compare_df[compare_df['source'] == 'both']['row'].to_list()
             for confirmed_row_index in confirmed_rows_indices:
-                cbn_utils.pause(players_worksheet.update(f'J{int(confirmed_row_index)}', today_str))
+                players_sheet.update(int(confirmed_row_index), 'last_confirmed_on_roster', [today_str])
 
         # Update Schools sheet row
-        cbn_utils.pause(schools_worksheet.update(f'I{i + 2}:L{i + 2}', [[school_last_roster_check, len(players), len(canadians), school.roster_page.result()]]))
+        schools_sheet.update(i + 2, 'last_roster_check', [school_last_roster_check, len(players), len(canadians), school.roster_page.result()])
+        checked_roster_urls.append(roster_url)
+        if len(checked_roster_urls) >= flush_every:
+            flush()
+    flush()
 
     google_sheets.set_sheet_header(players_worksheet, sort_by = ['school_roster_url', 'last_name', 'first_name'])
+    normalize.log_cache_info()
 
 def email_additions(to: str):
     # Email results to self
-    schools_worksheet = google_sheets.hub_spreadsheet.worksheet('Schools')
-    schools_df = google_sheets.df(schools_worksheet)
+    player_cols = ['school_roster_url', 'last_name', 'first_name', 'positions', 'year', 'city', 'province', 'added']
+    frames = google_sheets.hub_store.read({
+        'Schools': ['roster_url', 'name', 'league', 'division', 'state'],
+        'Players (Manual)': player_cols,
+        'Players': player_cols
+    }, typed = True)
+    schools_df = frames['Schools']
     schools_df.rename({'name': 'school'}, axis = 1, inplace = True)
 
     added_players_df = pd.DataFrame()
     for sheet_name in ['Players (Manual)', 'Players']:
-        players_worksheet = google_sheets.hub_spreadsheet.worksheet(sheet_name)
-        players_df = google_sheets.df(players_worksheet)
-        players_df = players_df[players_df['added'].apply(lambda x: (datetime.today() - datetime.strptime(x, "%Y-%m-%d")).days) < 4] # Players added this week
+        players_df = frames[sheet_name]
+        players_df = players_df[(datetime.today() - players_df['added']).dt.days < 4] # Players added this week
         added_players_df = pd.concat([added_players_df, players_df], ignore_index = True)
     added_players_df = added_players_df.rename({'school_roster_url': 'roster_url'}, axis = 1).merge(schools_df, how = 'left', on = 'roster_url').sort_values(by = ['last_name', 'first_name', 'roster_url'])
     added_players_df.drop_duplicates(subset = ['roster_url', 'last_name', 'first_name'], inplace = True) # keep first (highest league for a school)
     email_html = cbn_utils.player_scrape_results_email_html(added_players_df)
-    cbn_utils.send_email(to, f'New Players (Week of {datetime.now().strftime("%B %d, %Y")})', email_html, google_sheets.config)
+    cbn_utils.send_email(to, f'New Players (Week of {datetime.now().strftime("%B %d, %Y")})', email_html, google_sheets.config())
 
 def find_player_stat_ids():
+    player_cols = ['school_roster_url', 'last_name', 'first_name', 'stats_url']
+    frames = google_sheets.hub_store.read({
+        'Corrections': ['From', 'To'],
+        'Schools': ['roster_url', 'stats_url'],
+        'Players (Manual)': player_cols,
+        'Players': player_cols
+    })
+
     # Manual corrections
-    corrections_df = google_sheets.df(google_sheets.hub_spreadsheet.worksheet('Corrections'))
-    corrections = dict(zip(corrections_df['From'], corrections_df['To']))
+    corrections_df = frames['Corrections']
+    corrections = cbn_utils.Corrections(dict(zip(corrections_df['From'], corrections_df['To']))) # compiled once per run
 
-    schools_worksheet = google_sheets.hub_spreadsheet.worksheet('Schools')
-    schools_df = google_sheets.df(schools_worksheet)
+    schools_df = frames['Schools']
 
     for sheet_name in ['Players (Manual)', 'Players']:
-        players_worksheet = google_sheets.hub_spreadsheet.worksheet(sheet_name)
-        players_df = google_sheets.df(players_worksheet)
+        players_worksheet = google_sheets.hub_spreadsheet().worksheet(sheet_name)
+        players_df = frames[sheet_name]
         players_df = players_df[players_df['stats_url'] == '']
         players_df['row'] = players_df.index.to_series() + 2
+        players_writer = google_sheets.BatchWriter(players_worksheet)
 
         players_df = pd.merge(
             players_df,
@@ -301,18 +337,21 @@ def find_player_stat_ids():
             print()
             stats_urls_to_add = pd.merge(search_players_df, stats_page.to_df(), how = 'inner', on = ['last_name', 'first_name'])
             for _, player_row in stats_urls_to_add.iterrows():
-                cbn_utils.pause(players_worksheet.update(f'L{int(player_row["row"])}', player_row['stats_url']))
+                players_writer.update(f'L{int(player_row["row"])}', player_row['stats_url'])
 
+        players_writer.flush() # before sorting changes the row numbers
         google_sheets.set_sheet_header(players_worksheet, sort_by = ['school_roster_url', 'last_name', 'first_name'])
+    normalize.log_cache_info()
 
 def stats():
+    journal = cbn_utils.run_journal('stats', run_id)
     for sheet_name in ['Players (Manual)', 'Players']:
-        players_worksheet = google_sheets.hub_spreadsheet.worksheet(sheet_name)
-        players_df = google_sheets.df(players_worksheet)
-
-        # need to track how often we hit this site so we don't get blocked
-        ncaa_count = 0
+        players_worksheet = google_sheets.hub_spreadsheet().worksheet(sheet_name)
+        players_df = google_sheets.hub_store.df(sheet_name)
+        players_writer = google_sheets.BatchWriter(players_worksheet, journal = journal)
 
+        # Players to update
+        players_to_update = list()
         for i, player_row in players_df.iterrows():
             player = Player(
                 last_name = player_row['last_name'],
@@ -328,40 +367,49 @@ def stats():
             if player.stats_url == '':
                 cbn_utils.log(f'{player} does not have a `stats_url`... skipping')
                 continue
-            if cbn_utils.NCAA_DOMAIN in player.stats_url:
-                ncaa_count += 1
-                if ncaa_count == 20:
-                    for _ in range(180):
-                        cbn_utils.pause(None)
-                    ncaa_count = 0
+            if journal.done(f'{sheet_name}:{player.stats_url}'):
+                continue # Already checked earlier in this run
+            players_to_update.append((i, player_row, player))
+
+        def fetch_stats(player: Player) -> bool:
+            # Requests are spaced out by cbn_utils.rate_limiter so we don't get blocked
             for _ in range(1, 3): # try again if failed first try
-                if player.add_stats(google_sheets.config['YEAR_SHORT']):
-                    stat_values = list(player.to_dict().values())[13:]
-                    player_last_stats_update = ''
-                    if (player.G > 0) | (player_row['G'] in ['', 0, '0']) | (player.APP > 0) | (player_row['APP'] in ['', 0, '0']):
-                        player_last_stats_update = today_str
-                    cbn_utils.pause(players_worksheet.update(f'K{i + 2}:AJ{i + 2}', [[player_last_stats_update, player_row['stats_url']] + stat_values]))
-                    break
+                if player.add_stats(google_sheets.config()['YEAR_SHORT']):
+                    return True
                 elif player.stats_page.status_code() == 429:
-                    cbn_utils.log('Need to get access back... pausing a minute')
-                    for _ in range(60):
-                        cbn_utils.pause(None)
-                else:
-                    cbn_utils.pause(None)
+                    cbn_utils.log(f'Need to get access back to {cbn_utils.domain(player.stats_url)}... pausing it for a minute')
+                    cbn_utils.rate_limiter.hold(cbn_utils.domain(player.stats_url), 60)
+            return False
+
+        # Fetch several players' stats at once
+        fetched = cbn_utils.concurrent_map(fetch_stats, [player for _, _, player in players_to_update])
+        for (i, player_row, player), found in zip(players_to_update, fetched):
+            if found:
+                stat_values = list(player.to_dict().values())[13:]
+                player_last_stats_update = ''
+                if (player.G > 0) | (player_row['G'] in ['', 0, '0']) | (player.APP > 0) | (player_row['APP'] in ['', 0, '0']):
+                    player_last_stats_update = today_str
+                players_writer.update(f'K{i + 2}:AJ{i + 2}', [[player_last_stats_update, player_row['stats_url']] + stat_values])
+            players_writer.complete(f'{sheet_name}:{player.stats_url}')
+        players_writer.flush()
 
 def positions():
     # Manual corrections
-    corrections_df = google_sheets.df(google_sheets.hub_spreadsheet.worksheet('Corrections'))
-    corrections = dict(zip(corrections_df['From'], corrections_df['To']))
+    corrections_df = google_sheets.hub_store.df('Corrections')
+    corrections = cbn_utils.Corrections(dict(zip(corrections_df['From'], corrections_df['To']))) # compiled once per run
 
+    journal = cbn_utils.run_journal('positions', run_id)
     positions_df = pd.DataFrame(columns = ['url', 'player', 'positions'])
     for sheet_name in ['Players (Manual)', 'Players']:
-        players_worksheet = google_sheets.hub_spreadsheet.worksheet(sheet_name)
-        players_df = google_sheets.df(players_worksheet)
+        players_worksheet = google_sheets.hub_spreadsheet().worksheet(sheet_name)
+        players_df = google_sheets.hub_store.df(sheet_name, typed = True)
         # Don't search for positions if not going to be on ballot anyway or if already fetched their positions count
-        players_df = players_df[(players_df['G.C'] == '') & (players_df['AB'].replace('', 0).astype(int) > 0)]
+        players_df = players_df[players_df['G.C'].isna() & (players_df['AB'].fillna(0) > 0)]
+        players_writer = google_sheets.BatchWriter(players_worksheet, journal = journal)
 
         for stats_url in players_df['school'].unique():
+            if journal.done(f'{sheet_name}:{stats_url}'):
+                continue # Already counted earlier in this run
             schedule_url = re.sub(
                 r'^(.*)/team/(.*)/stats/(.*)$',
                 r'\1/player/game_by_game?game_sport_year_ctl_id=\3&org_id=\2&stats_player_seq=-100',
@@ -374,22 +422,21 @@ def positions():
                     box_score_page.positions_df['positions'].replace({'LF': 'OF', 'CF': 'OF', 'RF': 'OF'}, inplace = True)
                     positions_df = pd.concat([positions_df, box_score_page.positions_df]) \
                         .drop_duplicates(subset = ['player', 'url', 'positions'], ignore_index = True)
-                    time.sleep(1)
 
             positions_df2 = positions_df[positions_df['url'].isin(schedule_page.box_score_links)].groupby(['player', 'positions']).count().reset_index()
             player_games_by_position_df = positions_df2.pivot(index = 'player', columns = 'positions', values = 'url').fillna(0).astype(int)
             for i, player_row in players_df[players_df['school'] == stats_url].iterrows():
                 if f'{player_row["first_name"]} {player_row["last_name"]}' in player_games_by_position_df.index:
-                    cbn_utils.pause(
-                        players_worksheet.update(
-                            f'AI{i + 2}:AO{i + 2}',
-                            [player_games_by_position_df.loc[f'{player_row["first_name"]} {player_row["last_name"]}', ['C', '1B', '2B', '3B', 'SS', 'OF', 'DH']].values.tolist()]
-                        )
+                    players_writer.update(
+                        f'AI{i + 2}:AO{i + 2}',
+                        [player_games_by_position_df.loc[f'{player_row["first_name"]} {player_row["last_name"]}', ['C', '1B', '2B', '3B', 'SS', 'OF', 'DH']].values.tolist()]
                     )
+            players_writer.complete(f'{sheet_name}:{stats_url}')
+        players_writer.flush()
+    normalize.log_cache_info()
 
 def minors():
-    players_worksheet = google_sheets.hub_spreadsheet.worksheet('Players (Minors)')
-    players_df = google_sheets.df(players_worksheet)
+    players_df = google_sheets.hub_store.df('Players (Minors)')
 
     def province(abbreviation):
         return {
@@ -403,179 +450,220 @@ def minors():
             'SK': 'Saskatchewan'
         }[abbreviation]
 
-    teams_req = cbn_utils.get('https://statsapi.mlb.com/api/v1/teams', debug = True)
-    teams_json = json.loads(teams_req.text)
-    teams_df = pd.DataFrame(teams_json['teams'])[['id', 'name', 'parentOrgName']]
-    teams_df['parentOrgName'].replace('Office of the Commissioner', pd.NA, inplace = True)
-    teams_df['org'] = teams_df['parentOrgName'].combine_first(teams_df['name'])
-    teams_dict = dict(zip(teams_df['id'], teams_df['org']))
-
-    scraped_players_df = pd.DataFrame()
-    levels_req = cbn_utils.get('https://statsapi.mlb.com/api/v1/sports', debug = True)
-    levels_json = json.loads(levels_req.text)
-    for level in levels_json['sports']:
-        if level['code'] in ['win', 'nlb', 'int', 'nae', 'nas', 'ame', 'bbc', 'hsb']:
-            continue
-        players_req = cbn_utils.get(f'https://statsapi.mlb.com/api/v1/sports/{level["id"]}/players', debug = True)
-        players_json = json.loads(players_req.text)
-        for player in players_json['people']:
-            if 'birthCountry' not in player.keys():
-                continue
-            if player['birthCountry'] != 'Canada':
+    def mlb_stats_api(url: str) -> dict:
+        response = cbn_utils.http_get(url)
+        if (response == None) or (response.status_code != 200):
+            raise RuntimeError(f'{url} - {"no response" if response == None else response.status_code}') # rerun to resume from the journal
+        return json.loads(response.text)
+
+    journal = cbn_utils.run_journal('minors', run_id)
+
+    # Current Canadians in affiliated baseball
+    if not journal.done('players'):
+        teams_json = mlb_stats_api('https://statsapi.mlb.com/api/v1/teams')
+        teams_df = pd.DataFrame(teams_json['teams'])[['id', 'name', 'parentOrgName']]
+        teams_df['parentOrgName'].replace('Office of the Commissioner', pd.NA, inplace = True)
+        teams_df['org'] = teams_df['parentOrgName'].combine_first(teams_df['name'])
+        teams_dict = dict(zip(teams_df['id'], teams_df['org']))
+
+        scraped_players_df = pd.DataFrame()
+        levels_json = mlb_stats_api('https://statsapi.mlb.com/api/v1/sports')
+        for level in levels_json['sports']:
+            if level['code'] in ['win', 'nlb', 'int', 'nae', 'nas', 'ame', 'bbc', 'hsb']:
                 continue
-            scraped_player = pd.DataFrame([
-                {
-                    'mlbam_id': player['id'],
-                    'last_name': player['lastName'],
-                    'first_name': player['useName'],
-                    'position': player['primaryPosition']['abbreviation'],
-                    'city': player['birthCity'],
-                    'province': province(player['birthStateProvince']),
-                    'level': level['abbreviation'],
-                    'org': teams_dict[player['currentTeam']['id']],
-
-                }
-            ])
-            scraped_players_df = pd.concat([scraped_players_df, scraped_player], ignore_index = True).drop_duplicates(subset = 'mlbam_id', ignore_index = True)
-        time.sleep(1)
-
-    updated_players_df = pd.concat([players_df, scraped_players_df], ignore_index = True)
-    updated_players_df['mlbam_id'] = updated_players_df['mlbam_id'].astype('int')
-    updated_players_df = updated_players_df.groupby('mlbam_id').agg({
-        'last_name': 'last',
-        'first_name': 'last',
-        'position': 'last',
-        'city': 'last',
-        'province': 'last',
-        'added': 'first',
-        'last_confirmed': 'last',
-        'last_stats_update': 'first',
-        'bbref': 'first',
-        'org': 'last'
-    }).reset_index()
-    updated_players_df['added'] = updated_players_df['added'].fillna(today_str)
-    updated_players_df['last_confirmed'] = today_str
-    updated_players_df.sort_values(['last_name', 'first_name'], ascending = [True, True], ignore_index = True, inplace = True)
-    updated_players_df.fillna('', inplace = True)
-    if len(players_df.index) > 0:
-        cbn_utils.pause(players_worksheet.delete_rows(2, len(players_df.index) + 1))
-    cbn_utils.pause(players_worksheet.append_rows(updated_players_df.values.tolist()))
-
-    # Season Stats
-    pages_to_look_up = len(updated_players_df[(updated_players_df['bbref'] == '') | (updated_players_df['bbref'] == None)].index)
-    cbn_utils.log(f'Take {pages_to_look_up / 2} minutes to look up any missing baseball reference links')
-    time.sleep(30 * pages_to_look_up)
-    updated_players_df = google_sheets.df(players_worksheet).iloc[:, :11]
+            players_json = mlb_stats_api(f'https://statsapi.mlb.com/api/v1/sports/{level["id"]}/players')
+            for player in players_json['people']:
+                if 'birthCountry' not in player.keys():
+                    continue
+                if player['birthCountry'] != 'Canada':
+                    continue
+                scraped_player = pd.DataFrame([
+                    {
+                        'mlbam_id': player['id'],
+                        'last_name': player['lastName'],
+                        'first_name': player['useName'],
+                        'position': player['primaryPosition']['abbreviation'],
+                        'city': player['birthCity'],
+                        'province': province(player['birthStateProvince']),
+                        'level': level['abbreviation'],
+                        'org': teams_dict[player['currentTeam']['id']],
+
+                    }
+                ])
+                scraped_players_df = pd.concat([scraped_players_df, scraped_player], ignore_index = True).drop_duplicates(subset = 'mlbam_id', ignore_index = True)
+
+        updated_players_df = pd.concat([players_df, scraped_players_df], ignore_index = True)
+        updated_players_df['mlbam_id'] = updated_players_df['mlbam_id'].astype('int')
+        updated_players_df = updated_players_df.groupby('mlbam_id').agg({
+            'last_name': 'last',
+            'first_name': 'last',
+            'position': 'last',
+            'city': 'last',
+            'province': 'last',
+            'added': 'first',
+            'last_confirmed': 'last',
+            'last_stats_update': 'first',
+            'bbref': 'first',
+            'org': 'last'
+        }).reset_index()
+        updated_players_df['added'] = updated_players_df['added'].fillna(today_str)
+        updated_players_df['last_confirmed'] = today_str
+        updated_players_df.sort_values(['last_name', 'first_name'], ascending = [True, True], ignore_index = True, inplace = True)
+        updated_players_df.fillna('', inplace = True)
+        columns = google_sheets.hub_store.columns('Players (Minors)') # stat columns stay in the header, blank until minor_league_stats fills them
+        updated_players_df = updated_players_df.reindex(columns = list(updated_players_df.columns) + [column for column in columns if column not in updated_players_df.columns], fill_value = '')
+        google_sheets.hub_store.replace('Players (Minors)', updated_players_df)
+        google_sheets.hub_store.push()
+
+        # Season Stats
+        pages_to_look_up = len(updated_players_df[(updated_players_df['bbref'] == '') | (updated_players_df['bbref'] == None)].index)
+        cbn_utils.log(f'Take {pages_to_look_up / 2} minutes to look up any missing baseball reference links')
+        time.sleep(30 * pages_to_look_up)
+        google_sheets.hub_store.invalidate('Players (Minors)') # read back the links added by hand while we waited
+        journal.complete('players')
+    if not journal.done('stats'):
+        minor_league_stats(journal)
+        journal.complete('stats')
+
+    # Last week stats
+    if not journal.done('week'):
+        minor_league_week(journal)
+        journal.complete('week')
+
+def bbref_season_stats(player_series: pd.Series) -> pd.DataFrame:
+    # This season's minor league stats, one row per team and level
+    stats_df = pd.DataFrame()
+    bbref_player_page = WebPage(player_series['bbref'])
+    if '<table' not in bbref_player_page.html(): return stats_df
+    dfs = pd.read_html(bbref_player_page.html())
+    for df in dfs:
+        if 'Year' not in df.columns: continue
+        year_df = df[(df['Year'].str.contains(str(google_sheets.config()['YEAR'])) == True) & (df['Lev'].isin(['Maj', 'NCAA', 'NAIA', 'Smr']) == False)]
+        if len(year_df.index) == 0: continue
+        year_batting_df = pd.DataFrame(columns = ['Tm', 'Lev', 'G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'AVG', 'OBP', 'SLG', 'OPS'])
+        year_pitching_df = pd.DataFrame(columns = ['Tm', 'Lev', 'APP', 'GS', 'IP', 'W', 'L', 'ER', 'HA', 'BB', 'ERA', 'SV', 'K'])
+        if 'OPS' in year_df.columns:
+            year_batting_df = pd.concat([year_batting_df, year_df.rename({'BA': 'AVG'}, axis = 1)], ignore_index = True)[year_batting_df.columns]
+        elif 'SV' in year_df.columns:
+            year_pitching_df = pd.concat([year_pitching_df, year_df.rename({'G': 'APP', 'H': 'HA', 'SO': 'K'}, axis = 1)], ignore_index = True)[year_pitching_df.columns]
+        year_combined_df = pd.merge(year_batting_df, year_pitching_df, 'outer', on = ['Tm', 'Lev'])
+        year_combined_df = year_combined_df[year_batting_df.columns.tolist() + [col for col in year_pitching_df.columns if col not in ['Tm', 'Lev']]]
+        year_combined_df.fillna(0, inplace = True)
+        for col in ['G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'APP', 'GS', 'W', 'L', 'ER', 'HA', 'BB', 'SV', 'K']:
+            year_combined_df[col] = year_combined_df[col].astype('int')
+        for col in ['AVG', 'OBP', 'SLG', 'OPS']:
+            year_combined_df[col] = year_combined_df[col].astype('float').round(3)
+        year_combined_df['ERA'] = year_combined_df['ERA'].astype('float').round(2)
+        year_combined_df['IP'] = year_combined_df['IP'].astype('float').round(1)
+        year_combined_df['mlbam_id'] = player_series['mlbam_id']
+        stats_df = pd.concat([stats_df, year_combined_df], ignore_index = True)
+    return stats_df
+
+def minor_league_stats(journal: cbn_utils.RunJournal):
+    updated_players_df = google_sheets.hub_store.df('Players (Minors)').iloc[:, :11]
     stats_df = pd.DataFrame()
     for i, player_series in updated_players_df.iterrows():
-        time.sleep(4)
         if (player_series['bbref'] == '') | (player_series['bbref'] == None): continue
-        bbref_player_page = WebPage(player_series['bbref'])
-        if '<table' not in bbref_player_page.html(): continue
-        dfs = pd.read_html(bbref_player_page.html())
-        for df in dfs:
-            if 'Year' not in df.columns: continue
-            year_df = df[(df['Year'].str.contains(str(google_sheets.config['YEAR'])) == True) & (df['Lev'].isin(['Maj', 'NCAA', 'NAIA', 'Smr']) == False)]
-            if len(year_df.index) == 0: continue
-            year_batting_df = pd.DataFrame(columns = ['Tm', 'Lev', 'G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'AVG', 'OBP', 'SLG', 'OPS'])
-            year_pitching_df = pd.DataFrame(columns = ['Tm', 'Lev', 'APP', 'GS', 'IP', 'W', 'L', 'ER', 'HA', 'BB', 'ERA', 'SV', 'K'])
-            if 'OPS' in year_df.columns:
-                year_batting_df = pd.concat([year_batting_df, year_df.rename({'BA': 'AVG'}, axis = 1)], ignore_index = True)[year_batting_df.columns]
-            elif 'SV' in year_df.columns:
-                year_pitching_df = pd.concat([year_pitching_df, year_df.rename({'G': 'APP', 'H': 'HA', 'SO': 'K'}, axis = 1)], ignore_index = True)[year_pitching_df.columns]
-            year_combined_df = pd.merge(year_batting_df, year_pitching_df, 'outer', on = ['Tm', 'Lev'])
-            year_combined_df = year_combined_df[year_batting_df.columns.tolist() + [col for col in year_pitching_df.columns if col not in ['Tm', 'Lev']]]
-            year_combined_df.fillna(0, inplace = True)
-            for col in ['G', 'AB', 'R', 'H', '2B', '3B', 'HR', 'RBI', 'SB', 'APP', 'GS', 'W', 'L', 'ER', 'HA', 'BB', 'SV', 'K']:
-                year_combined_df[col] = year_combined_df[col].astype('int')
-            for col in ['AVG', 'OBP', 'SLG', 'OPS']:
-                year_combined_df[col] = year_combined_df[col].astype('float').round(3)
-            year_combined_df['ERA'] = year_combined_df['ERA'].astype('float').round(2)
-            year_combined_df['IP'] = year_combined_df['IP'].astype('float').round(1)
-            year_combined_df['mlbam_id'] = player_series['mlbam_id']
-            stats_df = pd.concat([stats_df, year_combined_df], ignore_index = True)
-            updated_players_df.loc[i, 'last_stats_update'] = today_str
+        unit = f'stats:{player_series["mlbam_id"]}'
+        if journal.done(unit):
+            player_stats_df = pd.DataFrame(journal.result(unit)) # fetched before the run was interrupted
+        else:
+            player_stats_df = bbref_season_stats(player_series)
+            journal.complete(unit, json.loads(player_stats_df.to_json(orient = 'records')))
+        if len(player_stats_df.index) == 0: continue
+        stats_df = pd.concat([stats_df, player_stats_df], ignore_index = True)
+        updated_players_df.loc[i, 'last_stats_update'] = today_str
 
     updated_players_df = pd.merge(updated_players_df, stats_df, 'left', on = 'mlbam_id')
     updated_players_df.rename({'Tm': 'team', 'Lev': 'level'}, axis = 1, inplace = True)
     updated_players_df.sort_values(['last_name', 'first_name', 'level', 'G', 'APP'], ascending = [True, True, False, False, False], ignore_index = True, inplace = True)
     updated_players_df.fillna('', inplace = True)
-    if len(players_df.index) > 0:
-        cbn_utils.pause(players_worksheet.delete_rows(2, len(players_df.index) + 1))
-    cbn_utils.pause(players_worksheet.append_rows(updated_players_df.values.tolist()))
+    google_sheets.hub_store.replace('Players (Minors)', updated_players_df)
+    google_sheets.hub_store.push()
 
     google_sheets.update_minors_sheet()
 
-    # Last week stats
+def bbref_week_stats(player_series: pd.Series, splits_page: str, week_dates: list[str]) -> pd.DataFrame:
+    # Totals over the last week's games from a game log (bgl: batting, pgl: pitching)
+    week_stats_df = pd.DataFrame()
+    bbref_player_page = WebPage(f'{player_series["bbref"]}&type={splits_page}&year={google_sheets.config()["YEAR"]}')
+    if bbref_player_page == None: return week_stats_df
+    soup = cbn_utils.soup(bbref_player_page.html())
+    if soup.find('table') == None: return week_stats_df
+    dfs = pd.read_html(bbref_player_page.html())
+    for df in dfs:
+        if 'Tm' not in df.columns: continue
+        games_df = df[df['Date'].str.contains('|'.join(week_dates), na = False) & (df['Lev'].isin(['Maj', 'NCAA', 'NAIA', 'Smr']) == False)].copy()
+        if len(games_df.index) == 0: continue
+        if splits_page == 'bgl':
+            week_df = pd.DataFrame([{
+                'Player': f'{player_series["first_name"]} {player_series["last_name"]}',
+                'Position': player_series['position'],
+                'Current Organization': player_series['org'],
+                'Team(s)': '\n'.join(set(games_df.apply(lambda row: f'{row["Tm"]} ({row["Lev"].split("-")[0]})', axis = 1).tolist())),
+                'PA': sum(games_df['PA'].astype('int')),
+                'R': sum(games_df['R'].astype('int')),
+                'H': sum(games_df['H'].astype('int')),
+                '2B': sum(games_df['2B'].astype('int')),
+                '3B': sum(games_df['3B'].astype('int')),
+                'HR': sum(games_df['HR'].astype('int')),
+                'RBI': sum(games_df['RBI'].astype('int')),
+                'SB': sum(games_df['SB'].astype('int')),
+                'AVG': (sum(games_df['H'].astype('int')) / sum(games_df['AB'].astype('int'))) if sum(games_df['AB'].astype('int')) > 0 else 0,
+                'OBP': ((sum(games_df['H'].astype('int')) + sum(games_df['BB'].astype('int'))) / sum(games_df['PA'].astype('int'))) if sum(games_df['PA'].astype('int')) > 0 else 0,
+                'SLG': (sum(games_df['H'].astype('int') + games_df['2B'].astype('int') + 2 * games_df['3B'].astype('int') + 3 * games_df['HR'].astype('int')) / sum(games_df['AB'].astype('int'))) if sum(games_df['AB'].astype('int')) > 0 else 0
+            }])
+            week_df['OPS'] = (week_df['OBP'] + week_df['SLG']).round(3)
+            week_df['OBP'] = week_df['OBP'].round(3)
+            week_df['SLG'] = week_df['SLG'].round(3)
+            week_stats_df = pd.concat([week_stats_df, week_df], ignore_index = True)
+        else:
+            games_df['IP'] = games_df['IP'].astype('float').apply(lambda x: x if x == round(x) else round(x) + 1/3 if (x - 0.1) == round(x) else round(x) + 2/3)
+            week_df = pd.DataFrame([{
+                'Player': f'{player_series["first_name"]} {player_series["last_name"]}',
+                'Position': player_series['position'],
+                'Current Organization': player_series['org'],
+                'Team(s)': '\n'.join(set(games_df.apply(lambda row: f'{row["Tm"]} ({row["Lev"].split("-")[0]})', axis = 1).tolist())),
+                'APP': len(games_df.index),
+                'IP': sum(games_df['IP']),
+                'W': sum(games_df['Dec'].astype('str').str.contains('W')),
+                'L': sum(games_df['Dec'].astype('str').str.contains('L')),
+                'ER': sum(games_df['ER'].astype('int')),
+                'HA': sum(games_df['H'].astype('int')),
+                'BB': sum(games_df['BB'].astype('int')),
+                'ERA': (round(9 * sum(games_df['ER'].astype('int')) / sum(games_df['IP']), 2)) if sum(games_df['IP']) > 0 else 99,
+                'WHIP': (round((sum(games_df['H'].astype('int')) + sum(games_df['BB'].astype('int'))) / sum(games_df['IP']), 2)) if sum(games_df['IP']) > 0 else 99,
+                'SV': sum(games_df['Dec'].astype('str').str.contains('S')),
+                'K': sum(games_df['SO'].astype('int'))
+            }])
+            week_df['IP'] = week_df['IP'].round(1).apply(lambda x: int(x) if x == round(x) else round(x) + 0.1 if '.3' in str(x) else x - 0.5)
+            week_stats_df = pd.concat([week_stats_df, week_df], ignore_index = True)
+    return week_stats_df
+
+def minor_league_week(journal: cbn_utils.RunJournal):
     week_dates = ([(datetime.now() - timedelta(days = days_back)).strftime("%Y-%m-%d") for days_back in range(1, 7)])[::-1]
     week_hitting_df = pd.DataFrame()
     week_pitching_df = pd.DataFrame()
-    players_df = google_sheets.df(players_worksheet).iloc[:, :11].drop_duplicates(ignore_index = True)
+    players_df = google_sheets.hub_store.df('Players (Minors)').iloc[:, :11].drop_duplicates(ignore_index = True)
     for i, player_series in players_df.iterrows():
         if (player_series['bbref'] == '') | (player_series['bbref'] == None): continue
         for splits_page in ['bgl', 'pgl']:
             if (player_series['position'] == 'P') & (splits_page == 'bgl'): continue
             if (player_series['position'] != 'P') & (splits_page == 'pgl'): continue
-            bbref_player_page = WebPage(f'{player_series["bbref"]}&type={splits_page}&year={google_sheets.config["YEAR"]}')
-            time.sleep(4)
-            if bbref_player_page == None: continue
-            soup = BeautifulSoup(bbref_player_page.html(), 'html.parser')
-            if soup.find('table') == None: continue
-            dfs = pd.read_html(bbref_player_page.html())
-            for df in dfs:
-                if 'Tm' not in df.columns: continue
-                games_df = df[df['Date'].str.contains('|'.join(week_dates), na = False) & (df['Lev'].isin(['Maj', 'NCAA', 'NAIA', 'Smr']) == False)].copy()
-                if len(games_df.index) == 0: continue
-                if splits_page == 'bgl':
-                    week_df = pd.DataFrame([{
-                        'Player': f'{player_series["first_name"]} {player_series["last_name"]}',
-                        'Position': player_series['position'],
-                        'Current Organization': player_series['org'],
-                        'Team(s)': '\n'.join(set(games_df.apply(lambda row: f'{row["Tm"]} ({row["Lev"].split("-")[0]})', axis = 1).tolist())),
-                        'PA': sum(games_df['PA'].astype('int')),
-                        'R': sum(games_df['R'].astype('int')),
-                        'H': sum(games_df['H'].astype('int')),
-                        '2B': sum(games_df['2B'].astype('int')),
-                        '3B': sum(games_df['3B'].astype('int')),
-                        'HR': sum(games_df['HR'].astype('int')),
-                        'RBI': sum(games_df['RBI'].astype('int')),
-                        'SB': sum(games_df['SB'].astype('int')),
-                        'AVG': (sum(games_df['H'].astype('int')) / sum(games_df['AB'].astype('int'))) if sum(games_df['AB'].astype('int')) > 0 else 0,
-                        'OBP': ((sum(games_df['H'].astype('int')) + sum(games_df['BB'].astype('int'))) / sum(games_df['PA'].astype('int'))) if sum(games_df['PA'].astype('int')) > 0 else 0,
-                        'SLG': (sum(games_df['H'].astype('int') + games_df['2B'].astype('int') + 2 * games_df['3B'].astype('int') + 3 * games_df['HR'].astype('int')) / sum(games_df['AB'].astype('int'))) if sum(games_df['AB'].astype('int')) > 0 else 0
-                    }])
-                    week_df['OPS'] = (week_df['OBP'] + week_df['SLG']).round(3)
-                    week_df['OBP'] = week_df['OBP'].round(3)
-                    week_df['SLG'] = week_df['SLG'].round(3)
-                    week_hitting_df = pd.concat([week_hitting_df, week_df], ignore_index = True)
-                else:
-                    games_df['IP'] = games_df['IP'].astype('float').apply(lambda x: x if x == round(x) else round(x) + 1/3 if (x - 0.1) == round(x) else round(x) + 2/3)
-                    week_df = pd.DataFrame([{
-                        'Player': f'{player_series["first_name"]} {player_series["last_name"]}',
-                        'Position': player_series['position'],
-                        'Current Organization': player_series['org'],
-                        'Team(s)': '\n'.join(set(games_df.apply(lambda row: f'{row["Tm"]} ({row["Lev"].split("-")[0]})', axis = 1).tolist())),
-                        'APP': len(games_df.index),
-                        'IP': sum(games_df['IP']),
-                        'W': sum(games_df['Dec'].astype('str').str.contains('W')),
-                        'L': sum(games_df['Dec'].astype('str').str.contains('L')),
-                        'ER': sum(games_df['ER'].astype('int')),
-                        'HA': sum(games_df['H'].astype('int')),
-                        'BB': sum(games_df['BB'].astype('int')),
-                        'ERA': (round(9 * sum(games_df['ER'].astype('int')) / sum(games_df['IP']), 2)) if sum(games_df['IP']) > 0 else 99,
-                        'WHIP': (round((sum(games_df['H'].astype('int')) + sum(games_df['BB'].astype('int'))) / sum(games_df['IP']), 2)) if sum(games_df['IP']) > 0 else 99,
-                        'SV': sum(games_df['Dec'].astype('str').str.contains('S')),
-                        'K': sum(games_df['SO'].astype('int'))
-                    }])
-                    week_df['IP'] = week_df['IP'].round(1).apply(lambda x: int(x) if x == round(x) else round(x) + 0.1 if '.3' in str(x) else x - 0.5)
-                    week_pitching_df = pd.concat([week_pitching_df, week_df], ignore_index = True)
-
-    week_worksheet = google_sheets.hub_spreadsheet.worksheet('Minors Players of the Week')
-    cbn_utils.pause(week_worksheet.delete_rows(2, len(google_sheets.df(week_worksheet).index) + 1))
-    cbn_utils.pause(week_worksheet.append_rows(
+            unit = f'week:{player_series["mlbam_id"]}:{splits_page}'
+            if not journal.done(unit):
+                journal.complete(unit, json.loads(bbref_week_stats(player_series, splits_page, week_dates).to_json(orient = 'records')))
+            if splits_page == 'bgl':
+                week_hitting_df = pd.concat([week_hitting_df, pd.DataFrame(journal.result(unit))], ignore_index = True)
+            else:
+                week_pitching_df = pd.concat([week_pitching_df, pd.DataFrame(journal.result(unit))], ignore_index = True)
+
+    week_worksheet = google_sheets.hub_spreadsheet().worksheet('Minors Players of the Week')
+    week_worksheet.delete_rows(2, len(google_sheets.df(week_worksheet).index) + 1)
+    week_worksheet.append_rows(
         [['Hitting']] + [week_hitting_df.columns.tolist()] + week_hitting_df.values.tolist() + [['']] + \
         [['Pitching']] + [week_pitching_df.columns.tolist()] + week_pitching_df.values.tolist()
-    ))
+    )
 
 
 if __name__ == '__main__':
@@ -591,4 +679,4 @@ if __name__ == '__main__':
 
     # minors()
 
-    cbn_utils.driver.quit()
+    cbn_utils.driver_pool.quit()
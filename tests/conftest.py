@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Tests run offline from the repository root; nothing may touch the real .cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix = 'cbn-tests-')
@@ -0,0 +1,58 @@
+import benchmarks
+import cbn_utils
+import os
+import pytest
+
+# Saved roster, box score and schedule pages, including the sloppy markup athletics sites serve:
+# unclosed tags, stray end tags, unquoted attributes, entities and markup inside scripts and comments
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+URLS = {
+    'roster-s-person-card.html': 'https://example.edu/sports/baseball/roster/s-person-card',
+    'roster-sidearm.html': 'https://example.edu/sports/baseball/roster/sidearm',
+    'roster-table.html': 'https://example.edu/sports/baseball/roster/table',
+    'roster-initial-state.html': 'https://example.edu/sports/baseball/roster/initial-state',
+    'box_score.html': 'https://stats.example.org/contests/1/individual_stats',
+    'schedule.html': 'https://stats.example.org/team/1/schedule'
+}
+
+@pytest.fixture(scope = 'module')
+def pages() -> dict[str, str]:
+    pages = dict()
+    for file_name, url in URLS.items():
+        with open(os.path.join(FIXTURES, file_name)) as f:
+            pages[url] = f.read()
+    return pages
+
+@pytest.fixture(scope = 'module')
+def expected(pages) -> list:
+    return benchmarks.parsed_with('html.parser', pages, benchmarks.season(2026))
+
+def test_fixtures_parse(expected):
+    s_person_cards, sidearm_cards, table, initial_state, box_score, schedule = expected
+    assert s_person_cards[['first_name', 'last_name', 'positions', 'year', 'city', 'province']].values.tolist() == [
+        ['Liam', 'Smith', "{'P'}", 'Sophomore', 'Toronto', 'Ontario'],
+        ['Noah', 'Tremblay', str({'C', '1B'}), 'Junior', 'Saint-Hilaire', 'Quebec'],
+        ['Owen', 'Lee', "{'P'}", 'Freshman', '', ''],
+        ['Ethan', 'Roy', "{'INF'}", 'Senior', 'Surrey', 'British Columbia']
+    ]
+    assert sidearm_cards[['first_name', 'last_name', 'throws', 'city']].values.tolist() == [
+        ['Mason', 'Gagnon', 'R', 'Okotoks'], ['Jacob', 'Martin', 'L', 'Regina'], ['Lucas', 'Wilson', '', ''], ['Logan', 'Brown', '', 'Halifax']
+    ]
+    assert table[["last_name", "province"]].values.tolist()[:3] == [["Smith", "Alberta"], ["Johnson", ""], ["Gagnon", "Quebec"]]
+    assert len(table.index) == 10
+    assert initial_state[['first_name', 'last_name', 'throws', 'city']].values.tolist() == [['Liam', 'Smith', 'R', 'Toronto'], ['Owen', 'ONeil', '', '']]
+    assert box_score[['player', 'positions']].values.tolist() == [['Smith, Liam', 'SS'], ['Smith, Liam', '2B'], ['Tremblay, Noah', 'C'], ['Lee, Owen', 'PH'], ['Lee, Owen', 'DH'], ['Roy, Ethan', 'P'], ['Martin, Jacob', 'RP'], ['Martin, Jacob', '1B']]
+    assert schedule == {
+        'https://stats.example.org/contests/1/box_score',
+        'https://stats.example.org/sports/bsb/2025-26/boxscores/20260215_abcd.xml',
+        'https://stats.example.org/sports/baseball/stats/2026/opponent/boxscore/123',
+        'https://stats.example.org/news/boxscore-recap' # any /boxscore link, as before
+    }
+
+@pytest.mark.parametrize('parser', [parser for parser in cbn_utils.HTML_PARSERS if parser != 'html.parser'])
+def test_parsers_match_html_parser(parser, pages, expected):
+    for url, result, expected_result in zip(pages.keys(), benchmarks.parsed_with(parser, pages, benchmarks.season(2026)), expected):
+        assert benchmarks.same_results([result], [expected_result]), url
+
+def test_default_parser_matches_html_parser(pages, expected):
+    assert benchmarks.same_results(benchmarks.parsed_with(cbn_utils.HTML_PARSER, pages, benchmarks.season(2026)), expected)
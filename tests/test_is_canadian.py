@@ -0,0 +1,29 @@
+import benchmarks
+import cbn_utils
+import pandas as pd
+import pytest
+
+EDGE_CASES = [
+    'Can.', 'can.', 'Toronto, Can.', 'Canx', 'Cantx', 'Vancouver, CAN', 'Scanada', 'Americana', 'Kanada',
+    'B.C.', 'BCX', 'Abbotsford, B.C.', 'A.B.', 'Ontario, Calif.', 'ONTARIO, CALIFORNIA', 'Ontario, California',
+    'West Canada Valley', 'Canada College (Calif.)', 'la canada flintridge', 'Seoul, SK', 'Saskatoon, SK',
+    'Alkmaar, NL', "St. John's, NL", 'New Brunswick, NJ', 'Fredericton, New Brunswick', '(.*)', '[Canada]', 'a|b',
+    '   ', 'Québec', 'Montréal, QC'
+]
+HOMETOWNS = benchmarks.HOMETOWNS + [hometown.upper() for hometown in benchmarks.HOMETOWNS] + EDGE_CASES
+
+@pytest.mark.parametrize('hometown', HOMETOWNS)
+def test_is_canadian_matches_per_list_loop(hometown):
+    assert cbn_utils.is_canadian(hometown) == benchmarks.is_canadian_previous(hometown)
+
+def test_is_canadian_series_matches_per_list_loop():
+    assert cbn_utils.is_canadian_series(pd.Series(HOMETOWNS)).tolist() == [benchmarks.is_canadian_previous(hometown) for hometown in HOMETOWNS]
+
+def test_is_canadian_series_blank_cells():
+    assert cbn_utils.is_canadian_series(pd.Series(['', None, float('nan')], dtype = object)).tolist() == [benchmarks.is_canadian_previous(str(value)) for value in ['', None, float('nan')]]
+
+def test_is_canadian_known_answers():
+    assert cbn_utils.is_canadian('Toronto, Ont.')
+    assert cbn_utils.is_canadian('Surrey, BC / Vauxhall Academy')
+    assert not cbn_utils.is_canadian('Ontario, Calif. / Chaffey HS')
+    assert not cbn_utils.is_canadian('Boston, Mass. / BC High')
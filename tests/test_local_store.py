@@ -0,0 +1,191 @@
+import gspread
+import local_store
+import pandas as pd
+import pytest
+
+class FakeSpreadsheet:
+    # In-memory stand-in for the values_batch_* calls LocalStore makes, trimming trailing blanks the way the API does
+    def __init__(self, tabs: dict[str, list[list]]):
+        self.tabs = {tab: [list(row) for row in rows] for tab, rows in tabs.items()}
+        self.cleared = list()
+        self.calls = 0
+
+    @staticmethod
+    def __split__(range_name: str) -> tuple[str, dict]:
+        tab, _, a1 = range_name.partition('!')
+        return tab.strip("'"), (gspread.utils.a1_range_to_grid_range(a1) if a1 != '' else dict())
+
+    @staticmethod
+    def __trim__(values: list[list]) -> list[list]:
+        values = [list(values_list) for values_list in values]
+        for values_list in values:
+            while (len(values_list) > 0) and (values_list[-1] == ''):
+                values_list.pop()
+        while (len(values) > 0) and (len(values[-1]) == 0):
+            values.pop()
+        return values
+
+    def values_batch_get(self, ranges: list[str], params: dict | None = None) -> dict:
+        self.calls += 1
+        value_ranges = list()
+        for range_name in ranges:
+            tab, grid = self.__split__(range_name)
+            rows = self.tabs[tab][grid.get('startRowIndex', 0):grid.get('endRowIndex')]
+            width = max([len(row) for row in rows] + [0])
+            rows = [(row + [''] * width)[grid.get('startColumnIndex', 0):grid.get('endColumnIndex', width)] for row in rows]
+            if (params or dict()).get('majorDimension') == 'COLUMNS':
+                rows = [list(column) for column in zip(*rows)]
+            value_ranges.append({'range': range_name, 'values': self.__trim__(rows)})
+        return {'valueRanges': value_ranges}
+
+    def values_batch_clear(self, body: dict):
+        for range_name in body['ranges']:
+            self.cleared.append(range_name)
+            tab, grid = self.__split__(range_name)
+            for row in self.tabs[tab][grid.get('startRowIndex', 0):grid.get('endRowIndex')]:
+                for i in range(grid.get('startColumnIndex', 0), min(len(row), grid.get('endColumnIndex', len(row)))):
+                    row[i] = ''
+
+    def values_batch_update(self, body: dict):
+        for update in body['data']:
+            tab, grid = self.__split__(update['range'])
+            rows = self.tabs[tab]
+            for row_offset, values in enumerate(update['values']):
+                row_index = grid.get('startRowIndex', 0) + row_offset
+                while len(rows) <= row_index:
+                    rows.append(list())
+                for col_offset, value in enumerate(values):
+                    col_index = grid.get('startColumnIndex', 0) + col_offset
+                    rows[row_index] += [''] * (col_index + 1 - len(rows[row_index]))
+                    rows[row_index][col_index] = value
+
+def trimmed(df: pd.DataFrame) -> pd.DataFrame:
+    # What read() can see of df: rows after the last non-blank cell don't come back from the API
+    filled = (df != '').any(axis = 1)
+    return df[:filled[filled].index.max() + 1] if filled.any() else df[:0]
+
+def sheet() -> FakeSpreadsheet:
+    return FakeSpreadsheet({
+        'Players': [
+            ['last_name', 'first_name', 'school_roster_url', 'AB'],
+            ['Smith', 'John', 'https://a.edu/roster', '12'],
+            ['Brown', 'Joe', 'https://b.edu/roster'], # trailing blank dropped by the API
+            ['Lee', 'Sam', 'https://missing.edu/roster', '3'],
+            ['White', 'Tom', 'https://a.edu/roster', '7'],
+            ['Green', '', 'https://c.edu/roster']
+        ],
+        'Players (Manual)': [
+            ['school_roster_url', 'last_name', 'notes'],
+            ['https://b.edu/roster', 'Martin', 'added by hand'],
+            ['https://a.edu/roster', 'Roy']
+        ],
+        'Schools': [
+            ['name', 'roster_url', 'league', 'notes'],
+            ['A University', 'https://a.edu/roster', 'NCAA', 'x'],
+            ['B College', 'https://b.edu/roster', 'JUCO'],
+            ['C College', 'https://c.edu/roster', 'NAIA', ''],
+            ['A University (old)', 'https://a.edu/roster', 'NCAA']
+        ]
+    })
+
+@pytest.fixture
+def store(tmp_path):
+    spreadsheet = sheet()
+    store = local_store.LocalStore(str(tmp_path / 'hub.sqlite'), ['Players', 'Players (Manual)', 'Schools'], spreadsheet = lambda: spreadsheet)
+    store.fake = spreadsheet
+    return store
+
+def test_cell():
+    assert [local_store.cell(value) for value in [None, pd.NA, 3.0, 2.5, 7, 'x']] == ['', '', '3', '2.5', '7', 'x']
+
+def test_df_pads_trailing_blanks(store):
+    df = store.df('Players')
+    assert df.columns.tolist() == ['last_name', 'first_name', 'school_roster_url', 'AB']
+    assert df['AB'].tolist() == ['12', '', '3', '7', '']
+    assert store.fake.calls == 1 # every tab in one batchGet
+
+def test_join_matches_pandas_merge(store):
+    left_tabs = ['Players', 'Players (Manual)']
+    expected_df = pd.merge(pd.concat([store.df(tab) for tab in left_tabs], ignore_index = True), store.df('Schools'), left_on = 'school_roster_url', right_on = 'roster_url', suffixes = ('_player', '_school'))
+    joined_df = store.join(left_tabs, 'Schools', 'school_roster_url', 'roster_url', suffixes = ('_player', '_school'))
+    assert joined_df.columns.tolist() == expected_df.columns.tolist()
+    pd.testing.assert_frame_equal(joined_df, expected_df.reset_index(drop = True))
+    assert joined_df['notes_player'].isna().sum() == 6 # Players has no notes column
+    assert joined_df['last_name'].tolist() == ['Smith', 'Smith', 'White', 'White', 'Roy', 'Roy', 'Brown', 'Martin', 'Green'] # grouped by roster_url
+
+def test_join_unknown_key(store):
+    with pytest.raises(KeyError):
+        store.join(['Players'], 'Schools', 'school', 'roster_url')
+
+def test_read_pulled_matches_df(store):
+    store.pull()
+    calls = store.fake.calls
+    frames = store.read({'Players': ['AB', 'last_name'], 'Schools': ['league']})
+    pd.testing.assert_frame_equal(frames['Players'], store.df('Players')[['AB', 'last_name']])
+    pd.testing.assert_frame_equal(frames['Schools'], store.df('Schools')[['league']])
+    assert store.fake.calls == calls
+
+def test_read_unpulled_matches_df(tmp_path):
+    spreadsheet = sheet()
+    path = str(tmp_path / 'hub.sqlite')
+    earlier_store = local_store.LocalStore(path, ['Players', 'Schools'], spreadsheet = lambda: spreadsheet)
+    earlier_store.pull()
+    expected_df = trimmed(earlier_store.df('Players')[['first_name', 'AB']])
+    assert len(expected_df) == 4 # Green has neither
+
+    # A later run reads the saved header and fetches only the two column ranges
+    store = local_store.LocalStore(path, ['Players', 'Schools'], spreadsheet = lambda: spreadsheet)
+    calls = spreadsheet.calls
+    frames = store.read({'Players': ['first_name', 'AB']})
+    pd.testing.assert_frame_equal(frames['Players'], expected_df)
+    assert spreadsheet.calls == calls + 1
+
+def test_read_stale_header(tmp_path):
+    spreadsheet = sheet()
+    path = str(tmp_path / 'hub.sqlite')
+    local_store.LocalStore(path, ['Players'], spreadsheet = lambda: spreadsheet).pull()
+
+    # Columns moved since the header was saved: the header row is fetched again before the columns
+    spreadsheet.tabs['Players'] = [[row[i] if i < len(row) else '' for i in [3, 0, 1, 2]] for row in spreadsheet.tabs['Players']]
+    store = local_store.LocalStore(path, ['Players'], spreadsheet = lambda: spreadsheet)
+    calls = spreadsheet.calls
+    frames = store.read({'Players': ['AB', 'first_name']})
+    assert spreadsheet.calls == calls + 3
+    assert frames['Players']['AB'].tolist() == ['12', '', '3', '7']
+    assert frames['Players']['first_name'].tolist() == ['John', 'Joe', 'Sam', 'Tom']
+    assert store.read({'Players': ['last_name', 'AB']})['Players']['last_name'].tolist() == ['Smith', 'Brown', 'Lee', 'White', 'Green']
+    with pytest.raises(KeyError):
+        store.read({'Players': ['missing']})
+
+def test_apply_and_append(store):
+    store.pull()
+    # Mirror what the scraper writes to the sheet, then check the store against a fresh pull
+    updates = [('Players', 'D3:D3', [['5']]), ('Players', 'B6:C6', [['Ray', 'https://c.edu/new']]), ('Players', 'A1', [['ignored']])]
+    for tab, range_name, values in updates:
+        store.fake.values_batch_update(body = {'data': [{'range': f"'{tab}'!{range_name}", 'values': values}]})
+        store.apply(tab, range_name, values)
+    rows = [['Gauthier', 'Luc', 'https://a.edu/roster', 4]]
+    store.fake.values_batch_update(body = {'data': [{'range': "'Players'!A7", 'values': rows}]})
+    store.append('Players', rows)
+
+    assert store.df('Players')['last_name'].tolist() == ['Smith', 'Brown', 'Lee', 'White', 'Green', 'Gauthier']
+    assert store.df('Players')['AB'].tolist() == ['12', '5', '3', '7', '', '4']
+    store.fake.tabs['Players'][0][0] = 'last_name' # the header is never mirrored
+    expected_df = store.df('Players')
+    store.pull(['Players'])
+    pd.testing.assert_frame_equal(store.df('Players'), expected_df)
+
+def test_apply_before_pull_is_ignored(store):
+    store.apply('Players', 'D3', [['5']])
+    assert store.fake.calls == 0
+
+def test_push(store):
+    store.pull()
+    store.replace('Schools', pd.DataFrame({'roster_url': ['https://a.edu/roster', 'https://d.edu/roster'], 'name': ['A University', 'D College']}))
+    assert store.df('Schools')['name'].tolist() == ['A University', 'D College']
+    store.push()
+    assert store.fake.cleared == ["'Schools'!A2:ZZZ", "'Schools'!C1:ZZZ1"]
+    assert FakeSpreadsheet.__trim__(store.fake.tabs['Schools']) == [['roster_url', 'name'], ['https://a.edu/roster', 'A University'], ['https://d.edu/roster', 'D College']]
+    assert FakeSpreadsheet.__trim__(store.fake.tabs['Players']) == FakeSpreadsheet.__trim__(sheet().tabs['Players']) # untouched
+    store.push() # nothing left to publish
+    assert len(store.fake.cleared) == 2
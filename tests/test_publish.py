@@ -0,0 +1,99 @@
+import google_sheets
+import pytest
+
+class FakeSpreadsheet:
+    # Developer metadata of its worksheets, as fetch_sheet_metadata and batch_update see it
+    def __init__(self):
+        self.metadata: dict[int, dict[str, str]] = dict()
+
+    def fetch_sheet_metadata(self, params: dict | None = None) -> dict:
+        return {'sheets': [
+            {'properties': {'sheetId': sheet_id}, 'developerMetadata': [{'metadataKey': key, 'metadataValue': value} for key, value in metadata.items()]}
+            for sheet_id, metadata in self.metadata.items()
+        ]}
+
+    def batch_update(self, body: dict):
+        for request in body['requests']:
+            if 'deleteDeveloperMetadata' in request:
+                lookup = request['deleteDeveloperMetadata']['dataFilter']['developerMetadataLookup']
+                self.metadata.get(lookup['metadataLocation']['sheetId'], dict()).pop(lookup['metadataKey'], None)
+            else:
+                metadata = request['createDeveloperMetadata']['developerMetadata']
+                self.metadata.setdefault(metadata['location']['sheetId'], dict())[metadata['metadataKey']] = metadata['metadataValue']
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet: FakeSpreadsheet, id: int, values: list[list]):
+        self.spreadsheet = spreadsheet
+        self.id = id
+        self.values = values # as the API returns them: trailing blank rows and cells dropped
+        self.updates = list()
+
+    def get_values(self, value_render_option = None) -> list[list]:
+        return self.values
+
+    def batch_update(self, data: list[dict]):
+        self.updates.append(data)
+
+LAYOUT = {'summary_rows': 2, 'col_widths': [50, 170], 'headers': [3]}
+DATA = [['Title', 'Last updated: today'], ['', ''], ['', ''], ['NCAA', ''], ['Name', 'AVG'], ['A', '.300']]
+
+def worksheets(values: list[list] = DATA[:1] + [[], []] + DATA[3:], layout: dict = LAYOUT) -> list[FakeWorksheet]:
+    # The Hub's worksheet and the year spreadsheet's copy, as a rebuild leaves them
+    result = [FakeWorksheet(FakeSpreadsheet(), 1, [list(row) for row in values]), FakeWorksheet(FakeSpreadsheet(), 7, [list(row) for row in values])]
+    google_sheets.save_published(layout, result)
+    return result
+
+def test_grid_changes_unchanged():
+    assert google_sheets.grid_changes(DATA, [list(row) for row in DATA]) == list()
+
+def test_grid_changes_runs():
+    old_data = [['a', 'b', 'c', 'd', 'e']]
+    new_data = [['a', 'B', 'C', 'd', 'E']]
+    assert google_sheets.grid_changes(old_data, new_data) == [{'range': 'B1:C1', 'values': [['B', 'C']]}, {'range': 'E1:E1', 'values': [['E']]}]
+
+def test_grid_changes_row_lengths():
+    # Longer rows write their new cells; shorter rows blank out what the old row had past them
+    old_data = [['a'], ['a', 'b', 'c']]
+    new_data = [['a', 'b'], ['a']]
+    assert google_sheets.grid_changes(old_data, new_data) == [{'range': 'B1:B1', 'values': [['b']]}, {'range': 'B2:C2', 'values': [['', '']]}]
+
+def test_grid_changes_new_rows():
+    assert google_sheets.grid_changes([['a']], [['a'], ['b', '']]) == [{'range': 'A2:A2', 'values': [['b']]}]
+
+def test_grid_changes_compares_displayed_values():
+    # Numbers read back from the sheet match the strings and numbers they were written from
+    old_data = [[3, 2.5, 1.0, '', 'x']]
+    new_data = [['3', '2.5', 1, None, 'y']]
+    assert google_sheets.grid_changes(old_data, new_data) == [{'range': 'E1:E1', 'values': [['y']]}]
+
+def test_publish_changes_unchanged():
+    sheets = worksheets()
+    assert google_sheets.publish_changes('Test', DATA, LAYOUT, sheets)
+    assert [sheet.updates for sheet in sheets] == [list(), list()]
+
+def test_publish_changes_against_live_values():
+    sheets = worksheets()
+    sheets[1].values[5][1] = '.299' # edited by hand in the year spreadsheet only
+    new_data = [list(row) for row in DATA]
+    new_data[0][1] = 'Last updated: tomorrow'
+    assert google_sheets.publish_changes('Test', new_data, LAYOUT, sheets)
+    assert sheets[0].updates == [[{'range': 'B1:B1', 'values': [['Last updated: tomorrow']]}]]
+    assert sheets[1].updates == [[{'range': 'B1:B1', 'values': [['Last updated: tomorrow']]}, {'range': 'B6:B6', 'values': [['.300']]}]]
+
+def test_publish_changes_trailing_blank_rows():
+    assert google_sheets.publish_changes('Test', DATA + [['', '']], LAYOUT, worksheets())
+
+@pytest.mark.parametrize('case', ['layout', 'unpublished', 'other_layout', 'rows'])
+def test_publish_changes_rebuilds(case):
+    sheets = worksheets()
+    layout = LAYOUT
+    if case == 'layout': # this run's grid is formatted differently
+        layout = {**LAYOUT, 'headers': [4]}
+    elif case == 'unpublished': # e.g. a new year spreadsheet
+        sheets[1].spreadsheet.metadata.clear()
+    elif case == 'other_layout': # the year spreadsheet was last rebuilt for another layout
+        google_sheets.save_published({**LAYOUT, 'summary_rows': 3}, sheets[1:])
+    elif case == 'rows':
+        sheets[0].values.append(['B', '.250'])
+    assert not google_sheets.publish_changes('Test', DATA, layout, sheets)
+    assert [sheet.updates for sheet in sheets] == [list(), list()] # nothing written before deciding
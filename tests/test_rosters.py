@@ -0,0 +1,45 @@
+import benchmarks
+import cbn_utils
+import leaderboard
+import rosters
+import pandas as pd
+import pytest
+
+COLUMNS = ['Name', 'Position', 'School', 'State', 'Hometown']
+
+@pytest.mark.parametrize('n, seed', [(1, 0), (25, 1), (500, 2), (5000, 3)])
+def test_canadians_rows_match_row_wise_pipeline(n, seed):
+    players_df = benchmarks.synthetic_players(n, seed = seed)
+    assert benchmarks.canadians_rows(players_df, COLUMNS) == benchmarks.canadians_rows_apply(players_df, COLUMNS)
+
+def test_hometowns():
+    df = pd.DataFrame({'city': ['Toronto', 'Calgary', '', ''], 'province': ['ON', '', 'BC', '']})
+    assert rosters.hometowns(df).tolist() == ['Toronto, ON', 'Calgary', 'BC', '']
+
+def test_hometowns_categorical_province():
+    df = pd.DataFrame({'city': ['Toronto', ''], 'province': pd.Series(['ON', 'QC'], dtype = 'category')})
+    assert rosters.hometowns(df).tolist() == ['Toronto, ON', 'QC']
+
+def test_positions():
+    df = pd.DataFrame({'positions': ['P', 'P/INF', 'C', 'P'], 'throws': ['L', 'R', 'R', '']})
+    assert rosters.positions(df).tolist() == ['LHP', 'RHP/INF', 'C', 'HP']
+
+def test_class_years():
+    df = pd.DataFrame({'year': ['Freshman', '', 'Sophomore', 'Junior', 'Senior', 'Graduate']})
+    assert rosters.class_years(df).tolist() == [0, 0, 1, 2, 3, -1]
+
+def test_blocks():
+    df = pd.DataFrame({'Name': ['A', 'B', 'C', 'D'], 'league': ['NCAA', 'NAIA', 'NCAA', 'NCAA'], 'division': ['1', '', '1', '2'], 'year': ['Junior', 'Senior', '', 'Freshman']})
+    labels = [league['label'] for league in cbn_utils.leagues]
+    rows, counts = rosters.blocks(df, leaderboard.league_groups(df, cbn_utils.leagues), labels, ['Name'], classes = rosters.class_years(df))
+    assert rows == [
+        ['NCAA: Division 1'], ['Freshmen'], ['Name'], ['C'], [''], ['Juniors'], ['Name'], ['A'],
+        [''], ['NCAA: Division 2'], ['Freshmen'], ['Name'], ['D'],
+        [''], ['NAIA'], [''], ['Seniors'], ['Name'], ['B'],
+        ['']
+    ]
+    assert counts == {0: 2, 1: 1, 3: 1}
+
+def test_blocks_empty():
+    df = pd.DataFrame({'Name': ['A'], 'league': ['MLB'], 'division': ['']})
+    assert rosters.blocks(df, leaderboard.league_groups(df, cbn_utils.leagues), ['x'], ['Name']) == (list(), dict())
@@ -0,0 +1,84 @@
+import benchmarks
+import cbn_utils
+import json
+import model
+import pytest
+
+URL = 'https://example.edu/sports/baseball/roster'
+ROSTER = json.dumps({'players': [{'firstName': 'Liam', 'lastName': 'Roy', 'positionShort': 'RHP', 'academicYearShort': 'Jr.', 'hometown': 'Toronto, Ont.'}]})
+COACHES = json.dumps({'coaches': [{'firstName': 'Pat', 'lastName': 'Lee', 'title': 'Head Coach'}]})
+UNRENDERED = '<html><body><div id="app"></div></body></html>'
+
+class FakeDriver:
+    # A roster page whose DOM never renders, with the API responses it requested
+    def __init__(self, payloads: dict[str, str]):
+        self.payloads = payloads
+        self.log = [
+            {'message': json.dumps({'message': message})} for request_id in payloads.keys() for message in [
+                {'method': 'Network.responseReceived', 'params': {'requestId': request_id, 'response': {'url': f'https://example.edu/api/v2/rosters/{request_id}', 'mimeType': 'application/json', 'status': 200}}},
+                {'method': 'Network.loadingFinished', 'params': {'requestId': request_id, 'encodedDataLength': 100}}
+            ]
+        ]
+        self.body_reads = 0
+
+    def execute_script(self, script: str, *args) -> bool:
+        return script == model.WebPage.__XHR_READY_SCRIPT__
+
+    def get_log(self, log_type: str) -> list[dict]:
+        log, self.log = self.log, list()
+        return log
+
+    def execute_cdp_cmd(self, command: str, params: dict) -> dict:
+        self.body_reads += 1
+        return {'body': self.payloads[params['requestId']], 'base64Encoded': False}
+
+def page(payloads: list[str] = list()) -> model.WebPage:
+    # A roster WebPage as the browser leaves it, without fetching anything
+    web_page = object.__new__(model.WebPage)
+    web_page.__url__ = URL
+    web_page.__driver__ = None
+    web_page.__xhr_payloads__ = list(payloads)
+    web_page.__performance_log__ = list()
+    web_page.__xhr_request_ids__ = set()
+    return web_page
+
+def test_is_roster_payload():
+    assert cbn_utils.is_roster_payload(ROSTER)
+    assert cbn_utils.is_roster_payload(json.dumps(json.loads(ROSTER)['players']))
+    assert not cbn_utils.is_roster_payload(COACHES)
+    assert not cbn_utils.is_roster_payload(json.dumps({'players': []}))
+    assert not cbn_utils.is_roster_payload(json.dumps({'players': [{'name': 'Liam Roy'}]}))
+    assert not cbn_utils.is_roster_payload('<html></html>')
+
+def test_ready_needs_a_roster_payload():
+    assert not page([COACHES]).__ready__(UNRENDERED) # would be saved to the page cache for hours
+    assert page([COACHES, ROSTER]).__ready__(UNRENDERED)
+    assert page([COACHES]).__ready__('<div class="s-person-card"></div>')
+
+@pytest.fixture
+def short_wait(monkeypatch):
+    monkeypatch.setattr(cbn_utils, 'ready_timeouts', {**cbn_utils.ready_timeouts, cbn_utils.ROSTER: 0.3})
+    monkeypatch.setattr(cbn_utils, 'CAPTURE_XHR', True)
+
+def test_wait_stops_at_roster_payload(short_wait):
+    web_page = page()
+    web_page.__driver__ = FakeDriver({'1': COACHES, '2': ROSTER})
+    web_page.__wait_until_ready__()
+    assert web_page.xhr_payloads() == [COACHES, ROSTER]
+    web_page.__read_xhr_payloads__() # bodies are read once, even across polls
+    assert web_page.__driver__.body_reads == 2
+
+def test_wait_continues_past_other_payloads(short_wait):
+    web_page = page()
+    web_page.__driver__ = FakeDriver({'1': COACHES})
+    web_page.__wait_until_ready__() # times out waiting for the DOM
+    assert web_page.xhr_payloads() == [COACHES]
+    assert not web_page.__ready__(UNRENDERED)
+
+def test_roster_from_payload_skips_other_payloads():
+    roster_page, = benchmarks.served({URL: UNRENDERED}, {'YEAR_SHORT': '25'})
+    assert roster_page.to_df().empty
+    roster_page.__xhr_payloads__ = [COACHES, ROSTER]
+    roster_page.__players__ = None
+    roster_page.__fetch_players__()
+    assert roster_page.to_df()['last_name'].tolist() == ['Roy']